@@ -0,0 +1,266 @@
+import argparse
+import copy
+import json
+import platform
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import conversor_v2 as v2
+
+# ==============================
+# GERADOR DE ATORES SINTETICOS
+# ==============================
+
+# Tipos replicados para escalar o ator; os demais (ancestralidade, classe...)
+# aparecem uma vez so, como numa ficha real.
+SCALED_TYPES = ["spell", "feat", "equipment", "consumable", "weapon", "armor", "shield", "backpack", "treasure"]
+PHYSICAL_TYPES = {"equipment", "consumable", "weapon", "armor", "shield", "treasure"}
+
+MARKUP_SNIPPETS = [
+    "<p>{words}</p>",
+    "<strong>{words}</strong> {words}",
+    "@UUID[Compendium.pf2e.conditionitems.Item.Frightened]{{Amedrontado 1}} {words}",
+    "@Damage[2d6[fire]] {words}",
+    "[[/r 1d20+7]] {words}",
+    "@Check[type:reflex|dc:18|basic:true] {words}",
+    "<ul><li>{words}</li><li>{words}</li></ul>",
+    "@Template[type:emanation|distance:10] {words}",
+]
+
+
+def _words(rng, count):
+    return " ".join(
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(count)
+    )
+
+
+def synthetic_description(rng, chars):
+    parts = []
+    size = 0
+    while size < chars:
+        part = rng.choice(MARKUP_SNIPPETS).format(words=_words(rng, rng.randint(3, 12)))
+        parts.append(part)
+        size += len(part) + 1
+    return "\n".join(parts)
+
+
+def synthetic_actor(template, item_count, desc_chars=500, seed=0):
+    """Ator PF2e com item_count itens gerados a partir dos itens do template.
+
+    Mantem os itens unicos do template, distribui magias entre as entradas de
+    conjuracao e guarda parte dos itens fisicos dentro de mochilas.
+    """
+    rng = random.Random(seed)
+    actor = copy.deepcopy({key: value for key, value in template.items() if key != "items"})
+    actor["name"] = f"Sintetico {item_count}"
+    by_type = {}
+    for item in template.get("items", []):
+        by_type.setdefault(item.get("type"), []).append(item)
+
+    items = [copy.deepcopy(item) for item_type, group in by_type.items()
+             if item_type not in SCALED_TYPES for item in group]
+    entries = [item["_id"] for item in items if item.get("type") == "spellcastingEntry"]
+    pool = [item for item_type in SCALED_TYPES for item in by_type.get(item_type, [])]
+    if not pool:
+        raise ValueError("template sem itens para replicar")
+
+    containers = []
+    generated = []
+    for index in range(item_count):
+        item = copy.deepcopy(pool[index % len(pool)])
+        item["_id"] = "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(16))
+        item["name"] = f"{item.get('name', 'Item')} {index}"
+        system = item.setdefault("system", {})
+        system["description"] = {"value": synthetic_description(rng, max(1, int(rng.gauss(desc_chars, desc_chars / 4))))}
+        if item["type"] == "spell" and entries:
+            system["location"] = {"value": rng.choice(entries)}
+        if item["type"] == "backpack":
+            system["containerId"] = None
+            containers.append(item["_id"])
+        generated.append(item)
+    for item in generated:
+        if item["type"] in PHYSICAL_TYPES:
+            item["system"]["containerId"] = rng.choice(containers) if containers and rng.random() < 0.3 else None
+    actor["items"] = items + generated
+    return actor
+
+
+# ==============================
+# MEDICAO
+# ==============================
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies, units, peak_bytes):
+    mean = sum(latencies) / len(latencies)
+    return {
+        "runs": len(latencies),
+        "mean_s": round(mean, 6),
+        "min_s": round(min(latencies), 6),
+        "p50_s": round(percentile(latencies, 0.50), 6),
+        "p90_s": round(percentile(latencies, 0.90), 6),
+        "p99_s": round(percentile(latencies, 0.99), 6),
+        "max_s": round(max(latencies), 6),
+        "throughput_per_s": round(units / mean, 2) if mean > 0 else None,
+        "peak_memory_bytes": peak_bytes,
+    }
+
+
+def measure(func, repeat, units):
+    """Roda func repeat vezes cronometrando e uma vez extra sob tracemalloc."""
+    latencies = []
+    for _ in range(repeat):
+        v2.clear_text_caches()
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    v2.clear_text_caches()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return summarize(latencies, units, peak)
+
+
+def bench_actor(actor, repeat, with_pdf, work_dir):
+    sections = v2.SectionFlags()
+    descriptions = [
+        item.get("system", {}).get("description", {}).get("value", "") for item in actor["items"]
+    ]
+    item_count = len(actor["items"])
+    stages = {}
+
+    stages["calculate_all"] = measure(lambda: v2.CharacterAnalyzer(actor).calculate_all(), repeat, item_count)
+
+    def clean_all():
+        for text in descriptions:
+            v2.clean_description(text)
+
+    stages["clean_description"] = measure(clean_all, repeat, len(descriptions))
+    stages["clean_description"]["input_bytes"] = sum(len(text) for text in descriptions)
+
+    def render():
+        return v2.generate_html(v2.CharacterAnalyzer(actor), actor["name"], sections)
+
+    stages["generate_html"] = measure(render, repeat, item_count)
+    html_doc = render()
+    stages["generate_html"]["output_bytes"] = len(html_doc)
+
+    if with_pdf:
+        html_path = work_dir / f"bench_{item_count}.html"
+        pdf_path = work_dir / f"bench_{item_count}.pdf"
+        html_path.write_text(html_doc, encoding="utf-8")
+        failures = []
+
+        def print_pdf():
+            if not v2.export_pdf(html_path, pdf_path):
+                failures.append(True)
+
+        stages["pdf"] = measure(print_pdf, repeat, 1)
+        if failures:
+            stages["pdf"]["failures"] = len(failures)
+    return stages
+
+
+# ==============================
+# BASELINE
+# ==============================
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Lista (tamanho, etapa, p50 base, p50 atual, razao) das etapas mais lentas que a base."""
+    regressions = []
+    for size, current in results["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base:
+            continue
+        for stage, stats in current["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats or not base_stats.get("p50_s"):
+                continue
+            ratio = stats["p50_s"] / base_stats["p50_s"]
+            if ratio > 1 + tolerance:
+                regressions.append((size, stage, base_stats["p50_s"], stats["p50_s"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do conversor v2 com atores sinteticos")
+    parser.add_argument("--template", default="Umbriel.json", help="JSON usado como base dos atores")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Quantidades de itens, separadas por virgula")
+    parser.add_argument("--desc-chars", type=int, default=500, help="Tamanho medio das descricoes")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticoes por etapa")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--pdf", action="store_true", help="Inclui a impressao do PDF (requer Chrome)")
+    parser.add_argument("--output", default="output/benchmark.json", help="Onde gravar o resultado")
+    parser.add_argument("--baseline", help="Compara com um resultado salvo")
+    parser.add_argument("--save-baseline", help="Salva o resultado tambem como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Folga aceita sobre o p50 da baseline")
+    args = parser.parse_args()
+
+    # As etapas medem o trabalho de limpeza/formatacao, nao o cache em disco.
+    v2.spell_text_cache.enabled = False
+    template = json.loads(Path(args.template).read_text(encoding="utf-8"))
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    with_pdf = args.pdf and v2.find_chrome_executable() is not None
+    if args.pdf and not with_pdf:
+        print("Aviso: Chrome/Chromium nao encontrado. Etapa de PDF ignorada.")
+    if with_pdf:
+        v2.start_chrome_pool(size=1)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "generator_version": v2.GENERATOR_VERSION,
+            "template": args.template,
+            "desc_chars": args.desc_chars,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="pf2e_bench_") as work_dir:
+        for size in sizes:
+            actor = synthetic_actor(template, size, args.desc_chars, seed=args.seed + size)
+            json_bytes = len(json.dumps(actor))
+            print(f"{size} itens ({json_bytes / 1024:.0f} KB)...", flush=True)
+            stages = bench_actor(actor, max(1, args.repeat), with_pdf, Path(work_dir))
+            results["results"][str(size)] = {"items": len(actor["items"]), "json_bytes": json_bytes, "stages": stages}
+            for stage, stats in stages.items():
+                print(f"  {stage:<18} p50 {stats['p50_s'] * 1000:9.2f} ms  "
+                      f"p90 {stats['p90_s'] * 1000:9.2f} ms  pico {stats['peak_memory_bytes'] / 1024:9.0f} KB")
+
+    output = json.dumps(results, indent=2)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).write_text(output, encoding="utf-8")
+    print(f"Resultado: {args.output}")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(output, encoding="utf-8")
+        print(f"Baseline salva: {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressoes acima de {args.tolerance:.0%}:")
+            for size, stage, base, current, ratio in regressions:
+                print(f"  {size} itens / {stage}: {base * 1000:.2f} ms -> {current * 1000:.2f} ms ({ratio:.2f}x)")
+            sys.exit(1)
+        print("Sem regressoes em relacao a baseline.")
+
+
+if __name__ == "__main__":
+    main()
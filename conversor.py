@@ -2,7 +2,6 @@ import json
 import sys
 import os
 from datetime import datetime
-from fpdf import FPDF
 import math
 import re
 
@@ -274,7 +273,9 @@ class CharacterAnalyzer:
 # CLASSE PDF COM SUPORTE ASCII APENAS
 # ==============================
 
-class PF2ECharacterPDF(FPDF):
+class CharacterPDFMethods:
+    """Métodos da ficha; a classe final herda também do FPDF (ver character_pdf_class)"""
+
     def __init__(self):
         super().__init__()
     
@@ -392,13 +393,31 @@ class PF2ECharacterPDF(FPDF):
         for item_text in valid_items:
             self.cell(0, 6, f"- {item_text}", 0, 1)
 
+_pdf_class = None
+
+
+def character_pdf_class():
+    """Monta PF2ECharacterPDF importando o FPDF só quando um PDF vai ser gerado"""
+    global _pdf_class
+    if _pdf_class is None:
+        from fpdf import FPDF
+        _pdf_class = type("PF2ECharacterPDF", (CharacterPDFMethods, FPDF), {"__module__": __name__})
+    return _pdf_class
+
+
+def __getattr__(name):
+    # Mantém "from conversor import PF2ECharacterPDF" funcionando.
+    if name == "PF2ECharacterPDF":
+        return character_pdf_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # ==============================
 # FUNÇÃO PRINCIPAL DE CRIAÇÃO PDF
 # ==============================
 
 def create_character_pdf(analyzer, output_filename):
     """Cria PDF usando apenas ASCII"""
-    pdf = PF2ECharacterPDF()
+    pdf = character_pdf_class()()
     
     calculated = analyzer.calculate_all()
     character_info = analyzer.get_character_info()
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import json
 import os
 import sys
@@ -5,24 +7,292 @@ import math
 import re
 import html
 import shutil
-import subprocess
-import argparse
+import threading
+import queue
+import time
+import atexit
+import hashlib
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict
-from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse
-import mimetypes
+from functools import lru_cache, wraps
+from typing import TYPE_CHECKING, Dict
 from datetime import datetime
 from pathlib import Path
+from string import Formatter
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem pool do Chrome, apenas o modo avulso
+    fcntl = None
+
+# Web UI (http.server, mimetypes, gzip), Chrome (subprocess, select, base64),
+# lote (concurrent.futures, multiprocessing), catalogo (sqlite3) e fpdf sao
+# importados dentro das funcoes que os usam: uma conversao avulsa pela linha
+# de comando nao paga a importacao do que nao vai rodar.
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
+
+# ==============================
+# ITEM RECORDS
+# ==============================
+
+# Cada item do Foundry vira um registro com __slots__ guardando so o que a
+# ficha le; o dict bruto (descricoes de regras, flags, _stats, rolagens...)
+# nao fica referenciado depois da normalizacao.
+
+class ItemRecord:
+    """Campos comuns a todo item; usado tal qual para tipos sem registro proprio."""
+
+    __slots__ = ("id", "type", "name", "quantity", "container_id")
+
+    def __init__(self, raw, system):
+        self.id = raw.get("_id")
+        self.type = raw.get("type")
+        self.name = raw.get("name") or ""
+        self.quantity = get_nested_value(system, "quantity", default=1)
+        self.container_id = system.get("containerId")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class Weapon(ItemRecord):
+    __slots__ = (
+        "category", "traits", "damage_dice", "damage_die", "damage_type", "splash", "range",
+        "reload", "bonus", "potency", "striking", "property_runes", "hands_held", "usage",
+    )
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.category = system.get("category", "")
+        self.traits = tuple(get_nested_value(system, "traits", "value", default=()) or ())
+        self.damage_dice = get_nested_value(system, "damage", "dice", default=0)
+        self.damage_die = get_nested_value(system, "damage", "die", default="")
+        self.damage_type = get_nested_value(system, "damage", "damageType", default="")
+        self.splash = get_nested_value(system, "splashDamage", "value", default=0) or 0
+        range_value = system.get("range")
+        if isinstance(range_value, dict):
+            range_value = range_value.get("value", "")
+        self.range = range_value
+        self.reload = get_nested_value(system, "reload", "value", default="")
+        self.bonus = get_nested_value(system, "bonus", "value", default=0) or 0
+        self.potency = get_nested_value(system, "runes", "potency", default=0) or 0
+        self.striking = get_nested_value(system, "runes", "striking", default=0) or 0
+        self.property_runes = tuple(get_nested_value(system, "runes", "property", default=()) or ())
+        self.hands_held = get_nested_value(system, "equipped", "handsHeld", default=0)
+        self.usage = get_nested_value(system, "usage", "value", default="")
+
+
+class Armor(ItemRecord):
+    __slots__ = ("ac_bonus", "dex_cap", "check_penalty")
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.ac_bonus = get_nested_value(system, "acBonus", default=0)
+        self.dex_cap = system.get("dexCap")
+        self.check_penalty = get_nested_value(system, "checkPenalty", default=0)
+
+
+class Shield(ItemRecord):
+    __slots__ = ("ac_bonus",)
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.ac_bonus = get_nested_value(system, "acBonus", default=0)
+
+
+class Spell(ItemRecord):
+    __slots__ = (
+        "level", "time", "range", "duration", "target", "area", "requirements",
+        "save", "basic_save", "traits", "location", "description", "source",
+    )
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.level = get_nested_value(system, "level", "value")
+        self.time = get_nested_value(system, "time", "value")
+        self.range = get_nested_value(system, "range", "value")
+        self.duration = get_nested_value(system, "duration", "value")
+        self.target = get_nested_value(system, "target", "value")
+        self.area = get_nested_value(system, "area", "value")
+        self.requirements = system.get("requirements") or ""
+        self.save = get_nested_value(system, "defense", "save", "statistic") or ""
+        self.basic_save = bool(get_nested_value(system, "defense", "save", "basic", default=False))
+        self.traits = tuple(get_nested_value(system, "traits", "value", default=()) or ())
+        self.location = get_nested_value(system, "location", "value")
+        self.description = get_nested_value(system, "description", "value")
+        # Origem no compendio (exports antigos guardam em flags.core.sourceId).
+        self.source = (
+            get_nested_value(raw, "_stats", "compendiumSource")
+            or get_nested_value(raw, "flags", "core", "sourceId")
+            or ""
+        )
+
+
+class Feat(ItemRecord):
+    __slots__ = ("category", "level")
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.category = system.get("category", "general")
+        self.level = get_nested_value(system, "level", "value", default=0)
+
+
+class Container(ItemRecord):
+    __slots__ = ()
+
+
+class Consumable(ItemRecord):
+    __slots__ = ()
+
+
+class Treasure(ItemRecord):
+    __slots__ = ("price",)
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.price = get_nested_value(system, "price", "value", default={})
+
+
+class Action(ItemRecord):
+    __slots__ = ("action_type", "actions")
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.action_type = get_nested_value(system, "actionType", "value")
+        self.actions = get_nested_value(system, "actions", "value")
+
+
+class SpellcastingEntry(ItemRecord):
+    __slots__ = ("tradition", "prepared")
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        self.tradition = get_nested_value(system, "tradition", "value")
+        self.prepared = get_nested_value(system, "prepared", "value")
+
+
+class Origin(ItemRecord):
+    """Ancestralidade, heranca ou antecedente: so os boosts escolhidos."""
+
+    __slots__ = ("boosts",)
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        boosts = system.get("boosts")
+        self.boosts = tuple(
+            value["selected"]
+            for value in (boosts.values() if isinstance(boosts, dict) else ())
+            if isinstance(value, dict) and value.get("selected")
+        )
+
+
+class CharacterClass(ItemRecord):
+    __slots__ = ("weapon_ranks", "key_ability")
+
+    def __init__(self, raw, system):
+        super().__init__(raw, system)
+        attacks = system.get("attacks")
+        self.weapon_ranks = None
+        if isinstance(attacks, dict):
+            self.weapon_ranks = {
+                "simple": attacks.get("simple", 0),
+                "martial": attacks.get("martial", 0),
+                "advanced": attacks.get("advanced", 0),
+                "unarmed": attacks.get("unarmed", 0),
+            }
+        key_ability = system.get("keyAbility", "")
+        if isinstance(key_ability, dict):
+            key_ability = key_ability.get("value", "")
+        if isinstance(key_ability, list):
+            key_ability = key_ability[0] if key_ability else ""
+        self.key_ability = key_ability
+
+
+ITEM_RECORDS = {
+    "weapon": Weapon,
+    "armor": Armor,
+    "shield": Shield,
+    "spell": Spell,
+    "feat": Feat,
+    "backpack": Container,
+    "consumable": Consumable,
+    "treasure": Treasure,
+    "action": Action,
+    "spellcastingEntry": SpellcastingEntry,
+    "ancestry": Origin,
+    "heritage": Origin,
+    "background": Origin,
+    "class": CharacterClass,
+}
+
+# Campos do actor que a ficha le; prototypeToken, flags, ownership, _stats e
+# os itens brutos ficam de fora.
+ACTOR_FIELDS = ("name", "type", "system")
+
+
+def normalize_item(raw) -> ItemRecord:
+    system = raw.get("system")
+    if not isinstance(system, dict):
+        system = {}
+    return ITEM_RECORDS.get(raw.get("type"), ItemRecord)(raw, system)
+
+
+def normalize_items(raw_items):
+    return [normalize_item(raw) for raw in raw_items or () if isinstance(raw, dict)]
+
 
 # ==============================
 # CHARACTER ANALYZER
 # ==============================
 
 class CharacterAnalyzer:
+    # Chave em calculated_values -> metodo que a calcula.
+    CALCULATORS = {
+        "ability_scores": "calculate_ability_scores",
+        "ability_modifiers": "calculate_ability_scores",
+        "ac": "calculate_ac",
+        "saves": "calculate_saves",
+        "attacks": "calculate_attacks",
+        "skills": "calculate_skills",
+        "perception": "calculate_perception",
+    }
+
     def __init__(self, json_data):
-        self.data = json_data
+        self.data = {key: json_data[key] for key in ACTOR_FIELDS if key in json_data}
+        self.items = normalize_items(json_data.get("items"))
         self.calculated_values = {}
+        self._character_info = None
+        self._build_indexes()
+
+    def derived(self, key):
+        """Retorna um valor derivado, calculando-o (e dependencias) no primeiro acesso."""
+        if key not in self.calculated_values:
+            getattr(self, self.CALCULATORS[key])()
+        return self.calculated_values[key]
+
+    def _build_indexes(self):
+        # Um unico passe sobre os itens; calculos e renderizadores leem daqui.
+        self.items_by_type = {}
+        self.items_by_container = {}
+        self.item_names = set()
+        self.feats_by_category = {
+            "ancestry": [],
+            "class": [],
+            "skill": [],
+            "general": [],
+        }
+        for item in self.items:
+            self.items_by_type.setdefault(item.type, []).append(item)
+            self.item_names.add(item.name)
+            if item.container_id:
+                self.items_by_container.setdefault(item.container_id, []).append(item)
+            if item.type == "feat" and item.category in self.feats_by_category:
+                self.feats_by_category[item.category].append(item)
+
+    def first_item_of_type(self, item_type):
+        items = self.items_by_type.get(item_type)
+        return items[0] if items else None
 
     def calculate_ability_scores(self):
         base_scores = {
@@ -33,23 +303,9 @@ class CharacterAnalyzer:
         if not isinstance(system_abilities, dict):
             system_abilities = {}
 
-        for item in self.data.get("items", []):
-            if item.get("type") == "ancestry":
-                boosts = item.get("system", {}).get("boosts", {})
-                for boost_values in boosts.values():
-                    if isinstance(boost_values, dict) and "selected" in boost_values:
-                        selected = boost_values["selected"]
-                        if selected:
-                            base_scores[selected] += 2
-
-        for item in self.data.get("items", []):
-            if item.get("type") == "background":
-                boosts = item.get("system", {}).get("boosts", {})
-                for boost_values in boosts.values():
-                    if isinstance(boost_values, dict) and "selected" in boost_values:
-                        selected = boost_values["selected"]
-                        if selected:
-                            base_scores[selected] += 2
+        for item in self.get_items_by_type("ancestry") + self.get_items_by_type("background"):
+            for selected in item.boosts:
+                base_scores[selected] += 2
 
         build = self.data.get("system", {}).get("build", {})
         build_boosts = build.get("attributes", {}).get("boosts", {})
@@ -79,18 +335,17 @@ class CharacterAnalyzer:
     def calculate_ac(self):
         base_ac = 10
 
-        dex_mod = self.calculated_values.get("ability_modifiers", {}).get("dex", 0)
+        dex_mod = self.derived("ability_modifiers").get("dex", 0)
 
         armor_bonus = 0
         armor_dex_cap = 99
         armor_check_penalty = 0
 
-        for item in self.data.get("items", []):
-            if item.get("type") == "armor":
-                armor_bonus = item.get("system", {}).get("acBonus", 0)
-                armor_dex_cap = item.get("system", {}).get("dexCap", 99)
-                armor_check_penalty = item.get("system", {}).get("checkPenalty", 0)
-                break
+        armor = self.first_item_of_type("armor")
+        if armor is not None:
+            armor_bonus = armor.ac_bonus
+            armor_dex_cap = 99 if armor.dex_cap is None else armor.dex_cap
+            armor_check_penalty = armor.check_penalty
 
         effective_dex_mod = min(dex_mod, armor_dex_cap)
 
@@ -100,10 +355,9 @@ class CharacterAnalyzer:
         ac = base_ac + effective_dex_mod + armor_bonus + proficiency_bonus
 
         shield_bonus = 0
-        for item in self.data.get("items", []):
-            if item.get("type") == "shield":
-                shield_bonus = item.get("system", {}).get("acBonus", 0)
-                break
+        shield = self.first_item_of_type("shield")
+        if shield is not None:
+            shield_bonus = shield.ac_bonus
 
         ac += shield_bonus
 
@@ -127,9 +381,8 @@ class CharacterAnalyzer:
         saves["reflex"] = {"base": 0, "ability": "dex", "proficiency": 2}
         saves["will"] = {"base": 0, "ability": "wis", "proficiency": 2}
 
-        for item in self.data.get("items", []):
-            if item.get("name") == "Fortitude Expertise":
-                saves["fortitude"]["proficiency"] = 2
+        if "Fortitude Expertise" in self.item_names:
+            saves["fortitude"]["proficiency"] = 2
 
         system_saves = self.data.get("system", {}).get("saves")
         if isinstance(system_saves, dict):
@@ -139,7 +392,7 @@ class CharacterAnalyzer:
                     if rank is not None:
                         saves[key]["proficiency"] = rank
 
-        ability_mods = self.calculated_values.get("ability_modifiers", {})
+        ability_mods = self.derived("ability_modifiers")
         proficiency_ranks = {1: level, 2: level + 4, 3: level + 8, 4: level + 12}
 
         for save, info in saves.items():
@@ -158,25 +411,17 @@ class CharacterAnalyzer:
 
         melee_proficiency = 2 if level >= 5 else 1
         weapon_proficiencies = {}
-        for item in self.data.get("items", []):
-            if item.get("type") == "class":
-                class_attacks = item.get("system", {}).get("attacks", {})
-                if isinstance(class_attacks, dict):
-                    weapon_proficiencies = {
-                        "simple": class_attacks.get("simple", 0),
-                        "martial": class_attacks.get("martial", 0),
-                        "advanced": class_attacks.get("advanced", 0),
-                        "unarmed": class_attacks.get("unarmed", 0),
-                    }
-                    ranks = list(weapon_proficiencies.values())
-                    max_rank = max([r for r in ranks if isinstance(r, int)], default=0)
-                    if max_rank:
-                        melee_proficiency = max_rank
-                break
+        class_item = self.first_item_of_type("class")
+        if class_item is not None and class_item.weapon_ranks is not None:
+            weapon_proficiencies = dict(class_item.weapon_ranks)
+            ranks = list(weapon_proficiencies.values())
+            max_rank = max([r for r in ranks if isinstance(r, int)], default=0)
+            if max_rank:
+                melee_proficiency = max_rank
         proficiency_ranks = {1: level, 2: level + 4, 3: level + 8, 4: level + 12}
 
-        str_mod = self.calculated_values.get("ability_modifiers", {}).get("str", 0)
-        dex_mod = self.calculated_values.get("ability_modifiers", {}).get("dex", 0)
+        str_mod = self.derived("ability_modifiers").get("str", 0)
+        dex_mod = self.derived("ability_modifiers").get("dex", 0)
 
         attacks["melee"] = {
             "proficiency": melee_proficiency,
@@ -194,7 +439,7 @@ class CharacterAnalyzer:
     def calculate_skills(self):
         level = self.data.get("system", {}).get("details", {}).get("level", {}).get("value", 1)
         skills_data = self.data.get("system", {}).get("skills", {})
-        ability_mods = self.calculated_values.get("ability_modifiers", {})
+        ability_mods = self.derived("ability_modifiers")
 
         skills = {}
         skill_abilities = {
@@ -260,7 +505,7 @@ class CharacterAnalyzer:
 
     def calculate_perception(self):
         level = self.data.get("system", {}).get("details", {}).get("level", {}).get("value", 1)
-        wis_mod = self.calculated_values.get("ability_modifiers", {}).get("wis", 0)
+        wis_mod = self.derived("ability_modifiers").get("wis", 0)
 
         proficiency_ranks = {1: level, 2: level + 4, 3: level + 8, 4: level + 12}
         rank = 2
@@ -279,6 +524,8 @@ class CharacterAnalyzer:
         return perception
 
     def get_character_info(self):
+        if self._character_info is not None:
+            return self._character_info
         system = self.data.get("system", {})
         details = system.get("details", {})
         resources = system.get("resources", {})
@@ -289,15 +536,8 @@ class CharacterAnalyzer:
         if isinstance(key_ability, list):
             key_ability = key_ability[0] if key_ability else ""
 
-        class_key_ability = ""
-        for item in self.data.get("items", []):
-            if item.get("type") == "class":
-                class_key_ability = item.get("system", {}).get("keyAbility", "")
-                if isinstance(class_key_ability, dict):
-                    class_key_ability = class_key_ability.get("value", "")
-                if isinstance(class_key_ability, list):
-                    class_key_ability = class_key_ability[0] if class_key_ability else ""
-                break
+        class_item = self.first_item_of_type("class")
+        class_key_ability = class_item.key_ability if class_item is not None else ""
 
         info = {
             "name": self.data.get("name", "Unknown"),
@@ -315,30 +555,17 @@ class CharacterAnalyzer:
             if field in details:
                 info[field] = details[field].get("value", "")
 
+        self._character_info = info
         return info
 
     def get_items_by_type(self, item_type):
-        return [item for item in self.data.get("items", []) if item.get("type") == item_type]
-
-    def get_feats_by_category(self):
-        feats = {
-            "ancestry": [],
-            "class": [],
-            "skill": [],
-            "general": [],
-        }
+        return self.items_by_type.get(item_type, [])
 
-        for item in self.data.get("items", []):
-            if item.get("type") == "feat":
-                category = item.get("system", {}).get("category", "general")
-                if category in feats:
-                    feat_info = {
-                        "name": item.get("name", ""),
-                        "level": item.get("system", {}).get("level", {}).get("value", 0),
-                    }
-                    feats[category].append(feat_info)
+    def get_items_in_container(self, container_id):
+        return self.items_by_container.get(container_id, [])
 
-        return feats
+    def get_feats_by_category(self):
+        return self.feats_by_category
 
     def calculate_all(self):
         self.calculate_ability_scores()
@@ -354,49 +581,197 @@ class CharacterAnalyzer:
 # HTML GENERATOR
 # ==============================
 
+# Marcacao do Foundry tratada em varreduras lineares:
+#   @Compendium[...]{rotulo} / @UUID[...]{rotulo} -> rotulo (sem rotulo -> removido)
+#   [[/r ...]] e [...]                              -> removidos (clean_text)
+#   <hr>, </p>, <br> -> quebra de linha; demais tags -> removidas (clean_description)
+_COMPENDIUM_LABEL = re.compile(r"@Compendium\[[^\]]+\]\{([^}]+)\}")
+_COMPENDIUM_LINK = re.compile(r"@Compendium\[[^\]]+\]")
+_UUID_LABEL = re.compile(r"@UUID\[[^\]]+\]\{([^}]+)\}")
+_UUID_LINK = re.compile(r"@UUID\[[^\]]+\]")
+_BLOCK_TAG = re.compile(r"<(?:hr\s*/?|/p\s*|br\s*/?)>", re.IGNORECASE)
+_BRACKET_CHARS = re.compile(r"[\[\]\n]")
+_TAG_CHARS = re.compile(r"[<>]")
+_EXTRA_NEWLINES = re.compile(r"\n{3,}")
+
+
+def _unwrap_links(text):
+    # Mesmas quatro passadas de sempre, na mesma ordem (Compendium e depois
+    # UUID): com links aninhados, como @UUID[x]{@Compendium[y]{z}}, o rotulo
+    # so fecha no primeiro "}" e a ordem decide o que sobra. Cada par so roda
+    # se o texto tiver o prefixo correspondente.
+    if "@Compendium[" in text:
+        text = _COMPENDIUM_LINK.sub("", _COMPENDIUM_LABEL.sub(r"\1", text))
+    if "@UUID[" in text:
+        text = _UUID_LINK.sub("", _UUID_LABEL.sub(r"\1", text))
+    return text
+
+
+def _strip_brackets(text):
+    # Remove rolagens [[...]] e depois [...] numa unica varredura: nenhum dos
+    # dois atravessa quebras de linha e [...] termina no primeiro "]" que
+    # sobra apos retirar as rolagens.
+    pieces = []
+    group_start = None
+    no_roll_until = -1
+    pos = 0
+    length = len(text)
+    while True:
+        match = _BRACKET_CHARS.search(text, pos)
+        if match is None:
+            pieces.append(text[pos:])
+            break
+        index = match.start()
+        char = text[index]
+        pieces.append(text[pos:index])
+        pos = index + 1
+        if char == "[" and index >= no_roll_until and text.startswith("[[", index):
+            roll_end = text.find("]]", index + 2)
+            newline = text.find("\n", index + 2)
+            if roll_end != -1 and (newline == -1 or roll_end < newline):
+                pos = roll_end + 2
+                continue
+            no_roll_until = newline if newline != -1 else length
+        if char == "[":
+            if group_start is None:
+                group_start = len(pieces)
+            pieces.append(char)
+        elif char == "]" and group_start is not None:
+            del pieces[group_start:]
+            group_start = None
+        else:
+            if char == "\n":
+                group_start = None
+            pieces.append(char)
+    return "".join(pieces)
+
+
+def _strip_tags(text):
+    # Troca <hr>, </p> e <br> por quebra de linha e remove as demais tags na
+    # mesma varredura. Uma tag comeca no primeiro "<" ainda aberto e termina
+    # no proximo ">" (as quebras das tags de bloco ficam dentro dela).
+    pieces = []
+    group_start = None
+    pos = 0
+    while True:
+        match = _TAG_CHARS.search(text, pos)
+        if match is None:
+            pieces.append(text[pos:])
+            break
+        index = match.start()
+        pieces.append(text[pos:index])
+        pos = index + 1
+        if text[index] == "<":
+            block = _BLOCK_TAG.match(text, index)
+            if block:
+                pieces.append("\n")
+                pos = block.end()
+            elif group_start is None:
+                group_start = len(pieces)
+                pieces.append("<")
+            else:
+                pieces.append("<")
+        elif group_start is not None and any(pieces[group_start + 1:]):
+            del pieces[group_start:]
+            group_start = None
+        else:
+            pieces.append(">")
+            group_start = None
+    return "".join(pieces)
+
+
+TEXT_CACHE_SIZE = 8192
+TEXT_CACHE_MAX_LENGTH = 4096
+_text_caches = {}
+_text_cache_bypass = {}
+
+
+def _memoize_text(func):
+    # LRU limitado para textos repetidos (tracos, tipos de dano, nomes,
+    # descricoes de compendio). Textos maiores que TEXT_CACHE_MAX_LENGTH nao
+    # entram no cache para manter a memoria estavel.
+    cached = lru_cache(maxsize=TEXT_CACHE_SIZE)(func)
+    name = func.__name__
+    _text_caches[name] = cached
+    _text_cache_bypass[name] = 0
+
+    @wraps(func)
+    def wrapper(text):
+        if text is None:
+            return ""
+        text = str(text)
+        if len(text) > TEXT_CACHE_MAX_LENGTH:
+            _text_cache_bypass[name] += 1
+            return func(text)
+        return cached(text)
+
+    return wrapper
+
+
+def text_cache_stats() -> Dict:
+    stats = {}
+    for name, cached in _text_caches.items():
+        info = cached.cache_info()
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "bypassed": _text_cache_bypass[name],
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        }
+    return stats
+
+
+def clear_text_caches() -> None:
+    for name, cached in _text_caches.items():
+        cached.cache_clear()
+        _text_cache_bypass[name] = 0
+
+
+@_memoize_text
 def clean_text(text):
     if text is None:
         return ""
     text = str(text)
-    text = re.sub(r"@Compendium\[[^\]]+\]\{([^}]+)\}", r"\1", text)
-    text = re.sub(r"@Compendium\[[^\]]+\]", "", text)
-    text = re.sub(r"@UUID\[[^\]]+\]\{([^}]+)\}", r"\1", text)
-    text = re.sub(r"@UUID\[[^\]]+\]", "", text)
-    text = re.sub(r"\[\[.*?\]\]", "", text)
-    text = re.sub(r"\[.*?\]", "", text)
-    return text.strip()
+    if "[" not in text:
+        return text.strip()
+    if "@" in text:
+        text = _unwrap_links(text)
+    return _strip_brackets(text).strip()
 
 
+@_memoize_text
 def h(text):
     cleaned = clean_text(text)
     return html.escape(cleaned)
 
 
+@_memoize_text
 def clean_description(text):
     if text is None:
         return ""
     text = str(text)
-    text = re.sub(r"@Compendium\[[^\]]+\]\{([^}]+)\}", r"\1", text)
-    text = re.sub(r"@Compendium\[[^\]]+\]", "", text)
-    text = re.sub(r"@UUID\[[^\]]+\]\{([^}]+)\}", r"\1", text)
-    text = re.sub(r"@UUID\[[^\]]+\]", "", text)
-    text = re.sub(r"<hr\s*/?>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"</p\s*>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<br\s*/?>", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"<[^>]+>", "", text)
+    if "@" in text:
+        text = _unwrap_links(text)
+    if "<" in text:
+        text = _strip_tags(text)
     text = html.unescape(text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _EXTRA_NEWLINES.sub("\n\n", text)
     return text.strip()
 
 
 def render_table(headers, rows):
     if not rows:
         return ""
-    header_html = "".join(f"<th>{h(header)}</th>" for header in headers)
-    row_html = ""
+    out = ["<table><thead><tr>"]
+    out.extend(f"<th>{h(header)}</th>" for header in headers)
+    out.append("</tr></thead><tbody>")
     for row in rows:
-        row_html += "<tr>" + "".join(f"<td>{h(cell)}</td>" for cell in row) + "</tr>"
-    return f"<table><thead><tr>{header_html}</tr></thead><tbody>{row_html}</tbody></table>"
+        out.append("<tr>")
+        out.extend(f"<td>{h(cell)}</td>" for cell in row)
+        out.append("</tr>")
+    out.append("</tbody></table>")
+    return "".join(out)
 
 
 def normalize_list(value):
@@ -489,880 +864,21 @@ class SectionFlags:
     spells_notes: bool = True
 
 
-def generate_html(analyzer, output_title, sections: SectionFlags):
-    calculated = analyzer.calculate_all()
-    info = analyzer.get_character_info()
-    system = analyzer.data.get("system", {})
-    if not isinstance(system, dict):
-        system = {}
-    attributes = system.get("attributes", {})
-    if not isinstance(attributes, dict):
-        attributes = {}
-    details = system.get("details", {})
-    if not isinstance(details, dict):
-        details = {}
-
-    ability_scores = calculated["ability_scores"]
-    ability_mods = calculated["ability_modifiers"]
-    ac_info = calculated["ac"]
-    saves = calculated["saves"]
-    perception = calculated["perception"]
-    attacks = calculated["attacks"]
-    skills = calculated["skills"]
-    feats = analyzer.get_feats_by_category()
-
-    ability_names = {
-        "str": "Forca", "dex": "Destreza", "con": "Constituicao",
-        "int": "Inteligencia", "wis": "Sabedoria", "cha": "Carisma",
-    }
-
-    attributes_rows = []
-    for key, name in ability_names.items():
-        score = ability_scores.get(key, 10)
-        mod = ability_mods.get(key, 0)
-        attributes_rows.append([name, str(score), f"{mod:+}"])
-
-    saves_rows = []
-    save_names = {"fortitude": "Fortitude", "reflex": "Reflexos", "will": "Vontade"}
-    for save_key, save_name in save_names.items():
-        if save_key in saves:
-            save_info = saves[save_key]
-            save_details = f"Mod: {save_info['ability_mod']:+} | Prof: +{save_info['prof_bonus']}"
-            saves_rows.append([save_name, f"+{save_info['total']}", save_details])
-
-    skill_names_pt = {
-        "acrobatics": "Acrobacia",
-        "arcana": "Arcanismo",
-        "athletics": "Atletismo",
-        "crafting": "Oficio",
-        "deception": "Dissimulacao",
-        "diplomacy": "Diplomacia",
-        "intimidation": "Intimidacao",
-        "medicine": "Medicina",
-        "nature": "Natureza",
-        "occultism": "Ocultismo",
-        "performance": "Atuacao",
-        "religion": "Religiao",
-        "society": "Sociedade",
-        "stealth": "Furtividade",
-        "survival": "Sobrevivencia",
-        "thievery": "Ladinagem",
+SHEET_CSS = """    :root {
+      --pf2e-green: #1f3f33;
+      --pf2e-gold: #b48b2f;
+      --pf2e-cream: #f6f1e7;
+      --pf2e-ink: #1b1b1b;
+      --pf2e-muted: #6b6b6b;
     }
-    skills_rows = []
-    ordered_skill_keys = list(skill_names_pt.keys()) + [k for k in skills.keys() if k not in skill_names_pt]
-    for skill_key in ordered_skill_keys:
-        skill_info = skills.get(skill_key)
-        if not skill_info:
-            continue
-        label = skill_info.get("label") if isinstance(skill_info, dict) else ""
-        if label:
-            skill_name = label
-        elif "lore" in skill_key:
-            skill_name = f"Lore: {skill_key.replace('lore', '').strip().title()}".strip()
-        else:
-            skill_name = skill_names_pt.get(skill_key, skill_key.upper())
-        skills_rows.append([
-            skill_name,
-            f"{skill_info['total']:+}",
-        ])
-
-    weapons = analyzer.get_items_by_type("weapon")
-    armors = analyzer.get_items_by_type("armor")
-    shields = analyzer.get_items_by_type("shield")
-    equipment = analyzer.get_items_by_type("equipment")
-    consumables = analyzer.get_items_by_type("consumable")
-    treasures = analyzer.get_items_by_type("treasure")
-    backpacks = analyzer.get_items_by_type("backpack")
-    actions = analyzer.get_items_by_type("action")
-    spell_entries = analyzer.get_items_by_type("spellcastingEntry")
-    spells = analyzer.get_items_by_type("spell")
-    ancestries = analyzer.get_items_by_type("ancestry")
-    heritages = analyzer.get_items_by_type("heritage")
-    classes = analyzer.get_items_by_type("class")
-    backgrounds = analyzer.get_items_by_type("background")
-
-    all_items = analyzer.data.get("items", [])
-    contained_ids = {i.get("system", {}).get("containerId") for i in all_items if i.get("system", {}).get("containerId")}
-    equipment_loose = [i for i in equipment if not i.get("system", {}).get("containerId")]
-    consumables_loose = [i for i in consumables if not i.get("system", {}).get("containerId")]
-    treasures_loose = [i for i in treasures if not i.get("system", {}).get("containerId")]
-
-    speed = extract_value(attributes.get("speed", ""))
-    initiative = extract_value(system.get("initiative", ""))
-    if isinstance(initiative, dict):
-        initiative_total = initiative.get("total")
-        if initiative_total is not None:
-            initiative = initiative_total
-        elif initiative.get("statistic") == "perception":
-            initiative = calculated.get("perception", {}).get("total", "")
-    senses = extract_value(attributes.get("senses", ""))
-    alignment = extract_value(details.get("alignment", ""))
-    deity = extract_value(details.get("deity", ""))
-    size = extract_value(details.get("size", ""))
-    languages = extract_value(details.get("languages", ""))
-    traits = system.get("traits", {}).get("traits", {}).get("value", "")
-
-    resistances = attributes.get("resistances", [])
-    immunities = attributes.get("immunities", [])
-    weaknesses = attributes.get("weaknesses", [])
-    resources = system.get("resources", {}) if isinstance(system.get("resources", {}), dict) else {}
-    exploration = system.get("exploration", [])
-    exploration_text = format_list(
-        [e.get("label") if isinstance(e, dict) else e for e in (exploration or [])],
-        empty_label="-",
-    )
-
-    resource_rows = []
-    for key, value in resources.items():
-        if key == "heroPoints":
-            continue
-        label = key.replace("_", " ").title()
-        formatted = format_resource_value(value)
-        if formatted:
-            resource_rows.append([label, formatted])
-
-    def list_items(items, max_items=20, item_formatter=None):
-        if not items:
-            return ""
-        seen = set()
-        lis = []
-        for item in items[:max_items]:
-            item_name = clean_text(item.get("name", ""))
-            if not item_name or item_name in seen:
-                continue
-            seen.add(item_name)
-            label = item_name
-            if item_formatter:
-                label = item_formatter(item, item_name)
-            quantity = item.get("system", {}).get("quantity", 1)
-            if quantity > 1:
-                lis.append(f"{label} (x{quantity})")
-            else:
-                lis.append(label)
-        return "".join(f"<li>{h(name)}</li>" for name in lis)
-
-    def format_weapon(item, item_name):
-        damage = item.get("system", {}).get("damage", {})
-        dice = damage.get("dice", 0)
-        die = damage.get("die", 0)
-        damage_type = clean_text(damage.get("damageType", ""))
-        damage_text = ""
-        if dice and die:
-            damage_text = f"{dice}{die}" if str(die).startswith("d") else f"{dice}d{die}"
-            if damage_type:
-                damage_text = f"{damage_text} {damage_type}"
-
-        range_value = item.get("system", {}).get("range", None)
-        range_text = ""
-        if isinstance(range_value, dict):
-            range_value = range_value.get("value", "")
-        if range_value:
-            range_text = f"alcance {range_value}"
-
-        traits = item.get("system", {}).get("traits", {}).get("value", [])
-        traits_text = ", ".join(clean_text(t) for t in traits if clean_text(t))
-
-        bonus = item.get("system", {}).get("bonus", {}).get("value", 0)
-        bonus_text = f"bonus +{bonus}" if bonus else ""
-
-        runes = item.get("system", {}).get("runes", {})
-        potency = runes.get("potency", 0)
-        striking = runes.get("striking", 0)
-        properties = runes.get("property", []) or []
-        rune_parts = []
-        if potency:
-            rune_parts.append(f"+{potency}")
-        if striking:
-            rune_parts.append("striking" if striking == 1 else f"striking {striking}")
-        for prop in properties:
-            if prop:
-                rune_parts.append(clean_text(prop))
-        rune_text = ", ".join(rune_parts)
-
-        parts = [item_name]
-        if damage_text:
-            parts.append(damage_text)
-        if range_text:
-            parts.append(range_text)
-        if bonus_text:
-            parts.append(bonus_text)
-        if rune_text:
-            parts.append(f"runas: {rune_text}")
-        if traits_text:
-            parts.append(f"tracos: {traits_text}")
-        return " — ".join(parts) if len(parts) > 1 else item_name
-
-    def estimate_attack_bonus(item):
-        level = info["level"]
-        proficiency_ranks = {0: 0, 1: level, 2: level + 4, 3: level + 8, 4: level + 12}
-        weapon_profs = attacks.get("weapon_proficiencies", {})
-
-        system_item = item.get("system", {})
-        traits = system_item.get("traits", {}).get("value", []) or []
-        traits = [clean_text(t).lower() for t in traits if clean_text(t)]
-        is_thrown = "thrown" in traits
-        is_finesse = "finesse" in traits
-
-        range_value = system_item.get("range", None)
-        if isinstance(range_value, dict):
-            range_value = range_value.get("value", "")
-        is_ranged = bool(range_value)
-
-        if is_ranged and not is_thrown:
-            ability_mod = ability_mods.get("dex", 0)
-        elif is_finesse:
-            ability_mod = max(ability_mods.get("str", 0), ability_mods.get("dex", 0))
-        else:
-            ability_mod = ability_mods.get("str", 0)
-
-        category = system_item.get("category", "")
-        rank = weapon_profs.get(category, attacks["melee"]["proficiency"])
-        prof_bonus = proficiency_ranks.get(rank, 0)
-
-        bonus = system_item.get("bonus", {}).get("value", 0) or 0
-        potency = system_item.get("runes", {}).get("potency", 0) or 0
-        return prof_bonus + ability_mod + bonus + potency
-
-    def format_weapon_damage(system_item):
-        damage = system_item.get("damage", {})
-        dice = damage.get("dice", 0)
-        die = damage.get("die", "")
-        damage_type = clean_text(damage.get("damageType", ""))
-        striking = system_item.get("runes", {}).get("striking", 0) or 0
-        if not (dice and die):
-            return "-"
-        die_text = str(die) if str(die).startswith("d") else f"d{die}"
-        total_dice = dice * (1 + striking)
-        parts = [f"{total_dice}{die_text}"]
-        if damage_type:
-            parts.append(damage_type)
-        splash = system_item.get("splashDamage", {}).get("value", 0) or 0
-        if splash:
-            parts.append(f"+{splash} respingo")
-        return " ".join(parts)
-
-    def build_attack_buttons(attack_bonus, agile=False):
-        map_first = 4 if agile else 5
-        map_second = 8 if agile else 10
-        return [
-            ("attack", f"GOLPEAR {attack_bonus:+}"),
-            ("attack", f"{attack_bonus - map_first:+} (PAM -{map_first})"),
-            ("attack", f"{attack_bonus - map_second:+} (PAM -{map_second})"),
-        ]
-
-    def build_draw_actions(system_item):
-        equipped = system_item.get("equipped", {})
-        hands_held = equipped.get("handsHeld", 0) if isinstance(equipped, dict) else 0
-        if hands_held:
-            return []
-
-        usage = clean_text(system_item.get("usage", {}).get("value", "")).lower()
-        traits = system_item.get("traits", {}).get("value", []) or []
-        traits = [clean_text(t).lower() for t in traits if clean_text(t)]
-
-        actions_list = []
-        if "held-in-one-hand" in usage:
-            actions_list.append("SACAR (1M)")
-        if "held-in-two-hands" in usage or any(t.startswith("two-hand") for t in traits):
-            actions_list.append("SACAR (2M)")
-        return actions_list
-
-    def build_attack_profiles():
-        profiles = []
-
-        # Strike desarmado e sintetico no PF2e; montamos com os dados calculados da ficha.
-        unarmed_bonus = attacks.get("melee", {}).get("total")
-        if isinstance(unarmed_bonus, int):
-            profiles.append({
-                "name": "Ataque Desarmado",
-                "buttons": build_attack_buttons(unarmed_bonus, agile=True),
-                "details": ["Base da ficha", "Dano base 1d4 contundente"],
-                "utility": [],
-            })
-
-        for item in weapons:
-            item_name = clean_text(item.get("name", ""))
-            if not item_name:
-                continue
-
-            system_item = item.get("system", {})
-            traits = system_item.get("traits", {}).get("value", []) or []
-            traits = [clean_text(t) for t in traits if clean_text(t)]
-            agile = any(t.lower() == "agile" for t in traits)
-
-            attack_bonus = estimate_attack_bonus(item)
-            damage_text = format_weapon_damage(system_item)
-            range_value = system_item.get("range", "")
-            if isinstance(range_value, dict):
-                range_value = range_value.get("value", "")
-            reload_value = clean_text(system_item.get("reload", {}).get("value", ""))
-            details = [f"Dano {damage_text}"]
-            if range_value:
-                details.append(f"Alcance {range_value}")
-            if reload_value and reload_value != "-":
-                details.append(f"Recarga {reload_value}")
-            if traits:
-                details.append("Tracos: " + ", ".join(traits))
-
-            profiles.append({
-                "name": item_name,
-                "buttons": build_attack_buttons(attack_bonus, agile=agile),
-                "details": details,
-                "utility": build_draw_actions(system_item),
-            })
-        return profiles
-
-    def render_attack_cards():
-        profiles = build_attack_profiles()
-        if not profiles:
-            return ""
-        cards_html = []
-        for profile in profiles:
-            buttons = "".join(
-                f"<span class=\"atk-btn atk-btn-{kind}\">{h(label)}</span>"
-                for kind, label in profile.get("buttons", [])
-            )
-            utility = "".join(f"<span class=\"atk-btn atk-btn-utility\">{h(label)}</span>" for label in profile.get("utility", []))
-            details = " | ".join(h(part) for part in profile.get("details", []) if part)
-            utility_row = f"<div class=\"atk-buttons atk-buttons-utility\">{utility}</div>" if utility else ""
-            cards_html.append(f"""
-        <article class="atk-card">
-          <div class="atk-body">
-            <div class="atk-name">{h(profile['name'])}</div>
-            <div class="atk-buttons">{buttons}</div>
-            <div class="atk-details">{details}</div>
-            {utility_row}
-          </div>
-        </article>
-""")
-        return f"<div class=\"attack-stack\">{''.join(cards_html)}</div>"
-
-    def format_armor(item, item_name):
-        ac_bonus = item.get("system", {}).get("acBonus", 0)
-        dex_cap = item.get("system", {}).get("dexCap", "")
-        check_penalty = item.get("system", {}).get("checkPenalty", "")
-        parts = [item_name, f"+{ac_bonus} CA"]
-        if dex_cap != "" and dex_cap is not None:
-            parts.append(f"DEX cap {dex_cap}")
-        if check_penalty not in ("", None, 0):
-            parts.append(f"penalidade {check_penalty}")
-        return " — ".join(parts)
-
-    def format_shield(item, item_name):
-        ac_bonus = item.get("system", {}).get("acBonus", 0)
-        return f"{item_name} — +{ac_bonus} CA"
-
-    def format_treasure(item, item_name):
-        price = item.get("system", {}).get("price", {}).get("value", {})
-        if isinstance(price, dict) and price:
-            price_text = " ".join(f"{v}{k}" for k, v in price.items())
-            return f"{item_name} — {price_text}".strip()
-        return item_name
-
-    def format_action(item, item_name):
-        action_type = item.get("system", {}).get("actionType", {}).get("value", "")
-        actions_value = item.get("system", {}).get("actions", {}).get("value", "")
-        if action_type == "action" and actions_value:
-            return f"{item_name} — {actions_value} acao"
-        if action_type:
-            return f"{item_name} — {action_type}"
-        return item_name
-
-    def group_backpacks():
-        if not backpacks:
-            return ""
-        items_by_container = {}
-        for item in analyzer.data.get("items", []):
-            container_id = item.get("system", {}).get("containerId")
-            if container_id:
-                items_by_container.setdefault(container_id, []).append(item)
-        blocks = []
-        for backpack in backpacks:
-            pack_id = backpack.get("_id")
-            pack_name = clean_text(backpack.get("name", "Mochila"))
-            contents = items_by_container.get(pack_id, [])
-            contents_list = list_items(contents, max_items=50)
-            block = f"<div class='card'><h3>{h(pack_name)}</h3><ul>{contents_list}</ul></div>"
-            blocks.append(block)
-        return "".join(blocks)
-
-    def format_spell_details(item):
-        system_item = item.get("system")
-        if not isinstance(system_item, dict):
-            system_item = {}
-        level = get_nested_value(system_item, "level", "value", default="")
-        time = get_nested_value(system_item, "time", "value", default="")
-        rng = get_nested_value(system_item, "range", "value", default="")
-        duration = get_nested_value(system_item, "duration", "value", default="")
-        target = get_nested_value(system_item, "target", "value", default="")
-        area = get_nested_value(system_item, "area", "value", default="")
-        requirements = system_item.get("requirements") or ""
-        defense = system_item.get("defense") or {}
-        defense_text = ""
-        if isinstance(defense, dict):
-            save = defense.get("save", {})
-            if isinstance(save, dict) and save.get("statistic"):
-                save_name = save.get("statistic", "").title()
-                if save.get("basic"):
-                    defense_text = f"Teste: {save_name} (basico)"
-                else:
-                    defense_text = f"Teste: {save_name}"
-        traits = get_nested_value(system_item, "traits", "value", default=[])
-        trait_text = ", ".join(clean_text(t) for t in traits if clean_text(t))
-        parts = []
-        if level != "":
-            parts.append(f"nivel {level}")
-        if time:
-            parts.append(f"acao {time}")
-        if rng:
-            parts.append(f"alcance {rng}")
-        if target:
-            parts.append(f"alvo {target}")
-        if area:
-            parts.append(f"area {area}")
-        if duration:
-            parts.append(f"duracao {duration}")
-        if requirements:
-            parts.append(f"requisitos {requirements}")
-        if defense_text:
-            parts.append(defense_text)
-        if trait_text:
-            parts.append(f"tracos: {trait_text}")
-        return " — ".join(parts)
-
-    def format_spell_description(item):
-        system_item = item.get("system")
-        if not isinstance(system_item, dict):
-            system_item = {}
-        description = get_nested_value(system_item, "description", "value", default="")
-        cleaned = clean_description(description)
-        return cleaned
-
-    def render_spells_by_entry():
-        if not spell_entries:
-            return "<div class='note'>Nenhuma entrada de magia encontrada.</div>"
-        spells_by_entry = {}
-        for spell in spells:
-            location = spell.get("system", {}).get("location", {}).get("value", "")
-            if location:
-                spells_by_entry.setdefault(location, []).append(spell)
-        blocks = []
-        for entry in spell_entries:
-            entry_id = entry.get("_id")
-            entry_name = clean_text(entry.get("name", "Entrada de Magias"))
-            system_entry = entry.get("system")
-            if not isinstance(system_entry, dict):
-                system_entry = {}
-            tradition = get_nested_value(system_entry, "tradition", "value", default="")
-            prepared = get_nested_value(system_entry, "prepared", "value", default="")
-            header = entry_name
-            if tradition:
-                header += f" ({tradition})"
-            if prepared:
-                header += f" — {prepared}"
-            entry_spells = spells_by_entry.get(entry_id, [])
-            lis = ""
-            for spell in entry_spells:
-                name = clean_text(spell.get("name", ""))
-                details = format_spell_details(spell)
-                description = format_spell_description(spell)
-                description_html = html.escape(description).replace("\n", "<br>") if description else ""
-                lis += f"<li><div class='spell-name'>{h(name)}</div>"
-                if details:
-                    lis += f"<div class='spell-meta'>{h(details)}</div>"
-                if description_html:
-                    lis += f"<div class='spell-desc'>{description_html}</div>"
-                lis += "</li>"
-            blocks.append(f"<div class='card'><h3>{h(header)}</h3><ul>{lis}</ul></div>")
-        return "".join(blocks)
-
-    def list_feats(category):
-        if not feats.get(category):
-            return ""
-        lis = []
-        for feat in feats[category]:
-            lis.append(f"{feat['name']} (Nivel {feat['level']})")
-        return "".join(f"<li>{h(name)}</li>" for name in lis)
-
-    generated_at = datetime.now().strftime("%d/%m/%Y %H:%M")
-    key_ability_map = {
-        "str": "Forca",
-        "dex": "Destreza",
-        "con": "Constituicao",
-        "int": "Inteligencia",
-        "wis": "Sabedoria",
-        "cha": "Carisma",
+    * { box-sizing: border-box; }
+    body {
+      margin: 0;
+      font-family: "Palatino Linotype", "Book Antiqua", Palatino, serif;
+      color: var(--pf2e-ink);
+      background: var(--pf2e-cream);
     }
-    key_ability_label = key_ability_map.get(info["key_ability"], info["key_ability"]).strip()
-    class_key_ability_label = key_ability_map.get(
-        info.get("class_key_ability", ""), info.get("class_key_ability", "")
-    ).strip()
-    key_ability_display = key_ability_label
-    if class_key_ability_label and class_key_ability_label.lower() != key_ability_label.lower():
-        key_ability_display = f"{key_ability_label} (classe: {class_key_ability_label})"
-    details_rows = [
-        ["Nome", info["name"]],
-        ["Nivel", info["level"]],
-        ["Pontos de Vida", f"{info['hp']} (+{info['temp_hp']} temp)"],
-        ["Pontos de Heroi", f"{info['hero_points']}/{info['max_hero_points']}"],
-        ["Experiencia", f"{info['xp']}/1000"],
-        ["Atributo-chave", key_ability_display],
-    ]
-
-    summary_cards = ""
-    if sections.summary_stats:
-        summary_cards += f"""
-    <div class="grid-3">
-      <div class="card">
-        <h3>Vida</h3>
-        <div class="stat">{info['hp']}</div>
-        <div class="note">Temporario: +{info['temp_hp']}</div>
-      </div>
-      <div class="card">
-        <h3>Classe de Armadura</h3>
-        <div class="stat">{ac_info['total']}</div>
-        <div class="note">Armadura +{ac_info['armor_bonus']} | Escudo +{ac_info['shield_bonus']}</div>
-      </div>
-      <div class="card">
-        <h3>Percepcao</h3>
-        <div class="stat">+{perception['total']}</div>
-        <div class="note">Sab {perception['wis_mod']:+} | Prof +{perception['prof_bonus']}</div>
-      </div>
-    </div>
-"""
-    if sections.summary_attributes:
-        summary_cards += f"""
-    <div class="grid-2" style="margin-top: 12px;">
-      <div class="card">
-        <h3>Atributos</h3>
-        {render_table(["Atributo", "Valor", "Mod"], attributes_rows)}
-      </div>
-"""
-    if sections.summary_defenses:
-        summary_cards += f"""
-      <div class="card">
-        <h3>Defesas</h3>
-        {render_table(["Teste", "Total", "Detalhes"], saves_rows)}
-        <div class="note" style="margin-top:8px;">Ataque corpo a corpo: +{attacks['melee']['total']}</div>
-      </div>
-"""
-    if sections.summary_attributes or sections.summary_defenses:
-        summary_cards += """
-    </div>
-"""
-    if sections.summary_skills:
-        summary_cards += f"""
-    <div class="card" style="margin-top: 12px;">
-      <h3>Pericias (Totais)</h3>
-      {render_table(["Pericia", "Total"], skills_rows)}
-    </div>
-"""
-
-    attack_cards_html = render_attack_cards()
-    summary_combat_cards = []
-    if attack_cards_html:
-        summary_combat_cards.append(f"""
-      <div class="card" style="margin-top: 12px;">
-        <h3>Ataques</h3>
-        {attack_cards_html}
-      </div>
-""")
-    summary_actions_card = ""
-    if sections.info_actions and actions:
-        summary_actions_card = f"""
-      <div class="card" style="margin-top: 12px;">
-        <h3>Acoes e Atividades</h3>
-        <ul>{list_items(actions, 30, format_action)}</ul>
-      </div>
-"""
-        summary_combat_cards.append(summary_actions_card)
-
-    if summary_combat_cards:
-        if len(summary_combat_cards) == 1:
-            summary_cards += summary_combat_cards[0]
-        else:
-            summary_cards += f"""
-    <div class="grid-2" style="margin-top: 12px;">
-      {''.join(summary_combat_cards)}
-    </div>
-"""
-    summary_section = ""
-    if sections.summary and summary_cards.strip():
-        summary_section = f"""
-  <section class="page">
-    <header>
-      <div>
-        <div class="title">{h(info['name'])}</div>
-        <div class="subtitle">Pathfinder 2E • Nivel {info['level']} • Gerado em {generated_at}</div>
-      </div>
-      <div>
-        <div class="chip">XP {info['xp']}/1000</div>
-        <div class="chip">Heroi {info['hero_points']}/{info['max_hero_points']}</div>
-      </div>
-    </header>
-{summary_cards}
-  </section>
-"""
-
-    talents_cards = ""
-    if sections.talents:
-        talents_cards = f"""
-    <div class="grid-2">
-      <div class="card">
-        <h3>Talentos de Ancestralidade</h3>
-        <ul>{list_feats("ancestry")}</ul>
-        <h3 style="margin-top:12px;">Talentos de Classe</h3>
-        <ul>{list_feats("class")}</ul>
-      </div>
-      <div class="card">
-        <h3>Talentos de Pericia</h3>
-        <ul>{list_feats("skill")}</ul>
-        <h3 style="margin-top:12px;">Talentos Gerais</h3>
-        <ul>{list_feats("general")}</ul>
-      </div>
-    </div>
-"""
-
-    equipment_cards = ""
-    if sections.equipment:
-        equipment_cards = f"""
-    <div class="grid-2" style="margin-top: 12px;">
-      <div class="card">
-        <h3>Armas</h3>
-        <ul>{list_items(weapons, 12, format_weapon)}</ul>
-        <h3 style="margin-top:12px;">Protecao</h3>
-        <ul>{list_items(armors, 6, format_armor)}{list_items(shields, 6, format_shield)}</ul>
-      </div>
-      <div class="card">
-        <h3>Itens e Consumiveis</h3>
-        <ul>{list_items(equipment_loose, 30)}</ul>
-        <h3 style="margin-top:12px;">Consumiveis</h3>
-        <ul>{list_items(consumables_loose, 20)}</ul>
-        <h3 style="margin-top:12px;">Tesouros</h3>
-        <ul>{list_items(treasures_loose, 20, format_treasure)}</ul>
-      </div>
-    </div>
-"""
-
-    inventory_notes_card = ""
-    if sections.inventory_notes:
-        inventory_notes_card = """
-    <div class="card" style="margin-top: 12px;">
-      <h3>Anotacoes de Inventario</h3>
-      <div class="notes-box"></div>
-    </div>
-"""
-
-    backpacks_cards = ""
-    if sections.equipment and backpacks:
-        backpacks_cards = f"""
-    <div class="grid-2" style="margin-top: 12px;">
-      {group_backpacks()}
-    </div>
-"""
-
-    talents_equipment_section = ""
-    if sections.talents_equipment:
-        if talents_cards:
-            talents_equipment_section += f"""
-  <section class="page">
-    <header>
-      <div>
-        <div class="title">Talentos</div>
-        <div class="subtitle">{h(info['name'])} • Nivel {info['level']}</div>
-      </div>
-      <div class="chip">Atributo-chave: {h(key_ability_display)}</div>
-    </header>
-{talents_cards}
-  </section>
-"""
-        if equipment_cards or inventory_notes_card or backpacks_cards:
-            talents_equipment_section += f"""
-  <section class="page">
-    <header>
-      <div>
-        <div class="title">Equipamentos</div>
-        <div class="subtitle">{h(info['name'])} • Nivel {info['level']}</div>
-      </div>
-      <div class="chip">Atributo-chave: {h(key_ability_display)}</div>
-    </header>
-{equipment_cards}
-{backpacks_cards}
-{inventory_notes_card}
-  </section>
-"""
-
-    details_card = ""
-    if sections.info_details:
-        details_card = f"""
-    <div class="card">
-      <h3>Detalhes</h3>
-      {render_table(["Campo", "Valor"], details_rows)}
-    </div>
-"""
-
-    physical_origin_card = ""
-    if sections.info_physical or sections.info_origin:
-        physical_block = ""
-        origin_block = ""
-        if sections.info_physical:
-            physical_block = f"""
-      <div class="card">
-        <h3>Informacoes Fisicas</h3>
-        {render_table(["Campo", "Valor"], [
-          ["Idade", info.get("age", "")],
-          ["Altura", info.get("height", "")],
-          ["Peso", info.get("weight", "")],
-          ["Genero", info.get("gender", "")],
-          ["Etnia", info.get("ethnicity", "")],
-          ["Nacionalidade", info.get("nationality", "")],
-        ])}
-      </div>
-"""
-        if sections.info_origin:
-            origin_block = f"""
-      <div class="card">
-        <h3>Origem</h3>
-        <div class="note">Ancestralidade</div>
-        <ul>{list_items(ancestries, 5)}</ul>
-        <div class="note" style="margin-top:8px;">Heranca</div>
-        <ul>{list_items(heritages, 5)}</ul>
-        <div class="note" style="margin-top:8px;">Classe</div>
-        <ul>{list_items(classes, 5)}</ul>
-        <div class="note" style="margin-top:8px;">Antecedente</div>
-        <ul>{list_items(backgrounds, 5)}</ul>
-      </div>
-"""
-        physical_origin_card = f"""
-    <div class="grid-2" style="margin-top: 12px;">
-{physical_block}{origin_block}
-    </div>
-"""
-
-    data_resist_card = ""
-    if sections.info_data or sections.info_resist:
-        data_block = ""
-        resist_block = ""
-        if sections.info_data:
-            data_block = f"""
-      <div class="card">
-        <h3>Dados do Personagem</h3>
-        {render_table(["Campo", "Valor"], [
-          ["Tamanho", size],
-          ["Alinhamento", alignment],
-          ["Deidade", deity],
-          ["Idiomas", format_list(languages)],
-          ["Traits", format_list(traits)],
-          ["Velocidade", speed],
-          ["Iniciativa", initiative],
-          ["Sentidos", format_list(senses)],
-          ["Exploracao", exploration_text],
-        ])}
-        {render_table(["Recurso", "Valor"], resource_rows)}
-      </div>
-"""
-        if sections.info_resist:
-            resist_block = f"""
-      <div class="card">
-        <h3>Resistencias e Imunidades</h3>
-        {render_table(["Tipo", "Detalhes"], [
-          ["Resistencias", format_typed_entries(resistances)],
-          ["Imunidades", format_typed_entries(immunities)],
-          ["Fraquezas", format_typed_entries(weaknesses)],
-        ])}
-      </div>
-"""
-        data_resist_card = f"""
-    <div class="grid-2" style="margin-top: 12px;">
-{data_block}{resist_block}
-    </div>
-"""
-
-    actions_card = ""
-    if sections.info_actions and actions and not sections.summary:
-        actions_card = f"""
-    <div class="card" style="margin-top: 12px;">
-      <h3>Acoes e Atividades</h3>
-      <ul>{list_items(actions, 30, format_action)}</ul>
-    </div>
-"""
-
-    info_section = ""
-    if sections.info and (details_card or physical_origin_card or data_resist_card or actions_card):
-        info_section = f"""
-  <section class="page">
-    <header>
-      <div>
-        <div class="title">Informacoes do Personagem</div>
-        <div class="subtitle">{h(info['name'])}</div>
-      </div>
-      <div class="chip">Nivel {info['level']}</div>
-    </header>
-{details_card}
-{physical_origin_card}
-{data_resist_card}
-{actions_card}
-  </section>
-"""
-
-    spells_cards = ""
-    if sections.spells_list:
-        spells_cards += f"""
-    <div class="grid-2">
-      {render_spells_by_entry()}
-    </div>
-"""
-    if sections.spells_resources:
-        spells_cards += """
-    <div class="card" style="margin-top: 12px;">
-      <h3>Foco e Recursos</h3>
-      <div class="note">Espaco reservado para foco e recursos magicos.</div>
-    </div>
-"""
-    if sections.spells_notes:
-        spells_cards += """
-    <div class="card" style="margin-top: 12px;">
-      <h3>Anotacoes de Magias</h3>
-      <div class="notes-box"></div>
-    </div>
-"""
-
-    spells_section = ""
-    if sections.spells and spells_cards.strip():
-        spells_section = f"""
-  <section class="page">
-    <header>
-      <div>
-        <div class="title">Magias</div>
-        <div class="subtitle">{h(info['name'])} • Nivel {info['level']}</div>
-      </div>
-      <div class="chip">Atributo-chave: {h(key_ability_display)}</div>
-    </header>
-{spells_cards}
-  </section>
-"""
-
-    html_out = f"""<!doctype html>
-<html lang="pt-BR">
-<head>
-  <meta charset="utf-8" />
-  <title>{h(output_title)}</title>
-  <style>
-    :root {{
-      --pf2e-green: #1f3f33;
-      --pf2e-gold: #b48b2f;
-      --pf2e-cream: #f6f1e7;
-      --pf2e-ink: #1b1b1b;
-      --pf2e-muted: #6b6b6b;
-    }}
-    * {{ box-sizing: border-box; }}
-    body {{
-      margin: 0;
-      font-family: "Palatino Linotype", "Book Antiqua", Palatino, serif;
-      color: var(--pf2e-ink);
-      background: var(--pf2e-cream);
-    }}
-    .page {{
+    .page {
       width: 210mm;
       min-height: 297mm;
       padding: 16mm 14mm;
@@ -1370,27 +886,27 @@ def generate_html(analyzer, output_title, sections: SectionFlags):
       background: #fff;
       box-shadow: 0 4px 18px rgba(0,0,0,0.12);
       page-break-after: always;
-    }}
-    .page:last-child {{ page-break-after: auto; }}
-    header {{
+    }
+    .page:last-child { page-break-after: auto; }
+    header {
       display: grid;
       grid-template-columns: 1fr auto;
       gap: 12px;
       border-bottom: 2px solid var(--pf2e-gold);
       padding-bottom: 8px;
       margin-bottom: 12px;
-    }}
-    .title {{
+    }
+    .title {
       font-size: 22px;
       font-weight: 700;
       color: var(--pf2e-green);
       letter-spacing: 0.5px;
-    }}
-    .subtitle {{
+    }
+    .subtitle {
       font-size: 12px;
       color: var(--pf2e-muted);
-    }}
-    .chip {{
+    }
+    .chip {
       display: inline-flex;
       align-items: center;
       justify-content: center;
@@ -1400,107 +916,107 @@ def generate_html(analyzer, output_title, sections: SectionFlags):
       border-radius: 999px;
       font-size: 12px;
       background: #fff8e8;
-    }}
-    .grid-2 {{
+    }
+    .grid-2 {
       display: grid;
       grid-template-columns: 1fr 1fr;
       gap: 12px;
-    }}
-    .grid-3 {{
+    }
+    .grid-3 {
       display: grid;
       grid-template-columns: 1fr 1fr 1fr;
       gap: 12px;
-    }}
-    .card {{
+    }
+    .card {
       border: 1px solid #e2d7c3;
       background: #fffdf8;
       padding: 10px 12px;
       border-radius: 8px;
       break-inside: avoid;
       page-break-inside: avoid;
-    }}
-    .card h3 {{
+    }
+    .card h3 {
       margin: 0 0 6px 0;
       font-size: 12px;
       letter-spacing: 0.8px;
       text-transform: uppercase;
       color: var(--pf2e-green);
-    }}
-    .stat {{
+    }
+    .stat {
       font-size: 20px;
       font-weight: 700;
       color: var(--pf2e-green);
-    }}
-    table {{
+    }
+    table {
       width: 100%;
       border-collapse: collapse;
       font-size: 11.5px;
-    }}
-    th, td {{
+    }
+    th, td {
       padding: 5px 7px;
       border-bottom: 1px solid #e6dccb;
       text-align: left;
       vertical-align: top;
-    }}
-    th {{
+    }
+    th {
       text-transform: uppercase;
       font-size: 11px;
       color: var(--pf2e-green);
       letter-spacing: 0.6px;
       background: #f5efe2;
-    }}
-    ul {{
+    }
+    ul {
       margin: 0;
       padding-left: 18px;
       font-size: 12px;
-    }}
-    li {{
+    }
+    li {
       margin: 2px 0;
-    }}
-    .spell-name {{
+    }
+    .spell-name {
       font-weight: 700;
       color: var(--pf2e-green);
-    }}
-    .spell-meta {{
+    }
+    .spell-meta {
       font-size: 11px;
       color: var(--pf2e-muted);
       margin-top: 2px;
-    }}
-    .spell-desc {{
+    }
+    .spell-desc {
       font-size: 11px;
       color: var(--pf2e-ink);
       margin-top: 6px;
       line-height: 1.35;
-    }}
-    .note {{
+    }
+    .note {
       font-size: 11px;
       color: var(--pf2e-muted);
-    }}
-    .attack-stack {{
+    }
+    .attack-stack {
       display: grid;
       gap: 10px;
-    }}
-    .atk-card {{
+    }
+    .atk-card {
       display: block;
       padding: 8px;
       border: 1px solid #dfd3bf;
       border-radius: 8px;
       background: linear-gradient(180deg, #fffdfa 0%, #fbf5ea 100%);
-    }}
-    .atk-name {{
+    }
+    .atk-name {
       font-size: 22px;
       line-height: 1.05;
       color: #2f2f2f;
       font-weight: 700;
       margin-bottom: 4px;
-    }}
-    .atk-buttons {{
+    }
+    .atk-buttons {
       display: flex;
       flex-wrap: wrap;
       gap: 6px;
       margin-bottom: 5px;
-    }}
-    .atk-btn {{
+    }
+    .atk-btn {
       display: inline-flex;
       align-items: center;
       justify-content: center;
@@ -1512,40 +1028,40 @@ def generate_html(analyzer, output_title, sections: SectionFlags):
       letter-spacing: 0.4px;
       border: 1px solid transparent;
       white-space: nowrap;
-    }}
-    .atk-btn-attack {{
+    }
+    .atk-btn-attack {
       color: #fff;
       background: #163a8a;
       border-color: #0f2d71;
-    }}
-    .atk-btn-result {{
+    }
+    .atk-btn-result {
       color: #fff;
       background: #8e1f11;
       border-color: #6f160b;
-    }}
-    .atk-btn-utility {{
+    }
+    .atk-btn-utility {
       color: #1f1f1f;
       background: #f7f3eb;
       border-color: #d8cab2;
-    }}
-    .atk-buttons-utility {{
+    }
+    .atk-buttons-utility {
       margin-bottom: 0;
       margin-top: 4px;
-    }}
-    .atk-details {{
+    }
+    .atk-details {
       font-size: 11px;
       color: #5f5b53;
       line-height: 1.25;
-    }}
-    @media (max-width: 800px) {{
-      .atk-name {{
+    }
+    @media (max-width: 800px) {
+      .atk-name {
         font-size: 19px;
-      }}
-      .atk-btn {{
+      }
+      .atk-btn {
         font-size: 11px;
-      }}
-    }}
-    .notes-box {{
+      }
+    }
+    .notes-box {
       min-height: 90mm;
       border: 1px dashed #d8c9b1;
       border-radius: 8px;
@@ -1558,74 +1074,1850 @@ def generate_html(analyzer, output_title, sections: SectionFlags):
       padding: 10px 12px;
       font-size: 12px;
       color: var(--pf2e-muted);
-    }}
-    @page {{
+    }
+    @page {
       size: A4;
       margin: 12mm;
-    }}
-    @media print {{
-      body {{
+    }
+    @media print {
+      body {
         background: #fff;
-      }}
-      .page {{
+      }
+      .page {
         width: auto;
         min-height: auto;
         margin: 0;
         box-shadow: none;
-      }}
-    }}
-  </style>
-</head>
-<body>
-{summary_section}
-{talents_equipment_section}
-{info_section}
-{spells_section}
-</body>
-</html>
+      }
+    }
 """
-    return html_out
 
 
-def find_chrome_executable():
-    candidates = [
-        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
-        "/Applications/Chromium.app/Contents/MacOS/Chromium",
-        "google-chrome",
-        "chromium",
-        "chromium-browser",
-    ]
-    for candidate in candidates:
-        if os.path.isabs(candidate) and os.path.exists(candidate):
-            return candidate
-        path = shutil.which(candidate)
-        if path:
-            return path
-    return None
+class HtmlTemplate:
+    """Template compilado uma vez (na importacao) que escreve num buffer.
 
+    Os campos seguem a sintaxe de str.format ({nome}, {{ e }} literais).
+    Campos passados como constantes sao embutidos no texto ja na compilacao.
+    """
 
-def export_pdf(html_path, pdf_path):
-    chrome = find_chrome_executable()
-    if not chrome:
-        print("Aviso: Chrome/Chromium nao encontrado. HTML gerado, PDF nao exportado.")
-        return False
+    __slots__ = ("parts",)
 
-    cmd = [
-        chrome,
-        "--headless=new",
-        "--disable-gpu",
-        "--no-pdf-header-footer",
-        f"--print-to-pdf={pdf_path}",
-        str(html_path),
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print("Erro ao exportar PDF via Chrome:")
+    def __init__(self, source, **constants):
+        parts = []
+        literal_buffer = []
+        for literal, field, _spec, _conversion in Formatter().parse(source):
+            literal_buffer.append(literal)
+            if field is None:
+                continue
+            if field in constants:
+                literal_buffer.append(str(constants[field]))
+                continue
+            parts.append(("".join(literal_buffer), field))
+            literal_buffer = []
+        parts.append(("".join(literal_buffer), None))
+        self.parts = tuple(parts)
+
+    def render_into(self, out, **values):
+        for literal, field in self.parts:
+            if literal:
+                out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+
+    def render(self, **values):
+        out = []
+        self.render_into(out, **values)
+        return "".join(out)
+
+
+DOCUMENT_HEAD_TEMPLATE = HtmlTemplate("""<!doctype html>
+<html lang="pt-BR">
+<head>
+  <meta charset="utf-8" />
+  <title>{title}</title>
+  <style>
+{css}  {extra_css}</style>
+</head>
+<body>
+""", css=SHEET_CSS)
+DOCUMENT_TAIL_TEMPLATE = HtmlTemplate("""
+{extra_body}</body>
+</html>
+""")
+
+PAGE_HEAD_TEMPLATE = HtmlTemplate("""
+  <section class="page">
+    <header>
+      <div>
+        <div class="title">{title}</div>
+        <div class="subtitle">{subtitle}</div>
+      </div>
+      {chip}
+    </header>
+""")
+PAGE_TAIL = """
+  </section>
+"""
+SUMMARY_CHIPS_TEMPLATE = HtmlTemplate("""<div>
+        <div class="chip">XP {xp}/1000</div>
+        <div class="chip">Heroi {hero_points}/{max_hero_points}</div>
+      </div>""")
+CHIP_TEMPLATE = HtmlTemplate("""<div class="chip">{label}</div>""")
+
+SUMMARY_STATS_TEMPLATE = HtmlTemplate("""
+    <div class="grid-3">
+      <div class="card">
+        <h3>Vida</h3>
+        <div class="stat">{hp}</div>
+        <div class="note">Temporario: +{temp_hp}</div>
+      </div>
+      <div class="card">
+        <h3>Classe de Armadura</h3>
+        <div class="stat">{ac_total}</div>
+        <div class="note">Armadura +{armor_bonus} | Escudo +{shield_bonus}</div>
+      </div>
+      <div class="card">
+        <h3>Percepcao</h3>
+        <div class="stat">+{perception_total}</div>
+        <div class="note">Sab {wis_mod} | Prof +{perception_prof}</div>
+      </div>
+    </div>
+""")
+SUMMARY_ATTRIBUTES_TEMPLATE = HtmlTemplate("""
+    <div class="grid-2" style="margin-top: 12px;">
+      <div class="card">
+        <h3>Atributos</h3>
+        {table}
+      </div>
+""")
+SUMMARY_DEFENSES_TEMPLATE = HtmlTemplate("""
+      <div class="card">
+        <h3>Defesas</h3>
+        {table}
+        <div class="note" style="margin-top:8px;">Ataque corpo a corpo: +{melee_total}</div>
+      </div>
+""")
+GRID_CLOSE = """
+    </div>
+"""
+SUMMARY_SKILLS_TEMPLATE = HtmlTemplate("""
+    <div class="card" style="margin-top: 12px;">
+      <h3>Pericias (Totais)</h3>
+      {table}
+    </div>
+""")
+SUMMARY_ATTACKS_TEMPLATE = HtmlTemplate("""
+      <div class="card" style="margin-top: 12px;">
+        <h3>Ataques</h3>
+        {cards}
+      </div>
+""")
+SUMMARY_ACTIONS_TEMPLATE = HtmlTemplate("""
+      <div class="card" style="margin-top: 12px;">
+        <h3>Acoes e Atividades</h3>
+        <ul>{items}</ul>
+      </div>
+""")
+SUMMARY_COMBAT_GRID_TEMPLATE = HtmlTemplate("""
+    <div class="grid-2" style="margin-top: 12px;">
+      {cards}
+    </div>
+""")
+ATTACK_CARD_TEMPLATE = HtmlTemplate("""
+        <article class="atk-card">
+          <div class="atk-body">
+            <div class="atk-name">{name}</div>
+            <div class="atk-buttons">{buttons}</div>
+            <div class="atk-details">{details}</div>
+            {utility_row}
+          </div>
+        </article>
+""")
+
+TALENTS_TEMPLATE = HtmlTemplate("""
+    <div class="grid-2">
+      <div class="card">
+        <h3>Talentos de Ancestralidade</h3>
+        <ul>{ancestry}</ul>
+        <h3 style="margin-top:12px;">Talentos de Classe</h3>
+        <ul>{class_feats}</ul>
+      </div>
+      <div class="card">
+        <h3>Talentos de Pericia</h3>
+        <ul>{skill}</ul>
+        <h3 style="margin-top:12px;">Talentos Gerais</h3>
+        <ul>{general}</ul>
+      </div>
+    </div>
+""")
+EQUIPMENT_TEMPLATE = HtmlTemplate("""
+    <div class="grid-2" style="margin-top: 12px;">
+      <div class="card">
+        <h3>Armas</h3>
+        <ul>{weapons}</ul>
+        <h3 style="margin-top:12px;">Protecao</h3>
+        <ul>{armors}{shields}</ul>
+      </div>
+      <div class="card">
+        <h3>Itens e Consumiveis</h3>
+        <ul>{equipment}</ul>
+        <h3 style="margin-top:12px;">Consumiveis</h3>
+        <ul>{consumables}</ul>
+        <h3 style="margin-top:12px;">Tesouros</h3>
+        <ul>{treasures}</ul>
+      </div>
+    </div>
+""")
+INVENTORY_NOTES_HTML = """
+    <div class="card" style="margin-top: 12px;">
+      <h3>Anotacoes de Inventario</h3>
+      <div class="notes-box"></div>
+    </div>
+"""
+BACKPACKS_TEMPLATE = HtmlTemplate("""
+    <div class="grid-2" style="margin-top: 12px;">
+      {blocks}
+    </div>
+""")
+
+DETAILS_TEMPLATE = HtmlTemplate("""
+    <div class="card">
+      <h3>Detalhes</h3>
+      {table}
+    </div>
+""")
+PHYSICAL_TEMPLATE = HtmlTemplate("""
+      <div class="card">
+        <h3>Informacoes Fisicas</h3>
+        {table}
+      </div>
+""")
+ORIGIN_TEMPLATE = HtmlTemplate("""
+      <div class="card">
+        <h3>Origem</h3>
+        <div class="note">Ancestralidade</div>
+        <ul>{ancestries}</ul>
+        <div class="note" style="margin-top:8px;">Heranca</div>
+        <ul>{heritages}</ul>
+        <div class="note" style="margin-top:8px;">Classe</div>
+        <ul>{classes}</ul>
+        <div class="note" style="margin-top:8px;">Antecedente</div>
+        <ul>{backgrounds}</ul>
+      </div>
+""")
+DATA_TEMPLATE = HtmlTemplate("""
+      <div class="card">
+        <h3>Dados do Personagem</h3>
+        {table}
+        {resources_table}
+      </div>
+""")
+RESIST_TEMPLATE = HtmlTemplate("""
+      <div class="card">
+        <h3>Resistencias e Imunidades</h3>
+        {table}
+      </div>
+""")
+GRID_2_OPEN = """
+    <div class="grid-2" style="margin-top: 12px;">
+"""
+INFO_ACTIONS_TEMPLATE = HtmlTemplate("""
+    <div class="card" style="margin-top: 12px;">
+      <h3>Acoes e Atividades</h3>
+      <ul>{items}</ul>
+    </div>
+""")
+
+SPELLS_LIST_TEMPLATE = HtmlTemplate("""
+    <div class="grid-2">
+      {blocks}
+    </div>
+""")
+SPELLS_RESOURCES_HTML = """
+    <div class="card" style="margin-top: 12px;">
+      <h3>Foco e Recursos</h3>
+      <div class="note">Espaco reservado para foco e recursos magicos.</div>
+    </div>
+"""
+SPELLS_NOTES_HTML = """
+    <div class="card" style="margin-top: 12px;">
+      <h3>Anotacoes de Magias</h3>
+      <div class="notes-box"></div>
+    </div>
+"""
+
+
+def generate_html(analyzer, output_title, sections: SectionFlags, timings=None, extra_css="", extra_body=""):
+    return "".join(iter_html(analyzer, output_title, sections, timings, extra_css, extra_body))
+
+
+def attributes_rows(analyzer):
+    ability_scores = analyzer.derived("ability_scores")
+    ability_mods = analyzer.derived("ability_modifiers")
+    ability_names = {
+        "str": "Forca", "dex": "Destreza", "con": "Constituicao",
+        "int": "Inteligencia", "wis": "Sabedoria", "cha": "Carisma",
+    }
+    attributes_rows = []
+    for key, name in ability_names.items():
+        score = ability_scores.get(key, 10)
+        mod = ability_mods.get(key, 0)
+        attributes_rows.append([name, str(score), f"{mod:+}"])
+    return attributes_rows
+
+
+def saves_rows(analyzer):
+    saves = analyzer.derived("saves")
+    saves_rows = []
+    save_names = {"fortitude": "Fortitude", "reflex": "Reflexos", "will": "Vontade"}
+    for save_key, save_name in save_names.items():
+        if save_key in saves:
+            save_info = saves[save_key]
+            save_details = f"Mod: {save_info['ability_mod']:+} | Prof: +{save_info['prof_bonus']}"
+            saves_rows.append([save_name, f"+{save_info['total']}", save_details])
+    return saves_rows
+
+
+def skills_rows(analyzer):
+    skills = analyzer.derived("skills")
+    skill_names_pt = {
+        "acrobatics": "Acrobacia",
+        "arcana": "Arcanismo",
+        "athletics": "Atletismo",
+        "crafting": "Oficio",
+        "deception": "Dissimulacao",
+        "diplomacy": "Diplomacia",
+        "intimidation": "Intimidacao",
+        "medicine": "Medicina",
+        "nature": "Natureza",
+        "occultism": "Ocultismo",
+        "performance": "Atuacao",
+        "religion": "Religiao",
+        "society": "Sociedade",
+        "stealth": "Furtividade",
+        "survival": "Sobrevivencia",
+        "thievery": "Ladinagem",
+    }
+    skills_rows = []
+    ordered_skill_keys = list(skill_names_pt.keys()) + [k for k in skills.keys() if k not in skill_names_pt]
+    for skill_key in ordered_skill_keys:
+        skill_info = skills.get(skill_key)
+        if not skill_info:
+            continue
+        label = skill_info.get("label") if isinstance(skill_info, dict) else ""
+        if label:
+            skill_name = label
+        elif "lore" in skill_key:
+            skill_name = f"Lore: {skill_key.replace('lore', '').strip().title()}".strip()
+        else:
+            skill_name = skill_names_pt.get(skill_key, skill_key.upper())
+        skills_rows.append([
+            skill_name,
+            f"{skill_info['total']:+}",
+        ])
+    return skills_rows
+
+
+def estimate_attack_bonus(analyzer, item):
+    ability_mods = analyzer.derived("ability_modifiers")
+    attacks = analyzer.derived("attacks")
+    level = analyzer.get_character_info()["level"]
+    proficiency_ranks = {0: 0, 1: level, 2: level + 4, 3: level + 8, 4: level + 12}
+    weapon_profs = attacks.get("weapon_proficiencies", {})
+
+    traits = [clean_text(t).lower() for t in item.traits if clean_text(t)]
+    is_thrown = "thrown" in traits
+    is_finesse = "finesse" in traits
+    is_ranged = bool(item.range)
+
+    if is_ranged and not is_thrown:
+        ability_mod = ability_mods.get("dex", 0)
+    elif is_finesse:
+        ability_mod = max(ability_mods.get("str", 0), ability_mods.get("dex", 0))
+    else:
+        ability_mod = ability_mods.get("str", 0)
+
+    rank = weapon_profs.get(item.category, attacks["melee"]["proficiency"])
+    prof_bonus = proficiency_ranks.get(rank, 0)
+    return prof_bonus + ability_mod + item.bonus + item.potency
+
+
+def build_attack_profiles(analyzer):
+    profiles = []
+
+    # Strike desarmado e sintetico no PF2e; montamos com os dados calculados da ficha.
+    attacks = analyzer.derived("attacks")
+    unarmed_bonus = attacks.get("melee", {}).get("total")
+    if isinstance(unarmed_bonus, int):
+        profiles.append({
+            "name": "Ataque Desarmado",
+            "buttons": build_attack_buttons(unarmed_bonus, agile=True),
+            "details": ["Base da ficha", "Dano base 1d4 contundente"],
+            "utility": [],
+        })
+
+    for item in analyzer.get_items_by_type("weapon"):
+        item_name = clean_text(item.name)
+        if not item_name:
+            continue
+
+        traits = [clean_text(t) for t in item.traits if clean_text(t)]
+        agile = any(t.lower() == "agile" for t in traits)
+
+        attack_bonus = estimate_attack_bonus(analyzer, item)
+        damage_text = format_weapon_damage(item)
+        reload_value = clean_text(item.reload)
+        details = [f"Dano {damage_text}"]
+        if item.range:
+            details.append(f"Alcance {item.range}")
+        if reload_value and reload_value != "-":
+            details.append(f"Recarga {reload_value}")
+        if traits:
+            details.append("Tracos: " + ", ".join(traits))
+
+        profiles.append({
+            "name": item_name,
+            "buttons": build_attack_buttons(attack_bonus, agile=agile),
+            "details": details,
+            "utility": build_draw_actions(item),
+        })
+    return profiles
+
+
+def item_labels(items, max_items=20, item_formatter=None):
+    """Nomes limpos e sem repeticao, com formatador opcional e (xN) de quantidade."""
+    seen = set()
+    lis = []
+    for item in items[:max_items]:
+        item_name = clean_text(item.name)
+        if not item_name or item_name in seen:
+            continue
+        seen.add(item_name)
+        label = item_name
+        if item_formatter:
+            label = item_formatter(item, item_name)
+        if item.quantity > 1:
+            lis.append(f"{label} (x{item.quantity})")
+        else:
+            lis.append(label)
+    return lis
+
+
+def list_items(items, max_items=20, item_formatter=None):
+    if not items:
+        return ""
+    return "".join(f"<li>{h(name)}</li>" for name in item_labels(items, max_items, item_formatter))
+
+
+def format_weapon(item, item_name):
+    dice = item.damage_dice
+    die = item.damage_die
+    damage_type = clean_text(item.damage_type)
+    damage_text = ""
+    if dice and die:
+        damage_text = f"{dice}{die}" if str(die).startswith("d") else f"{dice}d{die}"
+        if damage_type:
+            damage_text = f"{damage_text} {damage_type}"
+
+    range_text = f"alcance {item.range}" if item.range else ""
+    traits_text = ", ".join(clean_text(t) for t in item.traits if clean_text(t))
+    bonus_text = f"bonus +{item.bonus}" if item.bonus else ""
+
+    rune_parts = []
+    if item.potency:
+        rune_parts.append(f"+{item.potency}")
+    if item.striking:
+        rune_parts.append("striking" if item.striking == 1 else f"striking {item.striking}")
+    for prop in item.property_runes:
+        if prop:
+            rune_parts.append(clean_text(prop))
+    rune_text = ", ".join(rune_parts)
+
+    parts = [item_name]
+    if damage_text:
+        parts.append(damage_text)
+    if range_text:
+        parts.append(range_text)
+    if bonus_text:
+        parts.append(bonus_text)
+    if rune_text:
+        parts.append(f"runas: {rune_text}")
+    if traits_text:
+        parts.append(f"tracos: {traits_text}")
+    return " — ".join(parts) if len(parts) > 1 else item_name
+
+
+def format_weapon_damage(item):
+    dice = item.damage_dice
+    die = item.damage_die
+    damage_type = clean_text(item.damage_type)
+    if not (dice and die):
+        return "-"
+    die_text = str(die) if str(die).startswith("d") else f"d{die}"
+    total_dice = dice * (1 + item.striking)
+    parts = [f"{total_dice}{die_text}"]
+    if damage_type:
+        parts.append(damage_type)
+    if item.splash:
+        parts.append(f"+{item.splash} respingo")
+    return " ".join(parts)
+
+
+def build_attack_buttons(attack_bonus, agile=False):
+    map_first = 4 if agile else 5
+    map_second = 8 if agile else 10
+    return [
+        ("attack", f"GOLPEAR {attack_bonus:+}"),
+        ("attack", f"{attack_bonus - map_first:+} (PAM -{map_first})"),
+        ("attack", f"{attack_bonus - map_second:+} (PAM -{map_second})"),
+    ]
+
+
+def build_draw_actions(item):
+    if item.hands_held:
+        return []
+
+    usage = clean_text(item.usage).lower()
+    traits = [clean_text(t).lower() for t in item.traits if clean_text(t)]
+
+    actions_list = []
+    if "held-in-one-hand" in usage:
+        actions_list.append("SACAR (1M)")
+    if "held-in-two-hands" in usage or any(t.startswith("two-hand") for t in traits):
+        actions_list.append("SACAR (2M)")
+    return actions_list
+
+
+def format_armor(item, item_name):
+    parts = [item_name, f"+{item.ac_bonus} CA"]
+    if item.dex_cap != "" and item.dex_cap is not None:
+        parts.append(f"DEX cap {item.dex_cap}")
+    if item.check_penalty not in ("", None, 0):
+        parts.append(f"penalidade {item.check_penalty}")
+    return " — ".join(parts)
+
+
+def format_shield(item, item_name):
+    return f"{item_name} — +{item.ac_bonus} CA"
+
+
+def format_treasure(item, item_name):
+    price = item.price
+    if isinstance(price, dict) and price:
+        price_text = " ".join(f"{v}{k}" for k, v in price.items())
+        return f"{item_name} — {price_text}".strip()
+    return item_name
+
+
+def format_action(item, item_name):
+    if item.action_type == "action" and item.actions:
+        return f"{item_name} — {item.actions} acao"
+    if item.action_type:
+        return f"{item_name} — {item.action_type}"
+    return item_name
+
+
+def format_spell_details(item):
+    trait_text = ", ".join(clean_text(t) for t in item.traits if clean_text(t))
+    parts = []
+    if item.level != "":
+        parts.append(f"nivel {item.level}")
+    if item.time:
+        parts.append(f"acao {item.time}")
+    if item.range:
+        parts.append(f"alcance {item.range}")
+    if item.target:
+        parts.append(f"alvo {item.target}")
+    if item.area:
+        parts.append(f"area {item.area}")
+    if item.duration:
+        parts.append(f"duracao {item.duration}")
+    if item.requirements:
+        parts.append(f"requisitos {item.requirements}")
+    if item.save:
+        save_name = str(item.save).title()
+        parts.append(f"Teste: {save_name} (basico)" if item.basic_save else f"Teste: {save_name}")
+    if trait_text:
+        parts.append(f"tracos: {trait_text}")
+    return " — ".join(parts)
+
+
+def format_spell_description(item):
+    return clean_description(item.description)
+
+
+def feat_labels(feats, category):
+    return [f"{feat.name} (Nivel {feat.level})" for feat in feats.get(category) or []]
+
+
+def spells_by_entry(analyzer):
+    """Lista (cabecalho, magias) por entrada de conjuracao, na ordem da ficha."""
+    grouped = {}
+    for spell in analyzer.get_items_by_type("spell"):
+        if spell.location:
+            grouped.setdefault(spell.location, []).append(spell)
+    entries = []
+    for entry in analyzer.get_items_by_type("spellcastingEntry"):
+        header = clean_text(entry.name or "Entrada de Magias")
+        if entry.tradition:
+            header += f" ({entry.tradition})"
+        if entry.prepared:
+            header += f" — {entry.prepared}"
+        entries.append((header, grouped.get(entry.id, [])))
+    return entries
+
+
+KEY_ABILITY_NAMES = {
+    "str": "Forca",
+    "dex": "Destreza",
+    "con": "Constituicao",
+    "int": "Inteligencia",
+    "wis": "Sabedoria",
+    "cha": "Carisma",
+}
+
+
+def format_key_ability(info):
+    key_ability_label = KEY_ABILITY_NAMES.get(info["key_ability"], info["key_ability"]).strip()
+    class_key_ability_label = KEY_ABILITY_NAMES.get(
+        info.get("class_key_ability", ""), info.get("class_key_ability", "")
+    ).strip()
+    if class_key_ability_label and class_key_ability_label.lower() != key_ability_label.lower():
+        return f"{key_ability_label} (classe: {class_key_ability_label})"
+    return key_ability_label
+
+
+def iter_html(analyzer, output_title, sections: SectionFlags, timings=None, extra_css="", extra_body=""):
+    """Gera a ficha em pedacos (cabecalho, uma secao por vez, rodape).
+
+    extra_css e extra_body sao injetados no fluxo antes de </style> e de
+    </body>, sem copiar o documento inteiro.
+    """
+    yield DOCUMENT_HEAD_TEMPLATE.render(title=h(output_title), extra_css=extra_css)
+    yield from iter_sheet_pages(analyzer, sections, timings)
+    yield DOCUMENT_TAIL_TEMPLATE.render(extra_body=extra_body)
+
+
+def iter_sheet_pages(analyzer, sections: SectionFlags, timings=None):
+    """Blocos <section class="page"> de um personagem, sem <html>/<style>."""
+    # Valores derivados e agrupamentos sao calculados sob demanda: cada
+    # secao so avalia o que usa, e secoes desligadas nao custam nada.
+    info = analyzer.get_character_info()
+    system = analyzer.data.get("system", {})
+    if not isinstance(system, dict):
+        system = {}
+    attributes = system.get("attributes", {})
+    if not isinstance(attributes, dict):
+        attributes = {}
+    details = system.get("details", {})
+    if not isinstance(details, dict):
+        details = {}
+    feats = analyzer.get_feats_by_category()
+
+    weapons = analyzer.get_items_by_type("weapon")
+    armors = analyzer.get_items_by_type("armor")
+    shields = analyzer.get_items_by_type("shield")
+    backpacks = analyzer.get_items_by_type("backpack")
+    actions = analyzer.get_items_by_type("action")
+    spell_entries = analyzer.get_items_by_type("spellcastingEntry")
+    ancestries = analyzer.get_items_by_type("ancestry")
+    heritages = analyzer.get_items_by_type("heritage")
+    classes = analyzer.get_items_by_type("class")
+    backgrounds = analyzer.get_items_by_type("background")
+
+    def loose_items(item_type):
+        return [i for i in analyzer.get_items_by_type(item_type) if not i.container_id]
+
+    def build_data_rows():
+        speed = extract_value(attributes.get("speed", ""))
+        initiative = extract_value(system.get("initiative", ""))
+        if isinstance(initiative, dict):
+            initiative_total = initiative.get("total")
+            if initiative_total is not None:
+                initiative = initiative_total
+            elif initiative.get("statistic") == "perception":
+                initiative = analyzer.derived("perception").get("total", "")
+        senses = extract_value(attributes.get("senses", ""))
+        alignment = extract_value(details.get("alignment", ""))
+        deity = extract_value(details.get("deity", ""))
+        size = extract_value(details.get("size", ""))
+        languages = extract_value(details.get("languages", ""))
+        traits = system.get("traits", {}).get("traits", {}).get("value", "")
+        exploration = system.get("exploration", [])
+        exploration_text = format_list(
+            [e.get("label") if isinstance(e, dict) else e for e in (exploration or [])],
+            empty_label="-",
+        )
+        return [
+            ["Tamanho", size],
+            ["Alinhamento", alignment],
+            ["Deidade", deity],
+            ["Idiomas", format_list(languages)],
+            ["Traits", format_list(traits)],
+            ["Velocidade", speed],
+            ["Iniciativa", initiative],
+            ["Sentidos", format_list(senses)],
+            ["Exploracao", exploration_text],
+        ]
+
+    def build_resource_rows():
+        resources = system.get("resources", {}) if isinstance(system.get("resources", {}), dict) else {}
+        resource_rows = []
+        for key, value in resources.items():
+            if key == "heroPoints":
+                continue
+            label = key.replace("_", " ").title()
+            formatted = format_resource_value(value)
+            if formatted:
+                resource_rows.append([label, formatted])
+        return resource_rows
+
+    def build_resist_rows():
+        return [
+            ["Resistencias", format_typed_entries(attributes.get("resistances", []))],
+            ["Imunidades", format_typed_entries(attributes.get("immunities", []))],
+            ["Fraquezas", format_typed_entries(attributes.get("weaknesses", []))],
+        ]
+
+    def render_attack_cards():
+        profiles = build_attack_profiles(analyzer)
+        if not profiles:
+            return ""
+        cards_html = ["<div class=\"attack-stack\">"]
+        for profile in profiles:
+            buttons = "".join(
+                f"<span class=\"atk-btn atk-btn-{kind}\">{h(label)}</span>"
+                for kind, label in profile.get("buttons", [])
+            )
+            utility = "".join(f"<span class=\"atk-btn atk-btn-utility\">{h(label)}</span>" for label in profile.get("utility", []))
+            details = " | ".join(h(part) for part in profile.get("details", []) if part)
+            utility_row = f"<div class=\"atk-buttons atk-buttons-utility\">{utility}</div>" if utility else ""
+            ATTACK_CARD_TEMPLATE.render_into(
+                cards_html,
+                name=h(profile["name"]),
+                buttons=buttons,
+                details=details,
+                utility_row=utility_row,
+            )
+        cards_html.append("</div>")
+        return "".join(cards_html)
+
+    def group_backpacks():
+        if not backpacks:
+            return ""
+        blocks = []
+        for backpack in backpacks:
+            pack_name = clean_text(backpack.name or "Mochila")
+            contents = analyzer.get_items_in_container(backpack.id)
+            contents_list = list_items(contents, max_items=50)
+            block = f"<div class='card'><h3>{h(pack_name)}</h3><ul>{contents_list}</ul></div>"
+            blocks.append(block)
+        return "".join(blocks)
+
+    def render_spells_by_entry():
+        if not spell_entries:
+            return "<div class='note'>Nenhuma entrada de magia encontrada.</div>"
+        blocks = []
+        for header, entry_spells in spells_by_entry(analyzer):
+            blocks.append(f"<div class='card'><h3>{h(header)}</h3><ul>")
+            for spell, (details, description) in zip(entry_spells, spell_text_cache.texts(entry_spells)):
+                name = clean_text(spell.name)
+                description_html = html.escape(description).replace("\n", "<br>") if description else ""
+                blocks.append(f"<li><div class='spell-name'>{h(name)}</div>")
+                if details:
+                    blocks.append(f"<div class='spell-meta'>{h(details)}</div>")
+                if description_html:
+                    blocks.append(f"<div class='spell-desc'>{description_html}</div>")
+                blocks.append("</li>")
+            blocks.append("</ul></div>")
+        return "".join(blocks)
+
+    def list_feats(category):
+        return "".join(f"<li>{h(name)}</li>" for name in feat_labels(feats, category))
+
+    generated_at = datetime.now().strftime("%d/%m/%Y %H:%M")
+    key_ability_display = format_key_ability(info)
+    details_rows = [
+        ["Nome", info["name"]],
+        ["Nivel", info["level"]],
+        ["Pontos de Vida", f"{info['hp']} (+{info['temp_hp']} temp)"],
+        ["Pontos de Heroi", f"{info['hero_points']}/{info['max_hero_points']}"],
+        ["Experiencia", f"{info['xp']}/1000"],
+        ["Atributo-chave", key_ability_display],
+    ]
+
+    def page_chip(label_html):
+        return CHIP_TEMPLATE.render(label=label_html)
+
+    def timed(name, render):
+        started = time.perf_counter()
+        chunk = render()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+        return chunk
+
+    def render_summary_section():
+        if not sections.summary:
+            return ""
+        cards = []
+        if sections.summary_stats:
+            ac_info = analyzer.derived("ac")
+            perception = analyzer.derived("perception")
+            SUMMARY_STATS_TEMPLATE.render_into(
+                cards,
+                hp=info["hp"],
+                temp_hp=info["temp_hp"],
+                ac_total=ac_info["total"],
+                armor_bonus=ac_info["armor_bonus"],
+                shield_bonus=ac_info["shield_bonus"],
+                perception_total=perception["total"],
+                wis_mod=f"{perception['wis_mod']:+}",
+                perception_prof=perception["prof_bonus"],
+            )
+        if sections.summary_attributes:
+            SUMMARY_ATTRIBUTES_TEMPLATE.render_into(
+                cards, table=render_table(["Atributo", "Valor", "Mod"], attributes_rows(analyzer))
+            )
+        if sections.summary_defenses:
+            SUMMARY_DEFENSES_TEMPLATE.render_into(
+                cards,
+                table=render_table(["Teste", "Total", "Detalhes"], saves_rows(analyzer)),
+                melee_total=analyzer.derived("attacks")["melee"]["total"],
+            )
+        if sections.summary_attributes or sections.summary_defenses:
+            cards.append(GRID_CLOSE)
+        if sections.summary_skills:
+            SUMMARY_SKILLS_TEMPLATE.render_into(cards, table=render_table(["Pericia", "Total"], skills_rows(analyzer)))
+
+        combat_cards = []
+        attack_cards_html = render_attack_cards()
+        if attack_cards_html:
+            combat_cards.append(SUMMARY_ATTACKS_TEMPLATE.render(cards=attack_cards_html))
+        if sections.info_actions and actions:
+            combat_cards.append(SUMMARY_ACTIONS_TEMPLATE.render(items=list_items(actions, 30, format_action)))
+        if len(combat_cards) == 1:
+            cards.extend(combat_cards)
+        elif combat_cards:
+            SUMMARY_COMBAT_GRID_TEMPLATE.render_into(cards, cards="".join(combat_cards))
+
+        if not any(card.strip() for card in cards):
+            return ""
+        out = []
+        PAGE_HEAD_TEMPLATE.render_into(
+            out,
+            title=h(info["name"]),
+            subtitle=f"Pathfinder 2E • Nivel {info['level']} • Gerado em {generated_at}",
+            chip=SUMMARY_CHIPS_TEMPLATE.render(
+                xp=info["xp"],
+                hero_points=info["hero_points"],
+                max_hero_points=info["max_hero_points"],
+            ),
+        )
+        out.extend(cards)
+        out.append(PAGE_TAIL)
+        return "".join(out)
+
+    def render_talents_equipment_section():
+        if not sections.talents_equipment:
+            return ""
+        out = []
+        subtitle = f"{h(info['name'])} • Nivel {info['level']}"
+        chip = page_chip(f"Atributo-chave: {h(key_ability_display)}")
+        if sections.talents:
+            PAGE_HEAD_TEMPLATE.render_into(out, title="Talentos", subtitle=subtitle, chip=chip)
+            TALENTS_TEMPLATE.render_into(
+                out,
+                ancestry=list_feats("ancestry"),
+                class_feats=list_feats("class"),
+                skill=list_feats("skill"),
+                general=list_feats("general"),
+            )
+            out.append(PAGE_TAIL)
+        show_backpacks = sections.equipment and backpacks
+        if sections.equipment or sections.inventory_notes or show_backpacks:
+            PAGE_HEAD_TEMPLATE.render_into(out, title="Equipamentos", subtitle=subtitle, chip=chip)
+            if sections.equipment:
+                EQUIPMENT_TEMPLATE.render_into(
+                    out,
+                    weapons=list_items(weapons, 12, format_weapon),
+                    armors=list_items(armors, 6, format_armor),
+                    shields=list_items(shields, 6, format_shield),
+                    equipment=list_items(loose_items("equipment"), 30),
+                    consumables=list_items(loose_items("consumable"), 20),
+                    treasures=list_items(loose_items("treasure"), 20, format_treasure),
+                )
+            out.append("\n")
+            if show_backpacks:
+                BACKPACKS_TEMPLATE.render_into(out, blocks=group_backpacks())
+            out.append("\n")
+            if sections.inventory_notes:
+                out.append(INVENTORY_NOTES_HTML)
+            out.append(PAGE_TAIL)
+        return "".join(out)
+
+    def render_info_section():
+        show_actions = sections.info_actions and actions and not sections.summary
+        if not sections.info or not (
+            sections.info_details
+            or sections.info_physical
+            or sections.info_origin
+            or sections.info_data
+            or sections.info_resist
+            or show_actions
+        ):
+            return ""
+        out = []
+        PAGE_HEAD_TEMPLATE.render_into(
+            out,
+            title="Informacoes do Personagem",
+            subtitle=h(info["name"]),
+            chip=page_chip(f"Nivel {info['level']}"),
+        )
+        if sections.info_details:
+            DETAILS_TEMPLATE.render_into(out, table=render_table(["Campo", "Valor"], details_rows))
+        out.append("\n")
+        if sections.info_physical or sections.info_origin:
+            out.append(GRID_2_OPEN)
+            if sections.info_physical:
+                PHYSICAL_TEMPLATE.render_into(out, table=render_table(["Campo", "Valor"], [
+                    ["Idade", info.get("age", "")],
+                    ["Altura", info.get("height", "")],
+                    ["Peso", info.get("weight", "")],
+                    ["Genero", info.get("gender", "")],
+                    ["Etnia", info.get("ethnicity", "")],
+                    ["Nacionalidade", info.get("nationality", "")],
+                ]))
+            if sections.info_origin:
+                ORIGIN_TEMPLATE.render_into(
+                    out,
+                    ancestries=list_items(ancestries, 5),
+                    heritages=list_items(heritages, 5),
+                    classes=list_items(classes, 5),
+                    backgrounds=list_items(backgrounds, 5),
+                )
+            out.append(GRID_CLOSE)
+        out.append("\n")
+        if sections.info_data or sections.info_resist:
+            out.append(GRID_2_OPEN)
+            if sections.info_data:
+                DATA_TEMPLATE.render_into(
+                    out,
+                    table=render_table(["Campo", "Valor"], build_data_rows()),
+                    resources_table=render_table(["Recurso", "Valor"], build_resource_rows()),
+                )
+            if sections.info_resist:
+                RESIST_TEMPLATE.render_into(out, table=render_table(["Tipo", "Detalhes"], build_resist_rows()))
+            out.append(GRID_CLOSE)
+        out.append("\n")
+        if show_actions:
+            INFO_ACTIONS_TEMPLATE.render_into(out, items=list_items(actions, 30, format_action))
+        out.append(PAGE_TAIL)
+        return "".join(out)
+
+    def render_spells_section():
+        if not (sections.spells and (sections.spells_list or sections.spells_resources or sections.spells_notes)):
+            return ""
+        out = []
+        PAGE_HEAD_TEMPLATE.render_into(
+            out,
+            title="Magias",
+            subtitle=f"{h(info['name'])} • Nivel {info['level']}",
+            chip=page_chip(f"Atributo-chave: {h(key_ability_display)}"),
+        )
+        if sections.spells_list:
+            SPELLS_LIST_TEMPLATE.render_into(out, blocks=render_spells_by_entry())
+        if sections.spells_resources:
+            out.append(SPELLS_RESOURCES_HTML)
+        if sections.spells_notes:
+            out.append(SPELLS_NOTES_HTML)
+        out.append(PAGE_TAIL)
+        return "".join(out)
+
+    yield timed("summary", render_summary_section)
+    yield "\n"
+    yield timed("talents_equipment", render_talents_equipment_section)
+    yield "\n"
+    yield timed("info", render_info_section)
+    yield "\n"
+    yield timed("spells", render_spells_section)
+
+
+PARTY_ROW_TEMPLATE = HtmlTemplate("""
+          <tr><td><strong>{name}</strong><div class="note">{details}</div></td><td>{level}</td><td>{ac}</td><td>+{fortitude}</td><td>+{reflex}</td><td>+{will}</td><td>+{perception}</td><td>{hp}</td></tr>""")
+PARTY_OVERVIEW_TEMPLATE = HtmlTemplate("""
+    <div class="card">
+      <h3>Defesas do grupo</h3>
+      <table>
+        <thead><tr><th>Personagem</th><th>Nivel</th><th>CA</th><th>Fort</th><th>Ref</th><th>Von</th><th>Percepcao</th><th>PV</th></tr></thead>
+        <tbody>{rows}
+        </tbody>
+      </table>
+    </div>
+""")
+
+
+def render_party_overview(analyzers) -> str:
+    rows = []
+    for analyzer in analyzers:
+        info = analyzer.get_character_info()
+        saves = analyzer.derived("saves")
+        class_item = analyzer.first_item_of_type("class")
+        ancestry_item = analyzer.first_item_of_type("ancestry")
+        details = " • ".join(item.name for item in (ancestry_item, class_item) if item and item.name)
+        PARTY_ROW_TEMPLATE.render_into(
+            rows,
+            name=h(info["name"]),
+            details=h(details),
+            level=h(info["level"]),
+            ac=analyzer.derived("ac")["total"],
+            fortitude=saves.get("fortitude", {}).get("total", 0),
+            reflex=saves.get("reflex", {}).get("total", 0),
+            will=saves.get("will", {}).get("total", 0),
+            perception=analyzer.derived("perception")["total"],
+            hp=h(info["hp"]),
+        )
+    out = []
+    PAGE_HEAD_TEMPLATE.render_into(
+        out,
+        title="Grupo",
+        subtitle=f"{len(analyzers)} personagem(ns)",
+        chip=CHIP_TEMPLATE.render(label=f"Nivel medio {average_level(analyzers)}"),
+    )
+    PARTY_OVERVIEW_TEMPLATE.render_into(out, rows="".join(rows))
+    out.append(PAGE_TAIL)
+    return "".join(out)
+
+
+def average_level(analyzers) -> str:
+    levels = []
+    for analyzer in analyzers:
+        try:
+            levels.append(int(analyzer.get_character_info()["level"]))
+        except (TypeError, ValueError):
+            continue
+    return f"{round(sum(levels) / len(levels), 1):g}" if levels else "-"
+
+
+def iter_party_html(analyzers, output_title, sections: SectionFlags, overview=True):
+    """Documento unico com as paginas de varios personagens sob um so <style>."""
+    yield DOCUMENT_HEAD_TEMPLATE.render(title=h(output_title), extra_css="")
+    if overview:
+        yield render_party_overview(analyzers)
+    for analyzer in analyzers:
+        yield "\n"
+        yield from iter_sheet_pages(analyzer, sections)
+    yield DOCUMENT_TAIL_TEMPLATE.render(extra_body="")
+
+
+def write_chunks(chunks, path: Path, timer=None) -> Path:
+    writing = 0.0
+    with path.open("w", encoding="utf-8") as handle:
+        for chunk in chunks:
+            started = time.perf_counter()
+            handle.write(chunk)
+            writing += time.perf_counter() - started
+    if timer is not None:
+        timer.record("write", writing)
+    return path
+
+
+def find_chrome_executable():
+    candidates = [
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        "/Applications/Chromium.app/Contents/MacOS/Chromium",
+        "google-chrome",
+        "chromium",
+        "chromium-browser",
+    ]
+    for candidate in candidates:
+        if os.path.isabs(candidate) and os.path.exists(candidate):
+            return candidate
+        path = shutil.which(candidate)
+        if path:
+            return path
+    return None
+
+
+def export_pdf(html_path, pdf_path):
+    chrome = find_chrome_executable()
+    if not chrome:
+        print("Aviso: Chrome/Chromium nao encontrado. HTML gerado, PDF nao exportado.")
+        return False
+
+    pool = _chrome_pool
+    if pool is not None and pool.available:
+        try:
+            pool.print_pdf(html_path, pdf_path)
+            return True
+        except Exception as exc:
+            print(f"Aviso: pool do Chrome falhou ({exc}); usando Chrome avulso.")
+
+    import subprocess
+
+    cmd = [
+        chrome,
+        "--headless=new",
+        "--disable-gpu",
+        "--no-pdf-header-footer",
+        f"--print-to-pdf={pdf_path}",
+        str(html_path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print("Erro ao exportar PDF via Chrome:")
         print(result.stderr.strip() or result.stdout.strip())
         return False
     return True
 
 
+# ==============================
+# CHROME POOL (DevTools via pipe)
+# ==============================
+
+# Executado com os fds do pipe em argv[1:3]: coloca-os nos fds 3/4 que o
+# --remote-debugging-pipe espera e troca o processo pelo Chrome.
+CHROME_PIPE_TRAMPOLINE = (
+    "import os, sys\n"
+    "os.dup2(int(sys.argv[1]), 3)\n"
+    "os.dup2(int(sys.argv[2]), 4)\n"
+    "os.close(int(sys.argv[1]))\n"
+    "os.close(int(sys.argv[2]))\n"
+    "os.execvp(sys.argv[3], sys.argv[3:])\n"
+)
+
+
+class ChromeWorker:
+    """Chrome headless de longa duracao controlado pelo DevTools Protocol.
+
+    Usa --remote-debugging-pipe: o Chrome le comandos do fd 3 e responde no
+    fd 4, com mensagens JSON terminadas em NUL.
+    """
+
+    def __init__(self, chrome, timeout=60):
+        import subprocess
+        import tempfile
+
+        self.timeout = timeout
+        self.jobs = 0
+        self._next_id = 0
+        self._buffer = bytearray()
+        self._events = []
+        self._profile_dir = tempfile.mkdtemp(prefix="pf2e_chrome_")
+        to_chrome_r, self._to_chrome = os.pipe()
+        self._from_chrome, from_chrome_w = os.pipe()
+        # As pontas do Chrome vao para fds >= 10 ja no pai, e um trampolim
+        # as move para 3/4 antes do exec. preexec_fn nao e seguro com as
+        # threads da Web UI, e dup2 direto no pai sobrescreveria os fds 3/4
+        # que o processo ja usa.
+        child_fds = (
+            fcntl.fcntl(to_chrome_r, fcntl.F_DUPFD, 10),
+            fcntl.fcntl(from_chrome_w, fcntl.F_DUPFD, 10),
+        )
+        os.close(to_chrome_r)
+        os.close(from_chrome_w)
+
+        cmd = [
+            sys.executable,
+            "-I",
+            "-S",
+            "-c",
+            CHROME_PIPE_TRAMPOLINE,
+            str(child_fds[0]),
+            str(child_fds[1]),
+            chrome,
+            "--headless=new",
+            "--disable-gpu",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--remote-debugging-pipe",
+            f"--user-data-dir={self._profile_dir}",
+            "about:blank",
+        ]
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                pass_fds=child_fds,
+            )
+        finally:
+            for fd in child_fds:
+                os.close(fd)
+        try:
+            self.send("Browser.getVersion")
+        except Exception:
+            self.close()
+            raise
+
+    def send(self, method, params=None, session_id=None, deadline=None):
+        self._next_id += 1
+        message_id = self._next_id
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        payload = json.dumps(message).encode("utf-8") + b"\0"
+        while payload:
+            written = os.write(self._to_chrome, payload)
+            payload = payload[written:]
+        while True:
+            response = self._read_message(deadline)
+            if response.get("id") == message_id:
+                if "error" in response:
+                    raise RuntimeError(f"{method}: {response['error'].get('message', response['error'])}")
+                return response.get("result", {})
+            if "method" in response:
+                self._events.append(response)
+
+    def wait_event(self, method, session_id=None, deadline=None, match=None):
+        while True:
+            for index, event in enumerate(self._events):
+                if event.get("method") != method or event.get("sessionId") != session_id:
+                    continue
+                if match is None or match(event.get("params", {})):
+                    return self._events.pop(index)
+            self._events.append(self._read_message(deadline))
+
+    def _read_message(self, deadline=None):
+        import select
+
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        # bytearray + busca so no trecho novo: respostas grandes (o PDF vem
+        # em base64 numa mensagem so) nao viram copias quadraticas.
+        scanned = 0
+        while True:
+            end = self._buffer.find(b"\0", scanned)
+            if end >= 0:
+                break
+            scanned = len(self._buffer)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Chrome nao respondeu a tempo.")
+            ready, _, _ = select.select([self._from_chrome], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(self._from_chrome, 65536)
+            if not chunk:
+                raise RuntimeError("Chrome encerrou o pipe do DevTools.")
+            self._buffer += chunk
+        raw = bytes(self._buffer[:end])
+        del self._buffer[:end + 1]
+        return json.loads(raw.decode("utf-8"))
+
+    def print_pdf(self, html_path, pdf_path):
+        import base64
+
+        # Prazo da impressao inteira: eventos chegando sem parar nao renovam
+        # o timeout. Estourado, o pool descarta este worker e sobe outro.
+        deadline = time.monotonic() + self.timeout
+        self._events = []
+        target_id = self.send("Target.createTarget", {"url": "about:blank"}, deadline=deadline)["targetId"]
+        try:
+            session_id = self.send(
+                "Target.attachToTarget", {"targetId": target_id, "flatten": True}, deadline=deadline
+            )["sessionId"]
+            self.send("Page.enable", session_id=session_id, deadline=deadline)
+            self.send("Page.setLifecycleEventsEnabled", {"enabled": True}, session_id=session_id, deadline=deadline)
+            navigation = self.send(
+                "Page.navigate", {"url": Path(html_path).resolve().as_uri()}, session_id=session_id, deadline=deadline
+            )
+            if navigation.get("errorText"):
+                raise RuntimeError(f"Page.navigate: {navigation['errorText']}")
+            self._wait_loaded(session_id, navigation, deadline)
+            result = self.send(
+                "Page.printToPDF",
+                {"displayHeaderFooter": False, "preferCSSPageSize": True},
+                session_id=session_id,
+                deadline=deadline,
+            )
+        finally:
+            # Com o prazo estourado o worker vai ser descartado de qualquer jeito.
+            if time.monotonic() < deadline:
+                try:
+                    self.send("Target.closeTarget", {"targetId": target_id}, deadline=deadline)
+                except Exception:
+                    # Nao esconde o erro da impressao; o pool descarta o worker.
+                    pass
+        Path(pdf_path).write_bytes(base64.b64decode(result["data"]))
+        self.jobs += 1
+
+    def _wait_loaded(self, session_id, navigation, deadline):
+        # Espera o "load" desta navegacao, e nao um evento atrasado do
+        # about:blank da aba: o lifecycleEvent traz frameId e loaderId.
+        loader_id = navigation.get("loaderId")
+        if loader_id:
+            self.wait_event(
+                "Page.lifecycleEvent",
+                session_id,
+                deadline,
+                match=lambda params: params.get("name") == "load"
+                and params.get("loaderId") == loader_id
+                and params.get("frameId") == navigation.get("frameId"),
+            )
+            return
+        # Sem loaderId, so vale o loadEventFired que chegar depois da
+        # resposta do Page.navigate.
+        self._events = [event for event in self._events if event.get("method") != "Page.loadEventFired"]
+        self.wait_event("Page.loadEventFired", session_id, deadline)
+
+    def close(self):
+        import subprocess
+
+        for fd in (self._to_chrome, self._from_chrome):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self._profile_dir, ignore_errors=True)
+
+
+class ChromePool:
+    """Conjunto de ChromeWorker aquecidos; cada worker imprime varias paginas."""
+
+    def __init__(self, size=2, max_jobs=50, timeout=60):
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.available = False
+        self._chrome = None
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if fcntl is None:
+            return False
+        self._chrome = find_chrome_executable()
+        if not self._chrome:
+            return False
+        try:
+            for _ in range(self.size):
+                self._idle.put(self._launch())
+        except Exception as exc:
+            print(f"Aviso: nao foi possivel iniciar o pool do Chrome ({exc}).")
+            self.close()
+            return False
+        self.available = True
+        return True
+
+    def _launch(self):
+        worker = ChromeWorker(self._chrome, timeout=self.timeout)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.close()
+
+    def print_pdf(self, html_path, pdf_path):
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError("nenhum worker do Chrome livre") from None
+        try:
+            worker.print_pdf(html_path, pdf_path)
+        except Exception:
+            self._retire(worker)
+            worker = None
+            raise
+        finally:
+            if worker is not None and worker.jobs >= self.max_jobs:
+                self._retire(worker)
+                worker = None
+            if worker is None:
+                try:
+                    worker = self._launch()
+                except Exception:
+                    pass
+            if worker is not None:
+                self._idle.put(worker)
+            elif not self._workers:
+                self.available = False
+
+    def close(self):
+        self.available = False
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+_chrome_pool = None
+
+
+def start_chrome_pool(size=2, max_jobs=50):
+    global _chrome_pool
+    if _chrome_pool is None:
+        pool = ChromePool(size=size, max_jobs=max_jobs)
+        if not pool.start():
+            return None
+        _chrome_pool = pool
+        atexit.register(stop_chrome_pool)
+    return _chrome_pool
+
+
+def stop_chrome_pool():
+    global _chrome_pool
+    if _chrome_pool is not None:
+        _chrome_pool.close()
+        _chrome_pool = None
+
+
+# ==============================
+# NATIVE PDF (FPDF, sem navegador)
+# ==============================
+
+# Mesma paleta do SHEET_CSS.
+NATIVE_GREEN = (31, 63, 51)
+NATIVE_GOLD = (180, 139, 47)
+NATIVE_CREAM = (246, 241, 231)
+NATIVE_INK = (27, 27, 27)
+NATIVE_MUTED = (107, 107, 107)
+
+# As fontes padrao do PDF so cobrem Latin-1.
+_NATIVE_TEXT = str.maketrans({
+    "•": "-", "·": "-", "–": "-", "—": "-", "−": "-",
+    "“": '"', "”": '"', "‘": "'", "’": "'", "…": "...",
+})
+
+
+def pdf_text(value) -> str:
+    if value is None:
+        return ""
+    return str(value).translate(_NATIVE_TEXT).encode("latin-1", "replace").decode("latin-1")
+
+
+_native_pdf_class = None
+NATIVE_MISSING_FPDF = "Erro: o backend nativo precisa da biblioteca fpdf (pip install fpdf)."
+
+
+def native_pdf_class():
+    """Classe FPDF da ficha; o fpdf so e importado quando o backend nativo e usado."""
+    global _native_pdf_class
+    if _native_pdf_class is not None:
+        return _native_pdf_class
+    from fpdf import FPDF
+
+    class SheetPDF(FPDF):
+        # So usa a API comum ao fpdf 1.7 e ao fpdf2: texto posicional, sem
+        # "ln" em cell() e cursor reposicionado a mao depois de multi_cell().
+
+        def __init__(self):
+            super().__init__(orientation="P", unit="mm", format="A4")
+            self.set_margins(12, 12, 12)
+            self.set_auto_page_break(True, margin=14)
+            self.footer_label = ""
+
+        @property
+        def content_width(self):
+            return self.w - self.l_margin - self.r_margin
+
+        def footer(self):
+            self.set_y(-10)
+            self.set_font("Helvetica", "", 7)
+            self.set_text_color(*NATIVE_MUTED)
+            self.cell(0, 4, pdf_text(f"{self.footer_label}  -  pagina {self.page_no()}"), 0, align="C")
+
+        def ensure_space(self, height):
+            if self.get_y() + height > self.page_break_trigger:
+                self.add_page()
+
+        def fit(self, text, width):
+            text = pdf_text(text)
+            if self.get_string_width(text) <= width:
+                return text
+            while text and self.get_string_width(text + "...") > width:
+                text = text[:-1]
+            return text + "..."
+
+        def page_header(self, title, subtitle, chips=(), footer=""):
+            self.add_page()
+            # O rodape da pagina anterior ja foi desenhado pelo add_page().
+            self.footer_label = footer
+            self.set_text_color(*NATIVE_GREEN)
+            self.set_font("Helvetica", "B", 18)
+            self.cell(self.content_width * 0.6, 9, self.fit(title, self.content_width * 0.6), 0)
+            self.set_font("Helvetica", "B", 8)
+            chip_x = self.w - self.r_margin
+            for chip in reversed(chips):
+                label = pdf_text(chip)
+                width = self.get_string_width(label) + 6
+                chip_x -= width + 2
+                self.set_draw_color(*NATIVE_GOLD)
+                self.set_xy(chip_x, self.t_margin + 1)
+                self.cell(width, 6, label, 1, align="C")
+            self.set_xy(self.l_margin, self.t_margin + 9)
+            self.set_font("Helvetica", "", 9)
+            self.set_text_color(*NATIVE_MUTED)
+            self.cell(0, 5, self.fit(subtitle, self.content_width), 0)
+            self.set_draw_color(*NATIVE_GOLD)
+            self.set_line_width(0.6)
+            self.line(self.l_margin, self.t_margin + 15, self.w - self.r_margin, self.t_margin + 15)
+            self.set_line_width(0.2)
+            self.set_xy(self.l_margin, self.t_margin + 18)
+            self.set_text_color(*NATIVE_INK)
+
+        def section_title(self, title, x=None, width=None):
+            x = self.l_margin if x is None else x
+            width = self.content_width if width is None else width
+            self.ensure_space(14)
+            self.set_x(x)
+            self.set_font("Helvetica", "B", 10)
+            self.set_text_color(*NATIVE_GREEN)
+            self.cell(width, 6, pdf_text(title), 0)
+            self.set_xy(x, self.get_y() + 6)
+            self.set_text_color(*NATIVE_INK)
+
+        def table(self, headers, rows, widths, x=None):
+            """Tabela simples; widths sao frações da largura disponivel a partir de x."""
+            x = self.l_margin if x is None else x
+            total = sum(widths)
+            available = (self.w - self.r_margin - x) if total <= 1 else total
+            cols = [available * w if total <= 1 else w for w in widths]
+            self.ensure_space(12)
+            self.set_x(x)
+            self.set_font("Helvetica", "B", 8)
+            self.set_fill_color(*NATIVE_CREAM)
+            self.set_draw_color(*NATIVE_GOLD)
+            for header, width in zip(headers, cols):
+                self.cell(width, 6, self.fit(header, width - 2), 1, align="L", fill=True)
+            self.set_xy(x, self.get_y() + 6)
+            self.set_font("Helvetica", "", 8)
+            for row in rows:
+                self.ensure_space(5.5)
+                self.set_x(x)
+                for cell_value, width in zip(row, cols):
+                    self.cell(width, 5.5, self.fit(cell_value, width - 2), 1)
+                self.set_xy(x, self.get_y() + 5.5)
+            self.set_xy(self.l_margin, self.get_y() + 2)
+
+        def bullets(self, labels, empty="-"):
+            self.set_font("Helvetica", "", 8.5)
+            if not labels:
+                self.set_text_color(*NATIVE_MUTED)
+                self.cell(0, 5, pdf_text(empty), 0)
+                self.set_xy(self.l_margin, self.get_y() + 5)
+                self.set_text_color(*NATIVE_INK)
+                return
+            for label in labels:
+                self.set_x(self.l_margin + 2)
+                self.multi_cell(self.content_width - 2, 4.5, pdf_text(f"- {label}"), 0)
+            self.set_xy(self.l_margin, self.get_y() + 1.5)
+
+        def paragraph(self, text, size=8, color=NATIVE_INK, style=""):
+            if not text:
+                return
+            self.set_font("Helvetica", style, size)
+            self.set_text_color(*color)
+            self.set_x(self.l_margin)
+            self.multi_cell(self.content_width, size * 0.5, pdf_text(text), 0)
+            self.set_x(self.l_margin)
+            self.set_text_color(*NATIVE_INK)
+
+        def stat_boxes(self, boxes):
+            self.ensure_space(20)
+            width = (self.content_width - 4 * (len(boxes) - 1)) / len(boxes)
+            top = self.get_y()
+            for index, (label, value, note) in enumerate(boxes):
+                x = self.l_margin + index * (width + 4)
+                self.set_draw_color(*NATIVE_GOLD)
+                self.rect(x, top, width, 18)
+                self.set_xy(x + 2, top + 1.5)
+                self.set_font("Helvetica", "B", 8)
+                self.set_text_color(*NATIVE_MUTED)
+                self.cell(width - 4, 4, pdf_text(label), 0)
+                self.set_xy(x + 2, top + 5.5)
+                self.set_font("Helvetica", "B", 15)
+                self.set_text_color(*NATIVE_GREEN)
+                self.cell(width - 4, 7, pdf_text(value), 0)
+                self.set_xy(x + 2, top + 12.5)
+                self.set_font("Helvetica", "", 7)
+                self.set_text_color(*NATIVE_MUTED)
+                self.cell(width - 4, 4, self.fit(note, width - 4), 0)
+            self.set_text_color(*NATIVE_INK)
+            self.set_xy(self.l_margin, top + 21)
+
+        def attack_card(self, profile):
+            details = " | ".join(part for part in profile.get("details", []) if part)
+            self.ensure_space(20)
+            top = self.get_y()
+            self.set_x(self.l_margin + 2)
+            self.set_font("Helvetica", "B", 9.5)
+            self.set_text_color(*NATIVE_GREEN)
+            self.cell(self.content_width - 4, 5.5, self.fit(profile["name"], self.content_width - 4), 0)
+            self.set_xy(self.l_margin + 2, top + 6.5)
+            self.set_font("Helvetica", "B", 7.5)
+            buttons = [(kind, label) for kind, label in profile.get("buttons", [])]
+            buttons += [("utility", label) for label in profile.get("utility", [])]
+            for kind, label in buttons:
+                label = pdf_text(label)
+                width = self.get_string_width(label) + 5
+                if kind == "attack":
+                    self.set_fill_color(*NATIVE_GREEN)
+                    self.set_text_color(255, 255, 255)
+                else:
+                    self.set_fill_color(*NATIVE_CREAM)
+                    self.set_text_color(*NATIVE_GREEN)
+                self.cell(width, 5, label, 0, align="C", fill=True)
+                self.set_x(self.get_x() + 1.5)
+            self.set_text_color(*NATIVE_INK)
+            self.set_xy(self.l_margin + 2, top + 12.5)
+            self.set_font("Helvetica", "", 7.5)
+            self.multi_cell(self.content_width - 4, 3.8, pdf_text(details), 0)
+            bottom = self.get_y() + 1.5
+            self.set_draw_color(*NATIVE_GOLD)
+            self.rect(self.l_margin, top, self.content_width, bottom - top)
+            self.set_xy(self.l_margin, bottom + 2)
+
+        def notes_box(self, title, lines=6):
+            self.section_title(title)
+            self.set_draw_color(*NATIVE_GOLD)
+            for _ in range(lines):
+                self.ensure_space(7)
+                y = self.get_y() + 6
+                self.line(self.l_margin, y, self.w - self.r_margin, y)
+                self.set_xy(self.l_margin, y + 1)
+            self.set_xy(self.l_margin, self.get_y() + 2)
+
+    _native_pdf_class = SheetPDF
+    return SheetPDF
+
+
+def _native_split(rows):
+    half = (len(rows) + 1) // 2
+    return rows[:half], rows[half:]
+
+
+def native_sheet_pages(pdf, analyzer, sections: SectionFlags) -> None:
+    """Desenha as paginas de um personagem seguindo as mesmas SectionFlags do HTML."""
+    info = analyzer.get_character_info()
+    feats = analyzer.get_feats_by_category()
+    key_ability = format_key_ability(info)
+    subtitle = f"{info['name']} - Nivel {info['level']}"
+    chip = f"Atributo-chave: {key_ability}"
+    footer = f"{info['name']} - Pathfinder 2E"
+    actions = analyzer.get_items_by_type("action")
+
+    def loose_items(item_type):
+        return [i for i in analyzer.get_items_by_type(item_type) if not i.container_id]
+
+    if sections.summary:
+        generated_at = datetime.now().strftime("%d/%m/%Y %H:%M")
+        pdf.page_header(
+            info["name"],
+            f"Pathfinder 2E - Nivel {info['level']} - Gerado em {generated_at}",
+            chips=(f"XP {info['xp']}/1000", f"Heroi {info['hero_points']}/{info['max_hero_points']}"),
+            footer=footer,
+        )
+        if sections.summary_stats:
+            ac_info = analyzer.derived("ac")
+            perception = analyzer.derived("perception")
+            pdf.stat_boxes([
+                ("Vida", info["hp"], f"Temporario: +{info['temp_hp']}"),
+                ("Classe de Armadura", ac_info["total"],
+                 f"Armadura +{ac_info['armor_bonus']} | Escudo +{ac_info['shield_bonus']}"),
+                ("Percepcao", f"+{perception['total']}",
+                 f"Sab {perception['wis_mod']:+} | Prof +{perception['prof_bonus']}"),
+            ])
+        if sections.summary_attributes or sections.summary_defenses:
+            top = pdf.get_y()
+            half = (pdf.content_width - 4) / 2
+            bottom = top
+            if sections.summary_attributes:
+                pdf.section_title("Atributos", width=half)
+                pdf.table(["Atributo", "Valor", "Mod"], attributes_rows(analyzer), [half * 0.5, half * 0.25, half * 0.25])
+                bottom = max(bottom, pdf.get_y())
+            if sections.summary_defenses:
+                x = pdf.l_margin + half + 4 if sections.summary_attributes else pdf.l_margin
+                pdf.set_xy(x, top)
+                pdf.section_title("Defesas", x=x, width=half)
+                pdf.table(["Teste", "Total", "Detalhes"], saves_rows(analyzer), [half * 0.3, half * 0.2, half * 0.5], x=x)
+                pdf.set_x(x)
+                pdf.set_font("Helvetica", "", 7.5)
+                pdf.cell(half, 4, pdf_text(f"Ataque corpo a corpo: +{analyzer.derived('attacks')['melee']['total']}"), 0)
+                bottom = max(bottom, pdf.get_y() + 5)
+            pdf.set_xy(pdf.l_margin, bottom + 2)
+        if sections.summary_skills:
+            pdf.section_title("Pericias (Totais)")
+            left, right = _native_split(skills_rows(analyzer))
+            half = (pdf.content_width - 4) / 2
+            top = pdf.get_y()
+            pdf.table(["Pericia", "Total"], left, [half * 0.75, half * 0.25])
+            bottom = pdf.get_y()
+            if right:
+                pdf.set_y(top)
+                pdf.table(["Pericia", "Total"], right, [half * 0.75, half * 0.25], x=pdf.l_margin + half + 4)
+                bottom = max(bottom, pdf.get_y())
+            pdf.set_xy(pdf.l_margin, bottom)
+        profiles = build_attack_profiles(analyzer)
+        if profiles:
+            pdf.section_title("Ataques")
+            for profile in profiles:
+                pdf.attack_card(profile)
+        if sections.info_actions and actions:
+            pdf.section_title("Acoes e Atividades")
+            pdf.bullets(item_labels(actions, 30, format_action))
+
+    if sections.talents_equipment and sections.talents:
+        pdf.page_header("Talentos", subtitle, chips=(chip,), footer=footer)
+        for title, category in (
+            ("Ancestralidade", "ancestry"), ("Classe", "class"), ("Pericia", "skill"), ("Gerais", "general"),
+        ):
+            pdf.section_title(title)
+            pdf.bullets(feat_labels(feats, category))
+
+    backpacks = analyzer.get_items_by_type("backpack")
+    show_backpacks = sections.equipment and backpacks
+    if sections.talents_equipment and (sections.equipment or sections.inventory_notes or show_backpacks):
+        pdf.page_header("Equipamentos", subtitle, chips=(chip,), footer=footer)
+        if sections.equipment:
+            for title, labels in (
+                ("Armas", item_labels(analyzer.get_items_by_type("weapon"), 12, format_weapon)),
+                ("Armaduras", item_labels(analyzer.get_items_by_type("armor"), 6, format_armor)),
+                ("Escudos", item_labels(analyzer.get_items_by_type("shield"), 6, format_shield)),
+                ("Equipamentos", item_labels(loose_items("equipment"), 30)),
+                ("Consumiveis", item_labels(loose_items("consumable"), 20)),
+                ("Tesouros", item_labels(loose_items("treasure"), 20, format_treasure)),
+            ):
+                pdf.section_title(title)
+                pdf.bullets(labels)
+        if show_backpacks:
+            for backpack in backpacks:
+                pdf.section_title(clean_text(backpack.name or "Mochila"))
+                pdf.bullets(item_labels(analyzer.get_items_in_container(backpack.id), max_items=50))
+        if sections.inventory_notes:
+            pdf.notes_box("Anotacoes de inventario")
+
+    if sections.spells and (sections.spells_list or sections.spells_resources or sections.spells_notes):
+        pdf.page_header("Magias", subtitle, chips=(chip,), footer=footer)
+        if sections.spells_list:
+            entries = spells_by_entry(analyzer)
+            if not entries:
+                pdf.paragraph("Nenhuma entrada de magia encontrada.", color=NATIVE_MUTED)
+            for header, entry_spells in entries:
+                pdf.section_title(header)
+                for spell, (details, description) in zip(entry_spells, spell_text_cache.texts(entry_spells)):
+                    pdf.ensure_space(12)
+                    pdf.paragraph(clean_text(spell.name), size=9, color=NATIVE_GREEN, style="B")
+                    pdf.paragraph(details, size=7.5, color=NATIVE_MUTED)
+                    pdf.paragraph(description, size=7.5)
+                    pdf.set_y(pdf.get_y() + 1.5)
+        if sections.spells_resources:
+            pdf.notes_box("Recursos de conjuracao", lines=3)
+        if sections.spells_notes:
+            pdf.notes_box("Anotacoes de magias")
+
+
+def render_native_pdf(analyzers, pdf_path: Path, sections: SectionFlags, overview=False) -> Path:
+    """Gera o PDF direto em Python, sem HTML nem Chrome.
+
+    Aceita um ou varios analyzers (modo --party) e, com overview, comeca pela
+    tabela de defesas do grupo.
+    """
+    pdf = native_pdf_class()()
+    sections = normalize_sections(sections)
+    if overview:
+        pdf.page_header(
+            "Grupo",
+            f"{len(analyzers)} personagem(ns)",
+            chips=(f"Nivel medio {average_level(analyzers)}",),
+            footer="Grupo",
+        )
+        rows = []
+        for analyzer in analyzers:
+            info = analyzer.get_character_info()
+            saves = analyzer.derived("saves")
+            rows.append([
+                info["name"],
+                info["level"],
+                analyzer.derived("ac")["total"],
+                f"+{saves.get('fortitude', {}).get('total', 0)}",
+                f"+{saves.get('reflex', {}).get('total', 0)}",
+                f"+{saves.get('will', {}).get('total', 0)}",
+                f"+{analyzer.derived('perception')['total']}",
+                info["hp"],
+            ])
+        pdf.table(
+            ["Personagem", "Nivel", "CA", "Fort", "Ref", "Von", "Percepcao", "PV"],
+            rows,
+            [0.3, 0.08, 0.08, 0.1, 0.1, 0.1, 0.14, 0.1],
+        )
+    for analyzer in analyzers:
+        native_sheet_pages(pdf, analyzer, sections)
+    if pdf.page_no() == 0:
+        pdf.add_page()
+    pdf.output(str(pdf_path))
+    return pdf_path
+
+
+# ==============================
+# PDF PIPELINE
+# ==============================
+
+class PdfPipeline:
+    """Estagio consumidor da impressao: threads proprias lendo uma fila limitada.
+
+    O produtor (parse, analise e HTML) chama submit() e segue para a proxima
+    ficha enquanto o Chrome imprime; com a fila cheia submit() bloqueia, o que
+    segura o produtor no ritmo do Chrome. Cada submit() devolve um Future com
+    o retorno de export_pdf.
+    """
+
+    def __init__(self, workers=2, depth=None):
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=depth or self.workers * 2)
+        self._threads = [
+            threading.Thread(target=self._consume, name=f"pdf-pipeline-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, html_path, pdf_path, on_start=None) -> Future:
+        from concurrent.futures import Future
+
+        future = Future()
+        self._queue.put((future, html_path, pdf_path, on_start))
+        return future
+
+    def _consume(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, html_path, pdf_path, on_start = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if on_start:
+                    on_start()
+                future.set_result(export_pdf(html_path, pdf_path))
+            except Exception as exc:
+                future.set_exception(exc)
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 def load_config(config_path: Path) -> Dict:
     if not config_path.exists():
         return {}
@@ -1636,11 +2928,94 @@ def load_config(config_path: Path) -> Dict:
 
 
 def save_config(config_path: Path, config: Dict) -> None:
+    import tempfile
+
     config_path.parent.mkdir(parents=True, exist_ok=True)
-    config_path.write_text(json.dumps(config, indent=2), encoding="utf-8")
+    fd, tmp_name = tempfile.mkstemp(prefix=".config_", suffix=".json", dir=config_path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(json.dumps(config, indent=2))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, config_path)
+    except OSError:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigStore:
+    """Copia em memoria de output/config.json compartilhada pelo processo.
+
+    Leituras nao tocam o disco depois da primeira carga. Escritas alteram a
+    copia sob lock e sao agrupadas numa janela de debounce antes de serem
+    gravadas de forma atomica (arquivo temporario + rename).
+    """
+
+    def __init__(self, path: Path, debounce=0.5):
+        self.path = path
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._config = None
+        self._dirty = False
+        self._timer = None
+        atexit.register(self.flush)
+
+    def _loaded(self) -> Dict:
+        if self._config is None:
+            self._config = load_config(self.path)
+        return self._config
+
+    def get(self) -> Dict:
+        with self._lock:
+            return json.loads(json.dumps(self._loaded()))
+
+    def replace(self, config: Dict) -> None:
+        with self._lock:
+            self._config = json.loads(json.dumps(config))
+            self._schedule()
+
+    def update(self, changes: Dict) -> None:
+        with self._lock:
+            self._loaded().update(json.loads(json.dumps(changes)))
+            self._schedule()
+
+    def _schedule(self) -> None:
+        self._dirty = True
+        if self.debounce <= 0:
+            self._write()
+            return
+        if self._timer is None:
+            self._timer = threading.Timer(self.debounce, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._write()
+
+    def _write(self) -> None:
+        try:
+            save_config(self.path, self._config)
+        except OSError as exc:
+            print(f"Falha ao salvar {self.path}: {exc}")
+            return
+        self._dirty = False
+
 
+config_store = ConfigStore(Path("output") / "config.json")
 
-def section_flags_from_config(config: Dict) -> SectionFlags:
+
+def section_flags_from_config(config: Dict = None) -> SectionFlags:
+    if config is None:
+        config = config_store.get()
     sections = config.get("sections", {})
     return SectionFlags(
         summary=sections.get("summary", True),
@@ -1717,83 +3092,550 @@ def normalize_sections(sections: SectionFlags) -> SectionFlags:
     return sections
 
 
-def run_generate(json_file: Path, sections: SectionFlags) -> bool:
+# ==============================
+# RENDER CACHE
+# ==============================
+
+GENERATOR_VERSION = "2.1"
+
+
+class RenderCache:
+    """Cache de HTML/PDF enderecado por conteudo em output/cache/<hash>/.
+
+    A chave combina os bytes do JSON, as secoes normalizadas, a versao do
+    gerador e o CSS da ficha. Entradas menos usadas sao removidas quando o
+    tamanho total passa de max_bytes. Um acerto devolve os arquivos da
+    geracao original, com o "Gerado em" daquela data.
+    """
+
+    def __init__(self, root: Path, max_bytes=200 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def key(self, raw: bytes, sections: SectionFlags) -> str:
+        digest = hashlib.sha256()
+        digest.update(raw)
+        digest.update(json.dumps(sections_to_config(sections), sort_keys=True).encode("utf-8"))
+        digest.update(GENERATOR_VERSION.encode("utf-8"))
+        digest.update(SHEET_CSS.encode("utf-8"))
+        return digest.hexdigest()
+
+    def restore(self, key: str, html_path: Path, pdf_path: Path) -> bool:
+        if not self.enabled:
+            return False
+        entry = self.root / key
+        cached_html = entry / "ficha.html"
+        cached_pdf = entry / "ficha.pdf"
+        if not (cached_html.exists() and cached_pdf.exists()):
+            return False
+        try:
+            shutil.copyfile(cached_html, html_path)
+            shutil.copyfile(cached_pdf, pdf_path)
+            os.utime(entry)
+        except OSError:
+            return False
+        return True
+
+    def store(self, key: str, html_path: Path, pdf_path: Path) -> None:
+        import tempfile
+
+        if not self.enabled:
+            return
+        entry = self.root / key
+        if entry.exists():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:12]}_", dir=self.root))
+        try:
+            shutil.copyfile(html_path, staging / "ficha.html")
+            shutil.copyfile(pdf_path, staging / "ficha.pdf")
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                candidates = list(self.root.iterdir())
+            except OSError:
+                return
+            for entry in candidates:
+                if entry.name.startswith("."):
+                    continue
+                # Outro processo do lote ou da Web UI pode remover a entrada
+                # enquanto ela e medida.
+                try:
+                    if not entry.is_dir():
+                        continue
+                    size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((mtime, size, entry))
+                total += size
+            entries.sort()
+            for _, size, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+
+
+render_cache = RenderCache(Path("output") / "cache")
+
+
+SPELL_TEXT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spell_texts (
+    key TEXT PRIMARY KEY,
+    details TEXT NOT NULL,
+    description TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+)
+"""
+
+
+class SpellTextCache:
+    """Metadados (format_spell_details) e descricao limpa de magias em SQLite.
+
+    A chave e o compendiumSource da magia mais um hash de tudo que a
+    formatacao le: a mesma magia de compendio em varias fichas, execucoes ou
+    processos do lote e limpa uma vez so. Cada lista de magias custa uma
+    consulta e as faltas sao gravadas numa unica transacao. O banco e
+    limitado a max_bytes de texto, removendo as entradas usadas ha mais tempo.
+    """
+
+    # O horario de uso de um acerto so e regravado depois deste intervalo,
+    # para que reimprimir fichas conhecidas nao escreva no banco.
+    TOUCH_INTERVAL = 3600
+
+    def __init__(self, db_path: Path, max_bytes=64 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        import sqlite3
+
+        # Processos do lote herdam o objeto via fork; cada um abre o seu.
+        if self._conn is None or self._pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SPELL_TEXT_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def key(spell) -> str:
+        digest = hashlib.sha1(GENERATOR_VERSION.encode("utf-8"))
+        for value in (
+            spell.level, spell.time, spell.range, spell.duration, spell.target, spell.area,
+            spell.requirements, spell.save, spell.basic_save, spell.traits, spell.description,
+        ):
+            digest.update(repr(value).encode("utf-8"))
+            digest.update(b"\0")
+        return f"{spell.source}#{digest.hexdigest()}"
+
+    def texts(self, spells):
+        """Lista (detalhes, descricao) alinhada com spells."""
+        if not spells:
+            return []
+        if not self.enabled or self.max_bytes <= 0:
+            return [(format_spell_details(spell), format_spell_description(spell)) for spell in spells]
+        import sqlite3
+
+        keys = [self.key(spell) for spell in spells]
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connection()
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    for key, details, description, used in conn.execute(
+                        f"SELECT key, details, description, used FROM spell_texts WHERE key IN ({placeholders})", chunk
+                    ):
+                        found[key] = (details, description, used)
+        except sqlite3.Error as exc:
+            return self._disable(exc, spells)
+
+        computed = {}
+        results = []
+        for spell, key in zip(spells, keys):
+            if key in found:
+                results.append(found[key][:2])
+                continue
+            if key not in computed:
+                computed[key] = (format_spell_details(spell), format_spell_description(spell))
+            results.append(computed[key])
+
+        now = time.time()
+        stale = [(now, key) for key, (_, _, used) in found.items() if now - used > self.TOUCH_INTERVAL]
+        with self._lock:
+            self.hits += len(keys) - sum(1 for key in keys if key in computed)
+            self.misses += len(computed)
+        if computed or stale:
+            rows = [
+                (key, details, description, len(details.encode("utf-8")) + len(description.encode("utf-8")), now)
+                for key, (details, description) in computed.items()
+            ]
+            try:
+                with self._lock:
+                    conn = self._connection()
+                    with conn:
+                        conn.executemany("INSERT OR REPLACE INTO spell_texts VALUES (?, ?, ?, ?, ?)", rows)
+                        conn.executemany("UPDATE spell_texts SET used = ? WHERE key = ?", stale)
+                    if rows:
+                        self._evict(conn)
+            except sqlite3.Error as exc:
+                self._disable(exc, ())
+        return results
+
+    def _evict(self, conn) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM spell_texts").fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM spell_texts ORDER BY used"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        with conn:
+            conn.executemany("DELETE FROM spell_texts WHERE key = ?", doomed)
+
+    def _disable(self, exc, spells):
+        # Banco travado ou corrompido nao impede a ficha: segue sem cache.
+        print(f"Aviso: cache de textos de magias indisponivel ({exc}).")
+        self.enabled = False
+        return [(format_spell_details(spell), format_spell_description(spell)) for spell in spells]
+
+    def stats(self) -> Dict:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses, "max_bytes": self.max_bytes}
+
+
+spell_text_cache = SpellTextCache(Path("output") / "text_cache.sqlite3")
+
+
+class StageTimer:
+    """Mede etapas consecutivas (parse, analyze, render, print...).
+
+    stage(nome) encerra a etapa anterior e inicia a proxima; listener, se
+    informado, e chamado a cada troca com (etapa_atual, timings).
+    """
+
+    def __init__(self, listener=None):
+        self.timings = {}
+        self.current = None
+        self._started = None
+        self._listener = listener
+
+    def stage(self, name):
+        self._close()
+        self.current = name
+        self._started = time.perf_counter()
+        if self._listener:
+            self._listener(name, dict(self.timings))
+
+    def record(self, name, seconds):
+        """Contabiliza um trecho medido por fora e o desconta da etapa atual."""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if self.current is not None:
+            self._started += seconds
+
+    def finish(self):
+        self._close()
+        self.current = None
+        if self._listener:
+            self._listener(None, dict(self.timings))
+        return self.timings
+
+    def _close(self):
+        if self.current is not None:
+            elapsed = time.perf_counter() - self._started
+            self.timings[self.current] = self.timings.get(self.current, 0.0) + elapsed
+
+
+def load_actor_json(json_file: Path, raw: bytes = None) -> Dict:
+    if raw is None:
+        raw = json_file.read_bytes()
+    data = json.loads(raw.decode("utf-8"))
+    if "name" not in data:
+        raise ValueError("JSON nao parece ser uma ficha valida.")
+    return data
+
+
+def output_paths(base_name: str):
+    output_dir = Path("output")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir / f"{base_name}_ficha.html", output_dir / f"{base_name}_ficha.pdf"
+
+
+def render_sheet(json_file: Path, sections: SectionFlags, raw: bytes = None, timer: StageTimer = None) -> Path:
+    timer = timer or StageTimer()
+    timer.stage("parse")
+    data = load_actor_json(json_file, raw)
+    return render_actor(data, json_file.stem, sections, timer)
+
+
+def render_actor(data: Dict, base_name: str, sections: SectionFlags, timer: StageTimer = None) -> Path:
+    timer = timer or StageTimer()
+    timer.stage("analyze")
+    sections = normalize_sections(sections)
+    analyzer = CharacterAnalyzer(data)
+    character_info = analyzer.get_character_info()
+    html_path, _ = output_paths(base_name)
+    timer.stage("render")
+    return write_chunks(iter_html(analyzer, f"Ficha {character_info['name']}", sections), html_path, timer)
+
+
+def open_file(path) -> None:
+    import subprocess
+
+    if sys.platform == "darwin":
+        subprocess.run(["open", str(path)])
+    elif sys.platform.startswith("linux"):
+        subprocess.run(["xdg-open", str(path)])
+    elif sys.platform.startswith("win"):
+        os.startfile(str(path))
+
+
+def prepare_generate(json_file: Path, sections: SectionFlags, timer: StageTimer):
+    """Parte produtora de run_generate: cache ou parse/analise/HTML.
+
+    Retorna (estado, html_path, pdf_path, cache_key), com estado "cached",
+    "rendered" ou None em caso de erro.
+    """
+    if not json_file.exists():
+        print(f"Erro: Arquivo '{json_file}' nao encontrado.")
+        return None, None, None, None
+
+    timer.stage("parse")
+    raw = json_file.read_bytes()
+    sections = normalize_sections(sections)
+    html_path, pdf_path = output_paths(json_file.stem)
+    cache_key = render_cache.key(raw, sections)
+    timer.stage("cache")
+    if render_cache.restore(cache_key, html_path, pdf_path):
+        print(f"Cache: ficha inalterada, reutilizando arquivos ({cache_key[:12]}).")
+        print(f"HTML gerado: {html_path}")
+        return "cached", html_path, pdf_path, cache_key
+
+    try:
+        html_path = render_sheet(json_file, sections, raw, timer)
+    except ValueError as exc:
+        print(f"Erro: {exc}")
+        return None, None, None, None
+
+    print(f"HTML gerado: {html_path}")
+    return "rendered", html_path, pdf_path, cache_key
+
+
+def finish_generate(ok: bool, html_path: Path, pdf_path: Path, cache_key: str = None, open_pdf=True) -> bool:
+    if not ok:
+        print("Falha ao gerar PDF. Abra o HTML no navegador e imprima manualmente.")
+        return False
+    print(f"PDF gerado: {pdf_path}")
+    if cache_key:
+        render_cache.store(cache_key, html_path, pdf_path)
+    if not open_pdf:
+        return True
+    try:
+        open_file(pdf_path)
+    except Exception:
+        print("Nota: PDF gerado, mas nao foi possivel abrir automaticamente.")
+    return True
+
+
+def run_generate(json_file: Path, sections: SectionFlags, timer: StageTimer = None, open_pdf=True) -> bool:
+    timer = timer or StageTimer()
+    state, html_path, pdf_path, cache_key = prepare_generate(json_file, sections, timer)
+    if state is None:
+        return False
+    if state == "cached":
+        return finish_generate(True, html_path, pdf_path, open_pdf=open_pdf)
+    timer.stage("print")
+    return finish_generate(export_pdf(html_path, pdf_path), html_path, pdf_path, cache_key, open_pdf)
+
+
+def render_native(data: Dict, base_name: str, sections: SectionFlags, timer: StageTimer = None) -> Path:
+    timer = timer or StageTimer()
+    timer.stage("analyze")
+    analyzer = CharacterAnalyzer(data)
+    _, pdf_path = output_paths(base_name)
+    timer.stage("print")
+    return render_native_pdf([analyzer], pdf_path, sections)
+
+
+def run_native(json_file: Path, sections: SectionFlags, timer: StageTimer = None, open_pdf=True) -> bool:
+    """run_generate sem Chrome: o PDF sai direto do analyzer via FPDF."""
     if not json_file.exists():
         print(f"Erro: Arquivo '{json_file}' nao encontrado.")
         return False
+    timer = timer or StageTimer()
+    timer.stage("parse")
+    try:
+        data = load_actor_json(json_file)
+        pdf_path = render_native(data, json_file.stem, sections, timer)
+    except ImportError:
+        print(NATIVE_MISSING_FPDF)
+        return False
+    except ValueError as exc:
+        print(f"Erro: {exc}")
+        return False
+    return finish_generate(True, None, pdf_path, open_pdf=open_pdf)
+
+
+def submit_generate(json_file: Path, sections: SectionFlags, timer: StageTimer, pipeline: PdfPipeline,
+                    finisher: Executor, open_pdf=True) -> Future:
+    """Como run_generate, mas entrega a impressao ao pipeline e retorna um Future.
+
+    O tempo ate o Chrome pegar a ficha aparece como a etapa "pdf_wait". A
+    finalizacao (gravar no cache de fichas, avisar, abrir o PDF) roda no
+    executor `finisher`, nunca na thread do pipeline, que volta direto para
+    a proxima impressao.
+    """
+    from concurrent.futures import Future
+
+    done = Future()
+    state, html_path, pdf_path, cache_key = prepare_generate(json_file, sections, timer)
+    if state != "rendered":
+        done.set_result(state == "cached" and finish_generate(True, html_path, pdf_path, open_pdf=open_pdf))
+        return done
+
+    def finish(printed):
+        try:
+            done.set_result(finish_generate(printed.result(), html_path, pdf_path, cache_key, open_pdf))
+        except Exception as exc:
+            done.set_exception(exc)
+
+    timer.stage("pdf_wait")
+    printing = pipeline.submit(html_path, pdf_path, on_start=lambda: timer.stage("print"))
+    printing.add_done_callback(lambda printed: finisher.submit(finish, printed))
+    return done
+
+
+class PreviewStore:
+    """Previas temporarias em temp/ com limite por quantidade, bytes e idade.
 
-    data = json.loads(json_file.read_text(encoding="utf-8"))
-    if "name" not in data:
-        print("Erro: JSON nao parece ser uma ficha valida.")
-        return False
+    So mexe em arquivos preview_*_temp.html. As menos acessadas saem primeiro;
+    a previa apontada por last_preview no config nunca e removida.
+    """
 
-    sections = normalize_sections(sections)
-    analyzer = CharacterAnalyzer(data)
-    character_info = analyzer.get_character_info()
-    output_dir = Path("output")
-    output_dir.mkdir(parents=True, exist_ok=True)
+    PATTERN = "preview_*_temp.html"
 
-    base_name = json_file.stem
-    html_path = output_dir / f"{base_name}_ficha.html"
-    pdf_path = output_dir / f"{base_name}_ficha.pdf"
+    def __init__(self, root: Path, max_files=50, max_bytes=50 * 1024 * 1024, max_age=7 * 24 * 3600):
+        self.root = root
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
 
-    html_out = generate_html(analyzer, f"Ficha {character_info['name']}", sections)
-    html_path.write_text(html_out, encoding="utf-8")
+    def new_path(self, stem: str) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        safe_name = stem.replace(" ", "_")
+        return self.root / f"preview_{safe_name}_{timestamp}_temp.html"
 
-    print(f"HTML gerado: {html_path}")
-    if export_pdf(html_path, pdf_path):
-        print(f"PDF gerado: {pdf_path}")
+    def touch(self, path: Path) -> None:
+        # Marca o acesso so pelo atime: o mtime alimenta o ETag da previa.
         try:
-            if sys.platform == "darwin":
-                subprocess.run(["open", str(pdf_path)])
-            elif sys.platform.startswith("linux"):
-                subprocess.run(["xdg-open", str(pdf_path)])
-            elif sys.platform.startswith("win"):
-                os.startfile(str(pdf_path))
-        except Exception:
-            print("Nota: PDF gerado, mas nao foi possivel abrir automaticamente.")
-        return True
-    else:
-        print("Falha ao gerar PDF. Abra o HTML no navegador e imprima manualmente.")
-        return False
+            stat = path.stat()
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            pass
+
+    def prune(self, keep=()) -> int:
+        protected = {os.path.abspath(p) for p in keep if p}
+        last_preview = config_store.get().get("last_preview")
+        if last_preview:
+            protected.add(os.path.abspath(last_preview))
+        with self._lock:
+            entries = []
+            for path in self.root.glob(self.PATTERN):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            count = len(entries)
+            cutoff = time.time() - self.max_age
+            removed = 0
+            for used, size, path in entries:
+                expired = used < cutoff
+                if not expired and count <= self.max_files and total_bytes <= self.max_bytes:
+                    break
+                if os.path.abspath(path) in protected:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                count -= 1
+                total_bytes -= size
+                removed += 1
+            return removed
+
+    def start_cleanup(self) -> threading.Thread:
+        thread = threading.Thread(target=self.prune, daemon=True)
+        thread.start()
+        return thread
+
 
+preview_store = PreviewStore(Path("temp"))
 
-def run_preview(json_file: Path, sections: SectionFlags) -> Path:
+
+def run_preview(json_file: Path, sections: SectionFlags, timer: StageTimer = None) -> Path:
     if not json_file.exists():
         raise FileNotFoundError(f"Arquivo '{json_file}' nao encontrado.")
-    data = json.loads(json_file.read_text(encoding="utf-8"))
-    if "name" not in data:
-        raise ValueError("JSON nao parece ser uma ficha valida.")
+    timer = timer or StageTimer()
+    timer.stage("parse")
+    data = load_actor_json(json_file)
+    timer.stage("analyze")
     sections = normalize_sections(sections)
     analyzer = CharacterAnalyzer(data)
     character_info = analyzer.get_character_info()
-    temp_dir = Path("temp")
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    safe_name = json_file.stem.replace(" ", "_")
-    html_path = temp_dir / f"preview_{safe_name}_{timestamp}_temp.html"
-    html_out = generate_html(analyzer, f"Ficha {character_info['name']}", sections)
+    html_path = preview_store.new_path(json_file.stem)
     floating_button = """
 <div class="preview-json" id="previewJson">JSON: __JSON_LABEL__</div>
 <a href="#" class="floating-generate" id="floatingGenerate">Gerar ficha</a>
 <script>
   document.getElementById('floatingGenerate').addEventListener('click', (e) => {
     e.preventDefault();
+    const waitJob = (id) => fetch('/api/jobs/' + id).then((r) => r.json()).then((job) =>
+      job.status === 'done' || job.status === 'error' ? job : new Promise((ok) => setTimeout(ok, 500)).then(() => waitJob(id)));
     fetch('/api/generate', {
       method: 'POST',
       headers: {'Content-Type': 'application/json'},
       body: JSON.stringify({json_path: '__JSON_PATH__', sections: __SECTIONS__})
-    }).then(() => alert('Ficha gerada.')).catch(() => alert('Falha ao gerar ficha.'));
+    }).then((r) => r.json()).then((data) => waitJob(data.job_id)).then((job) => {
+      alert(job.status === 'done' && job.result && job.result.ok ? 'Ficha gerada.' : 'Falha ao gerar ficha.');
+    }).catch(() => alert('Falha ao gerar ficha.'));
   });
 </script>
 """
     floating_button = floating_button.replace("__JSON_PATH__", str(json_file).replace("\\", "\\\\"))
     floating_button = floating_button.replace("__JSON_LABEL__", html.escape(str(json_file)))
     floating_button = floating_button.replace("__SECTIONS__", json.dumps(sections_to_config(sections)["sections"]))
-    html_out = html_out.replace("</body>", f"{floating_button}</body>")
-    html_out = html_out.replace(
-        "</style>",
-        """
+    preview_css = """
     .preview-json {
       position: fixed;
       top: 16px;
@@ -1825,28 +3667,1339 @@ def run_preview(json_file: Path, sections: SectionFlags) -> Path:
       z-index: 9999;
       box-shadow: 0 8px 18px rgba(0,0,0,0.2);
     }
-        </style>""",
+        """
+    timer.stage("render")
+    chunks = iter_html(
+        analyzer,
+        f"Ficha {character_info['name']}",
+        sections,
+        extra_css=preview_css,
+        extra_body=floating_button,
     )
-    html_path.write_text(html_out, encoding="utf-8")
+    write_chunks(chunks, html_path, timer)
+    preview_store.prune(keep=(html_path,))
     return html_path
 
 
+# ==============================
+# BATCH
+# ==============================
+
+def resolve_batch_inputs(pattern: str):
+    target = Path(pattern)
+    if target.is_dir():
+        return sorted(target.glob("*.json"))
+    import glob
+
+    return sorted(Path(p) for p in glob.glob(pattern) if p.lower().endswith(".json"))
+
+
+def _batch_render(json_path: str, sections: SectionFlags, raw: bytes) -> str:
+    # Roda em processo separado: parse, calculo e HTML.
+    return str(render_sheet(Path(json_path), sections, raw))
+
+
+def _batch_native(json_path: str, sections: SectionFlags, raw: bytes) -> str:
+    # Roda em processo separado: parse, calculo e PDF direto, sem Chrome.
+    return str(render_native(load_actor_json(Path(json_path), raw), Path(json_path).stem, sections))
+
+
+def _batch_worker_init(text_cache_max_bytes):
+    spell_text_cache.max_bytes = text_cache_max_bytes
+
+
+def batch_render_pool(jobs=None):
+    """ProcessPoolExecutor do lote, com processos iniciados por spawn.
+
+    Os processos sobem no primeiro submit, depois das threads do pipeline de
+    PDF e dos pipes do pool do Chrome; com fork herdariam locks que podem
+    estar presos. As opcoes do CLI usadas na renderizacao vao pelo initializer.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_batch_worker_init,
+        initargs=(spell_text_cache.max_bytes,),
+    )
+
+
+def run_batch_native(json_files, sections: SectionFlags, jobs=None) -> bool:
+    from concurrent.futures import as_completed
+
+    if not json_files:
+        print("Nenhum JSON encontrado para o lote.")
+        return False
+    sections = normalize_sections(sections)
+    results = {}
+    print(f"Lote (backend nativo): {len(json_files)} arquivo(s), {jobs or os.cpu_count()} processo(s).")
+    with batch_render_pool(jobs) as render_pool:
+        futures = {}
+        for json_file in json_files:
+            try:
+                raw = json_file.read_bytes()
+            except OSError as exc:
+                results[json_file] = (False, f"erro ao ler JSON: {exc}")
+                continue
+            futures[render_pool.submit(_batch_native, str(json_file), sections, raw)] = json_file
+        for future in as_completed(futures):
+            json_file = futures[future]
+            try:
+                results[json_file] = (True, future.result())
+            except ImportError:
+                results[json_file] = (False, NATIVE_MISSING_FPDF)
+            except Exception as exc:
+                results[json_file] = (False, f"erro ao gerar PDF: {exc}")
+    return print_batch_summary(json_files, results)
+
+
+def run_batch(json_files, sections: SectionFlags, jobs=None, pdf_jobs=2) -> bool:
+    from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+
+    if not json_files:
+        print("Nenhum JSON encontrado para o lote.")
+        return False
+    sections = normalize_sections(sections)
+    results = {}
+    print(f"Lote: {len(json_files)} arquivo(s), {jobs or os.cpu_count()} processo(s), {pdf_jobs} impressao(oes) simultanea(s).")
+    # Produtor: processos renderizam no maximo `window` fichas adiantadas.
+    # Consumidor: o pipeline de PDF, cuja fila limitada freia o produtor.
+    window = 2 * (jobs or os.cpu_count() or 1)
+    with batch_render_pool(jobs) as render_pool, PdfPipeline(workers=pdf_jobs) as pdf_pipeline:
+        render_futures = {}
+        pdf_futures = {}
+        cache_keys = {}
+
+        def collect(block):
+            done, _ = wait(render_futures, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                json_file = render_futures.pop(future)
+                try:
+                    html_path = Path(future.result())
+                except Exception as exc:
+                    results[json_file] = (False, f"erro ao gerar HTML: {exc}")
+                    continue
+                _, pdf_path = output_paths(json_file.stem)
+                pdf_futures[pdf_pipeline.submit(html_path, pdf_path)] = (json_file, html_path, pdf_path)
+
+        for json_file in json_files:
+            try:
+                raw = json_file.read_bytes()
+            except OSError as exc:
+                results[json_file] = (False, f"erro ao ler JSON: {exc}")
+                continue
+            html_path, pdf_path = output_paths(json_file.stem)
+            cache_keys[json_file] = render_cache.key(raw, sections)
+            if render_cache.restore(cache_keys[json_file], html_path, pdf_path):
+                results[json_file] = (True, f"{pdf_path} (cache)")
+                continue
+            while len(render_futures) >= window:
+                collect(block=True)
+            render_futures[render_pool.submit(_batch_render, str(json_file), sections, raw)] = json_file
+            collect(block=False)
+        while render_futures:
+            collect(block=True)
+        for future in as_completed(pdf_futures):
+            json_file, html_path, pdf_path = pdf_futures[future]
+            try:
+                ok = future.result()
+            except Exception as exc:
+                results[json_file] = (False, f"erro ao exportar PDF: {exc}")
+                continue
+            if ok:
+                render_cache.store(cache_keys[json_file], html_path, pdf_path)
+                results[json_file] = (True, str(pdf_path))
+            else:
+                results[json_file] = (False, f"PDF nao exportado (HTML em {html_path})")
+
+    return print_batch_summary(json_files, results)
+
+
+def print_batch_summary(labels, results) -> bool:
+    print("")
+    print("Resumo do lote:")
+    failures = 0
+    for label in labels:
+        ok, message = results.get(label, (False, "sem resultado"))
+        if not ok:
+            failures += 1
+        print(f"  [{'ok' if ok else 'falha'}] {label}: {message}")
+    print(f"{len(labels) - failures} ok, {failures} falha(s).")
+    return failures == 0
+
+
+# ==============================
+# FOUNDRY WORLD (actors.db)
+# ==============================
+
+def _world_actor_matches(doc, actor_type, names) -> bool:
+    if actor_type and doc.get("type") != actor_type:
+        return False
+    if names and str(doc.get("name", "")).lower() not in names:
+        return False
+    return True
+
+
+def iter_world_actors(db_path: Path, actor_type="character", names=None):
+    """Le um actors.db do Foundry (NeDB, um JSON por linha) actor a actor.
+
+    O NeDB acrescenta uma nova linha a cada alteracao e marca remocoes com
+    "$$deleted". A primeira passada guarda so o offset da ultima versao de
+    cada _id que passa no filtro; a segunda le essas linhas uma a uma. A
+    memoria fica limitada ao maior actor, nao ao mundo inteiro.
+
+    Produz tuplas (linha_bruta, actor).
+    """
+    names = {name.lower() for name in names} if names else None
+    latest = {}
+    with db_path.open("rb") as handle:
+        offset = 0
+        for line in handle:
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+            except ValueError:
+                continue
+            doc_id = doc.get("_id")
+            if not doc_id or "$$indexCreated" in doc:
+                continue
+            if doc.get("$$deleted") or not _world_actor_matches(doc, actor_type, names):
+                latest.pop(doc_id, None)
+            else:
+                latest[doc_id] = line_offset
+        for line_offset in sorted(latest.values()):
+            handle.seek(line_offset)
+            line = handle.readline()
+            yield line, json.loads(line)
+
+
+def world_actor_base_name(doc, used_names) -> str:
+    base_name = re.sub(r"[^\w.-]+", "_", str(doc.get("name", "actor"))).strip("_") or "actor"
+    if base_name in used_names:
+        base_name = f"{base_name}_{doc.get('_id', '')[:8]}"
+    used_names.add(base_name)
+    return base_name
+
+
+def run_world(db_path: Path, sections: SectionFlags, actor_type="character", names=None, pdf_jobs=2,
+              backend="chrome") -> bool:
+    from concurrent.futures import as_completed
+
+    if not db_path.exists():
+        print(f"Erro: Arquivo '{db_path}' nao encontrado.")
+        return False
+    sections = normalize_sections(sections)
+    labels = []
+    results = {}
+    used_names = set()
+    if backend == "native":
+        for _, doc in iter_world_actors(db_path, actor_type, names):
+            base_name = world_actor_base_name(doc, used_names)
+            label = f"{doc.get('name', '?')} ({base_name})"
+            labels.append(label)
+            try:
+                results[label] = (True, str(render_native(doc, base_name, sections)))
+            except ImportError:
+                results[label] = (False, NATIVE_MISSING_FPDF)
+            except Exception as exc:
+                results[label] = (False, f"erro ao gerar PDF: {exc}")
+        if not labels:
+            print("Nenhum actor encontrado com os filtros informados.")
+            return False
+        return print_batch_summary(labels, results)
+    with PdfPipeline(workers=pdf_jobs) as pdf_pipeline:
+        pdf_futures = {}
+        for raw, doc in iter_world_actors(db_path, actor_type, names):
+            base_name = world_actor_base_name(doc, used_names)
+            label = f"{doc.get('name', '?')} ({base_name})"
+            labels.append(label)
+            html_path, pdf_path = output_paths(base_name)
+            cache_key = render_cache.key(raw, sections)
+            if render_cache.restore(cache_key, html_path, pdf_path):
+                results[label] = (True, f"{pdf_path} (cache)")
+                continue
+            try:
+                render_actor(doc, base_name, sections)
+            except Exception as exc:
+                results[label] = (False, f"erro ao gerar HTML: {exc}")
+                continue
+            future = pdf_pipeline.submit(html_path, pdf_path)
+            pdf_futures[future] = (label, cache_key, html_path, pdf_path)
+        for future in as_completed(pdf_futures):
+            label, cache_key, html_path, pdf_path = pdf_futures[future]
+            try:
+                ok = future.result()
+            except Exception as exc:
+                results[label] = (False, f"erro ao exportar PDF: {exc}")
+                continue
+            if ok:
+                render_cache.store(cache_key, html_path, pdf_path)
+                results[label] = (True, str(pdf_path))
+            else:
+                results[label] = (False, f"PDF nao exportado (HTML em {html_path})")
+    if not labels:
+        print("Nenhum actor encontrado com os filtros informados.")
+        return False
+    return print_batch_summary(labels, results)
+
+
+# ==============================
+# PARTY (varias fichas num PDF)
+# ==============================
+
+def run_party(json_files, sections: SectionFlags, base_name="grupo", overview=True, timer: StageTimer = None,
+              backend="chrome") -> bool:
+    timer = timer or StageTimer()
+    timer.stage("parse")
+    sections = normalize_sections(sections)
+    raws = []
+    actors = []
+    for json_file in json_files:
+        try:
+            raw = json_file.read_bytes()
+            actors.append(load_actor_json(json_file, raw))
+        except (OSError, ValueError) as exc:
+            print(f"Erro: {json_file}: {exc}")
+            return False
+        raws.append(raw)
+    if not actors:
+        print("Nenhum JSON informado para o grupo.")
+        return False
+
+    html_path, pdf_path = output_paths(base_name)
+    if backend == "native":
+        timer.stage("analyze")
+        analyzers = [CharacterAnalyzer(data) for data in actors]
+        timer.stage("print")
+        try:
+            render_native_pdf(analyzers, pdf_path, sections, overview)
+        except ImportError:
+            print(NATIVE_MISSING_FPDF)
+            return False
+        return finish_generate(True, html_path, pdf_path)
+
+    cache_key = render_cache.key(b"\0".join([b"party", b"overview" if overview else b""] + raws), sections)
+    timer.stage("cache")
+    if render_cache.restore(cache_key, html_path, pdf_path):
+        print(f"Cache: grupo inalterado, reutilizando arquivos ({cache_key[:12]}).")
+        print(f"HTML gerado: {html_path}")
+        return finish_generate(True, html_path, pdf_path)
+
+    timer.stage("analyze")
+    analyzers = [CharacterAnalyzer(data) for data in actors]
+    names = ", ".join(str(analyzer.get_character_info()["name"]) for analyzer in analyzers)
+    timer.stage("render")
+    write_chunks(iter_party_html(analyzers, f"Grupo: {names}", sections, overview), html_path, timer)
+    print(f"HTML gerado: {html_path} ({len(analyzers)} personagem(ns))")
+    timer.stage("print")
+    return finish_generate(export_pdf(html_path, pdf_path), html_path, pdf_path, cache_key)
+
+
+# ==============================
+# WATCH (pasta observada)
+# ==============================
+
+def _watched_name(name: str) -> bool:
+    # Temporarios de ferramentas de sincronizacao costumam comecar com ".".
+    return name.lower().endswith(".json") and not name.startswith(".")
+
+
+class InotifyWatcher:
+    """Eventos do inotify (Linux) para os JSONs de uma pasta, via ctypes."""
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+
+    def __init__(self, directory: Path):
+        import ctypes
+        import ctypes.util
+        import struct
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify indisponivel")
+        self.directory = directory
+        self.event_header = struct.Struct("iIII")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch falhou")
+
+    def poll(self, timeout):
+        import select
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        offset = 0
+        while offset + self.event_header.size <= len(data):
+            _, mask, _, length = self.event_header.unpack_from(data, offset)
+            offset += self.event_header.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # Fila do kernel estourou: relista a pasta inteira.
+                names.update(entry.name for entry in os.scandir(self.directory) if _watched_name(entry.name))
+            elif name and _watched_name(name):
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Alternativa portavel: compara (mtime, tamanho) dos JSONs a cada intervalo."""
+
+    def __init__(self, directory: Path, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._stamps = self._scan()
+
+    def _scan(self):
+        stamps = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not _watched_name(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        stamps = self._scan()
+        changed = {name for name, stamp in stamps.items() if self._stamps.get(name) != stamp}
+        self._stamps = stamps
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory: Path, interval=1.0):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except OSError as exc:
+            print(f"Aviso: inotify indisponivel ({exc}); verificando a pasta a cada {interval:g} s.")
+    return PollingWatcher(directory, interval)
+
+
+def file_digest(path: Path):
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _watch_generate(json_file: Path, sections: SectionFlags, backend: str):
+    run = run_native if backend == "native" else run_generate
+    started = time.perf_counter()
+    ok = run(json_file, sections, open_pdf=False)
+    return ok, time.perf_counter() - started
+
+
+def _watch_timeout(pending, running, workers, interval):
+    # Arquivos vencidos que nao podem sair agora (ja em andamento ou sem
+    # worker livre) nao encurtam a espera; sem isso o laco giraria com
+    # timeout 0 enquanto uma ficha imprime. Eles sao reavaliados a cada
+    # `interval`, quando as tarefas concluidas tambem sao recolhidas.
+    now = time.monotonic()
+    free = len(running) < workers
+    waits = [interval]
+    for name, deadline in pending.items():
+        if deadline > now:
+            waits.append(deadline - now)
+        elif free and name not in running:
+            waits.append(0.0)
+    return min(waits)
+
+
+def run_watch(directory: Path, sections: SectionFlags, workers=2, debounce=1.0, interval=1.0, backend="chrome") -> bool:
+    """Regenera as fichas dos JSONs novos ou alterados em directory ate Ctrl+C.
+
+    Cada arquivo so entra na fila depois de `debounce` segundos sem novos
+    eventos; no maximo `workers` fichas rodam ao mesmo tempo e um arquivo
+    nunca roda duas vezes em paralelo. Arquivos cujo conteudo (sha256) nao
+    mudou sao ignorados, mesmo que o mtime tenha mudado.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not directory.is_dir():
+        print(f"Erro: Pasta '{directory}' nao encontrada.")
+        return False
+    sections = normalize_sections(sections)
+    watcher = open_watcher(directory, interval)
+    digests = {}
+    for entry in os.scandir(directory):
+        if _watched_name(entry.name):
+            digests[entry.name] = file_digest(Path(entry.path))
+    mode = "inotify" if isinstance(watcher, InotifyWatcher) else "verificacao periodica"
+    print(f"Observando {directory} ({len(digests)} JSON(s), {mode}). Ctrl+C para sair.")
+
+    pending = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                for name in watcher.poll(_watch_timeout(pending, running, workers, interval)):
+                    pending[name] = time.monotonic() + debounce
+
+                for name, future in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[name]
+                    try:
+                        ok, elapsed = future.result()
+                    except Exception as exc:
+                        ok = False
+                        print(f"[falha] {name}: {exc}")
+                    else:
+                        print(f"[{'ok' if ok else 'falha'}] {name} ({elapsed:.2f} s)")
+                    if not ok:
+                        # Sem o hash, a proxima escrita tenta de novo mesmo com o mesmo conteudo.
+                        digests.pop(name, None)
+
+                now = time.monotonic()
+                for name, deadline in sorted(pending.items(), key=lambda item: item[1]):
+                    if deadline > now or name in running or len(running) >= workers:
+                        continue
+                    del pending[name]
+                    json_file = directory / name
+                    digest = file_digest(json_file)
+                    if digest is None or digests.get(name) == digest:
+                        continue
+                    digests[name] = digest
+                    print(f"Atualizando {name}...")
+                    running[name] = pool.submit(_watch_generate, json_file, sections, backend)
+        except KeyboardInterrupt:
+            print("\nObservacao encerrada; aguardando fichas em andamento.")
+        finally:
+            watcher.close()
+    return True
+
+
+# ==============================
+# RENDER JOBS (Web UI)
+# ==============================
+
+class RenderJob:
+    def __init__(self, job_id, kind):
+        self.id = job_id
+        self.kind = kind
+        self.status = "queued"
+        self.stage = None
+        self.timings = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def update(self, **fields):
+        with self._changed:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.to_dict(), self.version
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "timings": {stage: round(seconds, 4) for stage, seconds in self.timings.items()},
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class RenderJobQueue:
+    """Fila de geracao/previa com numero limitado de workers.
+
+    Os handlers HTTP so enfileiram e devolvem o id; o progresso (etapa atual
+    e tempos de parse/analyze/render/print) fica em /api/jobs/<id>.
+    """
+
+    def __init__(self, workers=2, history=200, listener=None):
+        self.history = history
+        self._listener = listener
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+        for index in range(max(1, workers)):
+            threading.Thread(target=self._worker, name=f"render-job-{index}", daemon=True).start()
+
+    def submit(self, kind, func):
+        with self._lock:
+            self._counter += 1
+            job = RenderJob(f"{int(time.time())}-{self._counter}", kind)
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.finished]
+            for old in finished[: max(0, len(finished) - self.history)]:
+                del self._jobs[old.id]
+        self._queue.put((job, func))
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _worker(self):
+        from concurrent.futures import Future
+
+        while True:
+            job, func = self._queue.get()
+            timer = StageTimer(lambda stage, timings, job=job: job.update(stage=stage, timings=timings))
+            job.update(status="running")
+            try:
+                result = func(timer)
+            except Exception as exc:
+                self._complete(job, timer, error=exc)
+                continue
+            if isinstance(result, Future):
+                # A impressao segue no pipeline de PDF; o worker ja pode
+                # preparar o proximo job.
+                result.add_done_callback(lambda future, job=job, timer=timer: self._complete_future(job, timer, future))
+            else:
+                self._complete(job, timer, result=result)
+
+    def _complete_future(self, job, timer, future):
+        try:
+            result = future.result()
+        except Exception as exc:
+            self._complete(job, timer, error=exc)
+            return
+        self._complete(job, timer, result=result)
+
+    def _complete(self, job, timer, result=None, error=None):
+        if error is not None:
+            job.update(status="error", error=str(error), timings=timer.finish(), stage=None)
+        else:
+            job.update(status="done", result=result, timings=timer.finish(), stage=None)
+        if self._listener:
+            self._listener(job)
+
+
+# ==============================
+# METRICS (Web UI)
+# ==============================
+
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Contagem por faixas fixas de latencia mais uma janela recente para percentis."""
+
+    def __init__(self, window=1000):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        millis = seconds * 1000
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and millis > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(millis)
+
+    def to_dict(self):
+        ordered = sorted(self.recent)
+
+        def pick(fraction):
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3) if ordered else None
+
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else None,
+            "p50_ms": pick(0.50),
+            "p90_ms": pick(0.90),
+            "p99_ms": pick(0.99),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class Metrics:
+    """Contadores e histogramas em memoria servidos em /api/metrics."""
+
+    ROUTES = {
+        "/", "/app.js", "/style.css", "/preview", "/api/jsons", "/api/config",
+        "/api/upload", "/api/generate", "/api/preview", "/api/metrics",
+    }
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._jobs = {}
+        self._stages = {}
+
+    @classmethod
+    def route(cls, path):
+        if path.startswith("/api/jobs/"):
+            return "/api/jobs/<id>/events" if path.endswith("/events") else "/api/jobs/<id>"
+        return path if path in cls.ROUTES else "other"
+
+    def observe_request(self, path, status, seconds):
+        route = self.route(path)
+        with self._lock:
+            entry = self._requests.get(route)
+            if entry is None:
+                entry = self._requests[route] = {"count": 0, "errors": 0, "latency": Histogram(self.window)}
+            entry["count"] += 1
+            if status >= 400:
+                entry["errors"] += 1
+            entry["latency"].observe(seconds)
+
+    def observe_job(self, job):
+        with self._lock:
+            counts = self._jobs.setdefault(job.kind, {"done": 0, "error": 0})
+            counts[job.status] = counts.get(job.status, 0) + 1
+            stages = self._stages.setdefault(job.kind, {})
+            for stage, seconds in job.timings.items():
+                histogram = stages.get(stage)
+                if histogram is None:
+                    histogram = stages[stage] = Histogram(self.window)
+                histogram.observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "requests": {
+                    route: {"count": entry["count"], "errors": entry["errors"], "latency": entry["latency"].to_dict()}
+                    for route, entry in self._requests.items()
+                },
+                "jobs": {kind: dict(counts) for kind, counts in self._jobs.items()},
+                "stages": {
+                    kind: {stage: histogram.to_dict() for stage, histogram in stages.items()}
+                    for kind, stages in self._stages.items()
+                },
+                "text_cache": text_cache_stats(),
+                "spell_text_cache": spell_text_cache.stats(),
+            }
+
+
+def server_timing_header(timings, total=None):
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def print_stage_report(timings, text_caches=None):
+    total = sum(timings.values())
+    print("Tempo por etapa:")
+    for stage, seconds in timings.items():
+        share = seconds / total * 100 if total else 0.0
+        print(f"  {stage:<8} {seconds * 1000:10.1f} ms  {share:5.1f}%")
+    print(f"  {'total':<8} {total * 1000:10.1f} ms")
+    if text_caches:
+        print("Cache de textos (acertos / faltas / fora do cache / tamanho):")
+        for name, stats in text_caches.items():
+            lookups = stats["hits"] + stats["misses"]
+            rate = stats["hits"] / lookups * 100 if lookups else 0.0
+            print(
+                f"  {name:<18} {stats['hits']:7d} / {stats['misses']:7d} / {stats['bypassed']:5d} / "
+                f"{stats['size']}/{stats['maxsize']}  ({rate:.0f}% acertos)"
+            )
+
+
+# Modulos que o CLI so importa quando o caminho precisa deles.
+STARTUP_LAZY_GROUPS = (
+    ("Chrome / abrir PDF", ("subprocess", "select", "base64", "tempfile")),
+    ("lote e pipeline", ("concurrent.futures.process",)),
+    ("catalogo", ("sqlite3",)),
+    ("Web UI", ("http.server", "mimetypes", "gzip", "urllib.parse")),
+    ("backend nativo", ("fpdf",)),
+)
+
+
+def parse_importtime(text):
+    """Linhas de `python -X importtime` como (profundidade, self_us, cumulativo_us, modulo).
+
+    Linhas "#grupo <nome>" e "#ausente <modulo>" (escritas pelo processo
+    medido) passam como (None, 0, 0, linha).
+    """
+    rows = []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            rows.append((None, 0, 0, line))
+            continue
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, int(self_us.split(":")[-1]), int(cumulative), name.strip()))
+    return rows
+
+
+def _best_wall_time(cmd, repeat):
+    import subprocess
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def print_startup_report(repeat=3, top=12):
+    """Mede a inicializacao num interpretador novo com -X importtime."""
+    import subprocess
+
+    module_dir = str(Path(__file__).resolve().parent)
+    groups = ", ".join(f"({label!r}, {modules!r})" for label, modules in STARTUP_LAZY_GROUPS)
+    child = (
+        f"import sys\nsys.path.insert(0, {module_dir!r})\nimport conversor_v2\n"
+        f"for label, modules in [{groups}]:\n"
+        "    sys.stderr.write('#grupo ' + label + '\\n'); sys.stderr.flush()\n"
+        "    for name in modules:\n"
+        "        try:\n"
+        "            __import__(name)\n"
+        "        except ImportError:\n"
+        "            sys.stderr.write('#ausente ' + name + '\\n'); sys.stderr.flush()\n"
+    )
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", child], capture_output=True, text=True)
+    if result.returncode != 0:
+        print("Erro ao medir a inicializacao:")
+        print(result.stderr.strip()[-2000:])
+        return False
+
+    module_row = None
+    children = []
+    pending = []
+    lazy = {}
+    missing = {}
+    group = None
+    for depth, self_us, cumulative, name in parse_importtime(result.stderr):
+        if depth is None:
+            kind, _, value = name.partition(" ")
+            if kind == "#grupo":
+                group = value
+                lazy[group] = 0
+            elif group is not None:
+                missing.setdefault(group, []).append(value)
+            continue
+        if group is not None:
+            if depth == 0:
+                lazy[group] += cumulative
+        elif depth == 0:
+            if name == "conversor_v2":
+                module_row = (self_us, cumulative)
+                children = pending
+            pending = []
+        elif depth == 1:
+            pending.append((cumulative, name))
+
+    bare = _best_wall_time([sys.executable, "-c", "pass"], repeat)
+    loaded = _best_wall_time([sys.executable, "-c", f"import sys; sys.path.insert(0, {module_dir!r}); import conversor_v2"], repeat)
+    start = time.perf_counter()
+    compile(Path(__file__).read_text(encoding="utf-8"), __file__, "exec")
+    compile_time = time.perf_counter() - start
+
+    print("Inicializacao (python -X importtime):")
+    if module_row:
+        print(f"  {'import conversor_v2':<32} {module_row[1] / 1000:8.1f} ms  (proprio modulo {module_row[0] / 1000:.1f} ms)")
+        for cumulative, name in sorted(children, reverse=True)[:top]:
+            print(f"    {name:<30} {cumulative / 1000:8.1f} ms")
+    print("Carregado sob demanda (nao pago numa conversao avulsa):")
+    for label, _ in STARTUP_LAZY_GROUPS:
+        if label in missing:
+            note = "nao instalado"
+        else:
+            note = f"{lazy.get(label, 0) / 1000:8.1f} ms"
+        print(f"  {label:<32} {note:>11}")
+    print("Tempo de parede (melhor de %d):" % repeat)
+    print(f"  {'python -c pass':<32} {bare * 1000:8.1f} ms")
+    print(f"  {'python + import conversor_v2':<32} {loaded * 1000:8.1f} ms")
+    print(f"  {'compilar o script (sem .pyc)':<32} {compile_time * 1000:8.1f} ms")
+    print("Rodar como `python conversor_v2.py` recompila o arquivo a cada chamada;")
+    print("`python -m conversor_v2` reaproveita o .pyc em __pycache__.")
+    return True
+
+
+# ==============================
+# UPLOADS (multipart em streaming)
+# ==============================
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_MAX_HEADER = 16 * 1024
+_MULTIPART_FILENAME = re.compile(r'filename="([^"]*)"|filename=([^;\s]+)', re.IGNORECASE)
+
+
+def multipart_boundary(content_type: str) -> bytes:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary" and value:
+            return value.strip('"').encode("utf-8")
+    return b""
+
+
+def save_multipart_uploads(stream, boundary: bytes, content_length: int, dest_dir: Path):
+    """Grava os arquivos de um corpo multipart/form-data direto em dest_dir.
+
+    Le no maximo UPLOAD_CHUNK_SIZE bytes por vez; so o pedaco atual e o
+    final de uma possivel fronteira ficam em memoria. Cada arquivo e escrito
+    num temporario e renomeado ao terminar. Campos sem filename sao
+    descartados. Retorna a lista de caminhos gravados.
+    """
+    import tempfile
+
+    delimiter = b"\r\n--" + boundary
+    keep = len(delimiter) - 1
+    remaining = content_length
+    # O "\r\n" inicial permite achar a primeira fronteira, que abre o corpo.
+    buffer = b"\r\n"
+    saved = []
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    def fill():
+        nonlocal remaining, buffer
+        if remaining <= 0:
+            return False
+        chunk = stream.read(min(UPLOAD_CHUNK_SIZE, remaining))
+        if not chunk:
+            remaining = 0
+            return False
+        remaining -= len(chunk)
+        buffer += chunk
+        return True
+
+    def need(marker, limit=None):
+        while marker not in buffer:
+            if limit is not None and len(buffer) > limit:
+                raise ValueError("cabecalho de upload muito grande")
+            if not fill():
+                raise ValueError("upload incompleto")
+
+    while True:
+        index = buffer.find(delimiter)
+        if index != -1:
+            buffer = buffer[index + len(delimiter):]
+            break
+        buffer = buffer[-keep:]
+        if not fill():
+            raise ValueError("upload invalido")
+
+    while True:
+        while len(buffer) < 2:
+            if not fill():
+                raise ValueError("upload incompleto")
+        if buffer.startswith(b"--"):
+            break
+        need(b"\r\n")
+        buffer = buffer[buffer.index(b"\r\n") + 2:]
+        need(b"\r\n\r\n", UPLOAD_MAX_HEADER)
+        headers, buffer = buffer.split(b"\r\n\r\n", 1)
+        match = _MULTIPART_FILENAME.search(headers.decode("utf-8", errors="ignore"))
+        handle = None
+        if match:
+            filename = os.path.basename((match.group(1) or match.group(2) or "").replace("\\", "/"))
+            # Sem ".", ".." nem nomes ocultos (que colidiriam com os .upload_*).
+            filename = filename.lstrip(".")
+            handle = tempfile.NamedTemporaryFile(dir=dest_dir, prefix=".upload_", delete=False)
+        try:
+            while True:
+                index = buffer.find(delimiter)
+                if index != -1:
+                    if handle:
+                        handle.write(buffer[:index])
+                    buffer = buffer[index + len(delimiter):]
+                    break
+                if len(buffer) > keep:
+                    if handle:
+                        handle.write(buffer[:-keep])
+                    buffer = buffer[-keep:]
+                if not fill():
+                    raise ValueError("upload incompleto")
+            if handle:
+                handle.close()
+                upload_path = dest_dir / (filename or "upload.json")
+                os.replace(handle.name, upload_path)
+                saved.append(upload_path)
+                handle = None
+        finally:
+            if handle:
+                handle.close()
+                os.unlink(handle.name)
+
+    while fill():
+        buffer = b""
+    return saved
+
+
+# ==============================
+# CATALOG (/api/jsons)
+# ==============================
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS actors (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    name TEXT,
+    level INTEGER,
+    class TEXT,
+    ancestry TEXT,
+    item_count INTEGER,
+    item_counts TEXT,
+    error TEXT
+)
+"""
+
+
+def actor_catalog_entry(data: Dict) -> Dict:
+    analyzer = CharacterAnalyzer(data)
+    info = analyzer.get_character_info()
+    class_item = analyzer.first_item_of_type("class")
+    ancestry_item = analyzer.first_item_of_type("ancestry")
+    counts = {item_type: len(items) for item_type, items in analyzer.items_by_type.items()}
+    try:
+        level = int(info["level"])
+    except (TypeError, ValueError):
+        level = None
+    return {
+        "name": info["name"],
+        "level": level,
+        "class": class_item.name if class_item else "",
+        "ancestry": ancestry_item.name if ancestry_item else "",
+        "item_count": len(analyzer.items),
+        "item_counts": counts,
+    }
+
+
+class CharacterCatalog:
+    """Indice SQLite dos JSONs disponiveis, chaveado por caminho, mtime e tamanho.
+
+    refresh() so reabre arquivos novos ou alterados e remove os que sumiram;
+    query() pagina e filtra sem tocar nos JSONs.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        import sqlite3
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row
+        conn.execute(CATALOG_SCHEMA)
+        return conn
+
+    def refresh(self, paths) -> int:
+        current = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            current[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        updated = 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                known = {
+                    row["path"]: (row["mtime_ns"], row["size"])
+                    for row in conn.execute("SELECT path, mtime_ns, size FROM actors")
+                }
+                gone = [(path,) for path in known if path not in current]
+                if gone:
+                    conn.executemany("DELETE FROM actors WHERE path = ?", gone)
+                for path, key in current.items():
+                    if known.get(path) == key:
+                        continue
+                    entry = {"name": None, "level": None, "class": None, "ancestry": None,
+                             "item_count": None, "item_counts": {}}
+                    error = None
+                    try:
+                        entry = actor_catalog_entry(load_actor_json(Path(path)))
+                    except Exception as exc:
+                        error = str(exc)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO actors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (path, key[0], key[1], entry["name"], entry["level"], entry["class"],
+                         entry["ancestry"], entry["item_count"], json.dumps(entry["item_counts"]), error),
+                    )
+                    updated += 1
+                conn.commit()
+            finally:
+                conn.close()
+        return updated
+
+    def query(self, search="", class_name="", level=None, offset=0, limit=50):
+        clauses = []
+        params = []
+        if search:
+            pattern = f"%{search}%"
+            clauses.append("(name LIKE ? OR path LIKE ? OR class LIKE ? OR ancestry LIKE ?)")
+            params.extend([pattern] * 4)
+        if class_name:
+            clauses.append("class LIKE ?")
+            params.append(class_name)
+        if level is not None:
+            clauses.append("level = ?")
+            params.append(level)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            conn = self._connect()
+            try:
+                total = conn.execute(f"SELECT COUNT(*) FROM actors{where}", params).fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT * FROM actors{where} ORDER BY COALESCE(name, path) COLLATE NOCASE, path"
+                    " LIMIT ? OFFSET ?",
+                    params + [limit, offset],
+                ).fetchall()
+            finally:
+                conn.close()
+        actors = []
+        for row in rows:
+            actor = dict(row)
+            actor["item_counts"] = json.loads(actor["item_counts"] or "{}")
+            del actor["mtime_ns"]
+            actors.append(actor)
+        return total, actors
+
+
+def catalog_sources():
+    return list(Path(".").glob("*.json")) + list(Path("output/uploads").glob("*.json"))
+
+
+character_catalog = CharacterCatalog(Path("output") / "catalog.sqlite3")
+
+
+# ==============================
+# WEB UI ASSETS
+# ==============================
+
+class StaticAsset:
+    __slots__ = ("body", "gzip_body", "etag", "gzip_etag", "content_type", "stamp")
+
+    def __init__(self, body, content_type, stamp):
+        import gzip
+
+        self.body = body
+        self.content_type = content_type
+        self.stamp = stamp
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        compressed = gzip.compress(body)
+        # So vale servir gzip quando ele de fato reduz o tamanho.
+        self.gzip_body = compressed if len(compressed) < len(body) else None
+        self.gzip_etag = f'"{hashlib.sha1(body).hexdigest()}-gz"'
+
+
+class StaticAssetCache:
+    """Arquivos da UI em memoria, com gzip e ETag calculados uma unica vez.
+
+    Cada pedido faz apenas um stat(); o arquivo so e relido se mtime ou
+    tamanho mudarem.
+    """
+
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path: Path):
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = str(file_path)
+        asset = self._assets.get(key)
+        if asset is not None and asset.stamp == stamp:
+            return asset
+        import mimetypes
+
+        ctype, _ = mimetypes.guess_type(key)
+        asset = StaticAsset(file_path.read_bytes(), ctype or "application/octet-stream", stamp)
+        with self._lock:
+            self._assets[key] = asset
+        return asset
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") != "q=0"
+    return False
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+static_assets = StaticAssetCache()
+
+
+def run_profiled(args, run):
+    """Chama run(timer) e, com --profile/--profile-dump, mostra as etapas."""
+    if not (args.profile or args.profile_dump):
+        return run(None)
+    import cProfile
+    import pstats
+
+    timer = StageTimer()
+    profiler = cProfile.Profile() if args.profile_dump else None
+    if profiler:
+        profiler.enable()
+    try:
+        ok = run(timer)
+    finally:
+        if profiler:
+            profiler.disable()
+    print_stage_report(timer.finish(), text_cache_stats())
+    if profiler:
+        profiler.dump_stats(args.profile_dump)
+        print(f"Perfil salvo em {args.profile_dump} (abra com python -m pstats).")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+    return ok
+
+
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(description="Conversor PF2E JSON -> PDF (HTML).")
     parser.add_argument("json", nargs="?", help="Arquivo JSON do personagem")
     parser.add_argument("--json", dest="json_flag", help="Arquivo JSON do personagem (usando --gui)")
     parser.add_argument("--web-ui", action="store_true", help="Abrir interface web local")
+    parser.add_argument("--batch", help="Diretorio ou glob de JSONs para converter em lote")
+    parser.add_argument("--watch", metavar="PASTA", help="Observa uma pasta e regenera as fichas dos JSONs novos ou alterados")
+    parser.add_argument("--watch-debounce", type=float, default=1.0, help="Segundos sem novas escritas antes de regenerar")
+    parser.add_argument("--watch-interval", type=float, default=1.0, help="Intervalo da verificacao por mtime sem inotify (s)")
+    parser.add_argument("--world", help="actors.db de um mundo do Foundry (NeDB, um JSON por linha)")
+    parser.add_argument("--actor-type", default="character", help="Tipo de actor a converter no --world (vazio = todos)")
+    parser.add_argument("--name", action="append", dest="names", help="Converte apenas actors com este nome (repetivel)")
+    parser.add_argument(
+        "--backend",
+        choices=("chrome", "native"),
+        default="chrome",
+        help="chrome: HTML impresso pelo Chrome (padrao); native: PDF direto em Python via fpdf, sem navegador",
+    )
+    parser.add_argument("--party", nargs="+", metavar="JSON", help="Junta as fichas de varios JSONs num unico PDF")
+    parser.add_argument("--party-name", default="grupo", help="Nome base dos arquivos do grupo (padrao: grupo)")
+    parser.add_argument("--no-party-overview", action="store_true", help="Nao inclui a pagina de resumo do grupo")
+    parser.add_argument("--jobs", type=int, default=None, help="Processos para analise/HTML no lote (padrao: CPUs)")
+    parser.add_argument("--pdf-jobs", type=int, default=2, help="Impressoes simultaneas do Chrome no lote")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora o cache de fichas ja geradas")
+    parser.add_argument("--cache-max-mb", type=int, default=200, help="Tamanho maximo do cache de fichas (MB)")
+    parser.add_argument(
+        "--text-cache-max-mb",
+        type=int,
+        default=64,
+        help="Tamanho maximo do cache de textos de magias em output/text_cache.sqlite3 (MB, 0 desliga)",
+    )
+    parser.add_argument("--preview-max-files", type=int, default=50, help="Previas mantidas em temp/")
+    parser.add_argument("--preview-max-mb", type=int, default=50, help="Tamanho maximo das previas em temp/ (MB)")
+    parser.add_argument("--preview-max-days", type=float, default=7, help="Remove previas sem acesso ha N dias")
+    parser.add_argument("--profile", action="store_true", help="Mostra o tempo de cada etapa (leitura, analise, HTML, escrita, PDF)")
+    parser.add_argument("--profile-dump", metavar="ARQUIVO", help="Roda sob cProfile e salva as estatisticas (pstats) em ARQUIVO")
+    parser.add_argument("--startup-report", action="store_true", help="Mede o custo de inicializacao e importacao e sai")
+    parser.add_argument("--max-upload-mb", type=int, default=100, help="Tamanho maximo de um upload na Web UI (MB)")
+    parser.add_argument("--ui-workers", type=int, default=2, help="Geracoes/previas simultaneas na Web UI")
+    parser.add_argument("--chrome-workers", type=int, default=2, help="Processos do Chrome mantidos aquecidos na Web UI")
+    parser.add_argument("--chrome-recycle", type=int, default=50, help="Reinicia cada Chrome do pool apos N impressoes")
     args = parser.parse_args()
+    if args.profile or args.profile_dump:
+        # As etapas desses modos rodam em outros processos/threads ou sem fim;
+        # a Web UI tem o /api/metrics.
+        for flag, used in (("--batch", args.batch), ("--world", args.world), ("--watch", args.watch),
+                           ("--web-ui", args.web_ui)):
+            if used:
+                parser.error(f"--profile/--profile-dump valem para um JSON ou --party, nao para {flag}")
 
-    output_dir = Path("output")
-    config_path = output_dir / "config.json"
-    config = load_config(config_path)
+    if args.startup_report:
+        sys.exit(0 if print_startup_report() else 1)
+
+    render_cache.enabled = not args.no_cache
+    render_cache.max_bytes = args.cache_max_mb * 1024 * 1024
+    spell_text_cache.max_bytes = args.text_cache_max_mb * 1024 * 1024
 
     if args.web_ui:
-        output_dir = Path("output")
-        config_path = output_dir / "config.json"
-        config = load_config(config_path)
+        import gzip
+        from concurrent.futures import Future, ThreadPoolExecutor
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        from urllib.parse import urlparse, parse_qs
+
         class UIHandler(BaseHTTPRequestHandler):
+            _started = None
+            _status = 0
+            _stage_timings = {}
+
+            def send_response(self, code, message=None):
+                self._status = code
+                super().send_response(code, message)
+
+            def end_headers(self):
+                # Server-Timing: etapas do job consultado (se houver) e o tempo
+                # gasto pelo handler ate aqui.
+                total = time.perf_counter() - self._started if self._started is not None else None
+                self.send_header("Server-Timing", server_timing_header(self._stage_timings, total))
+                super().end_headers()
+
+            def _timed(self, handler):
+                self._started = time.perf_counter()
+                self._status = 0
+                self._stage_timings = {}
+                try:
+                    handler()
+                finally:
+                    metrics.observe_request(urlparse(self.path).path, self._status, time.perf_counter() - self._started)
+
+            def do_GET(self):
+                self._timed(self._handle_get)
+
+            def do_POST(self):
+                self._timed(self._handle_post)
+
             def _send_json(self, data, status=200):
                 body = json.dumps(data).encode("utf-8")
                 self.send_response(status)
@@ -1855,20 +5008,55 @@ def main():
                 self.end_headers()
                 self.wfile.write(body)
 
-            def _serve_file(self, file_path):
-                if not file_path.exists():
-                    self.send_error(404)
+            def _send_body(self, body, content_type, etag, gzipped):
+                if etag_matches(self.headers.get("If-None-Match"), etag):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", "no-cache")
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.end_headers()
                     return
-                ctype, _ = mimetypes.guess_type(str(file_path))
-                ctype = ctype or "application/octet-stream"
-                body = file_path.read_bytes()
                 self.send_response(200)
-                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Type", content_type)
                 self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Vary", "Accept-Encoding")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
                 self.end_headers()
                 self.wfile.write(body)
 
-            def do_GET(self):
+            def _serve_file(self, file_path):
+                asset = static_assets.get(file_path)
+                if asset is None:
+                    self.send_error(404)
+                    return
+                if asset.gzip_body is not None and accepts_gzip(self.headers.get("Accept-Encoding")):
+                    return self._send_body(asset.gzip_body, asset.content_type, asset.gzip_etag, True)
+                return self._send_body(asset.body, asset.content_type, asset.etag, False)
+
+            def _serve_preview(self, file_path):
+                # Previas mudam a cada clique: nada de cache em memoria, so
+                # ETag pelo stat e gzip sob demanda.
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    self.send_error(404)
+                    return
+                etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+                use_gzip = accepts_gzip(self.headers.get("Accept-Encoding"))
+                if use_gzip:
+                    etag = etag[:-1] + '-gz"'
+                if etag_matches(self.headers.get("If-None-Match"), etag):
+                    return self._send_body(b"", "text/html; charset=utf-8", etag, use_gzip)
+                body = file_path.read_bytes()
+                preview_store.touch(file_path)
+                if use_gzip:
+                    body = gzip.compress(body, compresslevel=6)
+                return self._send_body(body, "text/html; charset=utf-8", etag, use_gzip)
+
+            def _handle_get(self):
                 parsed = urlparse(self.path)
                 if parsed.path == "/":
                     return self._serve_file(Path("ui/index.html"))
@@ -1877,27 +5065,118 @@ def main():
                 if parsed.path == "/style.css":
                     return self._serve_file(Path("ui/style.css"))
                 if parsed.path == "/preview":
-                    cfg = load_config(config_path)
-                    preview_path = Path(cfg.get("last_preview", ""))
+                    preview_path = Path(config_store.get().get("last_preview", ""))
                     if not preview_path.exists():
                         return self._serve_file(Path("ui/preview_placeholder.html"))
-                    return self._serve_file(preview_path)
+                    return self._serve_preview(preview_path)
                 if parsed.path == "/api/jsons":
-                    jsons = [str(p) for p in Path(".").glob("*.json")]
-                    uploads = list(Path("output/uploads").glob("*.json"))
-                    jsons.extend([str(p) for p in uploads])
-                    return self._send_json({"jsons": jsons})
+                    params = parse_qs(parsed.query)
+
+                    def param(name, default=""):
+                        return params.get(name, [default])[0]
+
+                    try:
+                        offset = max(0, int(param("offset", "0")))
+                        limit = min(500, max(1, int(param("limit", "100"))))
+                        level = int(param("level")) if param("level") else None
+                    except ValueError:
+                        return self._send_json({"error": "invalid query"}, status=400)
+                    character_catalog.refresh(catalog_sources())
+                    total, actors = character_catalog.query(
+                        search=param("q"), class_name=param("class"), level=level, offset=offset, limit=limit
+                    )
+                    return self._send_json({
+                        "jsons": [actor["path"] for actor in actors],
+                        "actors": actors,
+                        "total": total,
+                        "offset": offset,
+                        "limit": limit,
+                    })
                 if parsed.path == "/api/config":
-                    return self._send_json(load_config(config_path))
+                    return self._send_json(config_store.get())
+                if parsed.path == "/api/metrics":
+                    return self._send_json(metrics.snapshot())
+                if parsed.path.startswith("/api/jobs/"):
+                    job_id, _, action = parsed.path[len("/api/jobs/"):].partition("/")
+                    job = render_jobs.get(job_id)
+                    if job is None:
+                        return self._send_json({"error": "job not found"}, status=404)
+                    if action == "events":
+                        return self._stream_job_events(job)
+                    if action == "pdf":
+                        return self._send_job_pdf(job)
+                    self._stage_timings = dict(job.timings)
+                    return self._send_json(job.to_dict())
                 self.send_error(404)
 
-            def do_POST(self):
+            def _handle_upload(self, length):
+                boundary = multipart_boundary(self.headers.get("Content-Type", ""))
+                if not boundary or length <= 0:
+                    return self._send_json({"error": "invalid upload"}, status=400)
+                if length > args.max_upload_mb * 1024 * 1024:
+                    self.close_connection = True
+                    return self._send_json({"error": "upload too large"}, status=413)
+                try:
+                    paths = save_multipart_uploads(self.rfile, boundary, length, Path("output/uploads"))
+                except (ValueError, OSError) as exc:
+                    self.close_connection = True
+                    return self._send_json({"error": f"upload failed: {exc}"}, status=400)
+                if not paths:
+                    return self._send_json({"error": "upload failed"}, status=400)
+                return self._send_json({"path": str(paths[0]), "paths": [str(p) for p in paths]})
+
+            def _send_job_pdf(self, job):
+                result = job.result if job.kind == "generate" and job.status == "done" else None
+                pdf_path = Path(result["pdf"]) if result and result.get("ok") else None
+                try:
+                    handle = pdf_path.open("rb") if pdf_path else None
+                except OSError:
+                    handle = None
+                if handle is None:
+                    return self._send_json({"error": "pdf not available"}, status=404)
+                with handle:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/pdf")
+                    self.send_header("Content-Length", str(os.fstat(handle.fileno()).st_size))
+                    self.send_header("Content-Disposition", f'inline; filename="{pdf_path.name}"')
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                    try:
+                        shutil.copyfileobj(handle, self.wfile, 64 * 1024)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+            def _stream_job_events(self, job):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                version = -1
+                try:
+                    while True:
+                        snapshot, new_version = job.wait_for_change(version, timeout=15)
+                        if new_version == version:
+                            self.wfile.write(b": keepalive\n\n")
+                        else:
+                            version = new_version
+                            self.wfile.write(f"data: {json.dumps(snapshot)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if snapshot["status"] in ("done", "error"):
+                            return
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+            def _handle_post(self):
                 parsed = urlparse(self.path)
                 length = int(self.headers.get("Content-Length", "0"))
+                if parsed.path == "/api/upload":
+                    return self._handle_upload(length)
                 body = self.rfile.read(length)
                 if parsed.path == "/api/config":
                     data = json.loads(body.decode("utf-8"))
-                    save_config(config_path, data)
+                    data.pop("last_json", None)
+                    data.pop("last_preview", None)
+                    config_store.update(data)
                     return self._send_json({"ok": True})
                 if parsed.path == "/api/generate":
                     data = json.loads(body.decode("utf-8"))
@@ -1906,11 +5185,32 @@ def main():
                     json_path = data.get("json_path", "")
                     if not json_path:
                         return self._send_json({"error": "json_path required"}, status=400)
-                    ok = run_generate(Path(json_path), sections)
-                    config_update = sections_to_config(sections)
-                    config_update["last_json"] = json_path
-                    save_config(config_path, config_update)
-                    return self._send_json({"ok": ok})
+
+                    def generate_job(timer):
+                        config_update = sections_to_config(sections)
+                        config_update["last_json"] = json_path
+                        config_store.update(config_update)
+                        # O servidor nao chama xdg-open: a pagina abre o PDF
+                        # por /api/jobs/<id>/pdf quando o job termina.
+                        _, pdf_path = output_paths(Path(json_path).stem)
+                        if args.backend == "native":
+                            ok = run_native(Path(json_path), sections, timer, open_pdf=False)
+                            return {"ok": ok, "pdf": str(pdf_path)}
+                        result = Future()
+
+                        def done(printed):
+                            if printed.exception() is not None:
+                                result.set_exception(printed.exception())
+                            else:
+                                result.set_result({"ok": printed.result(), "pdf": str(pdf_path)})
+
+                        submit_generate(
+                            Path(json_path), sections, timer, pdf_pipeline, pdf_finisher, open_pdf=False
+                        ).add_done_callback(done)
+                        return result
+
+                    job = render_jobs.submit("generate", generate_job)
+                    return self._send_json({"job_id": job.id, "status": job.status}, status=202)
                 if parsed.path == "/api/preview":
                     data = json.loads(body.decode("utf-8"))
                     sections = SectionFlags(**data.get("sections", {}))
@@ -1918,63 +5218,89 @@ def main():
                     json_path = data.get("json_path", "")
                     if not json_path:
                         return self._send_json({"error": "json_path required"}, status=400)
-                    try:
-                        preview_path = run_preview(Path(json_path), sections)
-                    except Exception as exc:
-                        return self._send_json({"error": str(exc)}, status=400)
-                    config_update = sections_to_config(sections)
-                    config_update["last_json"] = json_path
-                    config_update["last_preview"] = str(preview_path)
-                    save_config(config_path, config_update)
-                    return self._send_json({"ok": True})
-                if parsed.path == "/api/upload":
-                    boundary = self.headers.get("Content-Type", "").split("boundary=")[-1]
-                    if not boundary:
-                        return self._send_json({"error": "invalid upload"}, status=400)
-                    boundary_bytes = ("--" + boundary).encode("utf-8")
-                    parts = body.split(boundary_bytes)
-                    upload_path = None
-                    for part in parts:
-                        if b"Content-Disposition" in part and b"filename=" in part:
-                            header, file_data = part.split(b"\r\n\r\n", 1)
-                            file_data = file_data.rsplit(b"\r\n", 1)[0]
-                            filename = "upload.json"
-                            header_str = header.decode("utf-8", errors="ignore")
-                            if "filename=" in header_str:
-                                filename = header_str.split("filename=")[-1].strip().strip('"')
-                            safe_name = os.path.basename(filename)
-                            uploads_dir = Path("output/uploads")
-                            uploads_dir.mkdir(parents=True, exist_ok=True)
-                            upload_path = uploads_dir / safe_name
-                            upload_path.write_bytes(file_data)
-                    if upload_path:
-                        return self._send_json({"path": str(upload_path)})
-                    return self._send_json({"error": "upload failed"}, status=400)
+
+                    def preview_job(timer):
+                        preview_path = run_preview(Path(json_path), sections, timer)
+                        config_update = sections_to_config(sections)
+                        config_update["last_json"] = json_path
+                        config_update["last_preview"] = str(preview_path)
+                        config_store.update(config_update)
+                        return {"ok": True, "preview": str(preview_path)}
+
+                    job = render_jobs.submit("preview", preview_job)
+                    return self._send_json({"job_id": job.id, "status": job.status}, status=202)
                 self.send_error(404)
 
+        preview_store.max_files = args.preview_max_files
+        preview_store.max_bytes = args.preview_max_mb * 1024 * 1024
+        preview_store.max_age = args.preview_max_days * 24 * 3600
+        preview_store.start_cleanup()
+        if start_chrome_pool(size=args.chrome_workers, max_jobs=args.chrome_recycle):
+            print(f"Pool do Chrome pronto ({args.chrome_workers} processo(s)).")
+        metrics = Metrics()
+        pdf_pipeline = PdfPipeline(workers=args.chrome_workers)
+        pdf_finisher = ThreadPoolExecutor(max_workers=max(1, args.ui_workers), thread_name_prefix="pdf-finish")
+        render_jobs = RenderJobQueue(workers=args.ui_workers, listener=metrics.observe_job)
         server = ThreadingHTTPServer(("127.0.0.1", 0), UIHandler)
         port = server.server_address[1]
         url = f"http://127.0.0.1:{port}/"
         print(f"UI web em: {url}")
-        if sys.platform == "darwin":
-            subprocess.run(["open", url])
-        elif sys.platform.startswith("linux"):
-            subprocess.run(["xdg-open", url])
-        elif sys.platform.startswith("win"):
-            os.startfile(url)
+        open_file(url)
         try:
             server.serve_forever()
         except KeyboardInterrupt:
             pass
         return
 
+    if args.world:
+        sections = section_flags_from_config()
+        if args.backend == "chrome":
+            start_chrome_pool(size=args.pdf_jobs, max_jobs=args.chrome_recycle)
+        ok = run_world(Path(args.world), sections, args.actor_type, args.names, pdf_jobs=args.pdf_jobs,
+                       backend=args.backend)
+        sys.exit(0 if ok else 1)
+
+    if args.party:
+        sections = section_flags_from_config()
+        ok = run_profiled(args, lambda timer: run_party(
+            [Path(path) for path in args.party],
+            sections,
+            base_name=args.party_name,
+            overview=not args.no_party_overview,
+            timer=timer,
+            backend=args.backend,
+        ))
+        sys.exit(0 if ok else 1)
+
+    if args.watch:
+        sections = section_flags_from_config()
+        if args.backend == "chrome":
+            start_chrome_pool(size=args.pdf_jobs, max_jobs=args.chrome_recycle)
+        ok = run_watch(Path(args.watch), sections, workers=max(1, args.pdf_jobs), debounce=args.watch_debounce,
+                       interval=args.watch_interval, backend=args.backend)
+        sys.exit(0 if ok else 1)
+
+    if args.batch:
+        sections = section_flags_from_config()
+        if args.backend == "native":
+            ok = run_batch_native(resolve_batch_inputs(args.batch), sections, jobs=args.jobs)
+            sys.exit(0 if ok else 1)
+        start_chrome_pool(size=args.pdf_jobs, max_jobs=args.chrome_recycle)
+        ok = run_batch(resolve_batch_inputs(args.batch), sections, jobs=args.jobs, pdf_jobs=args.pdf_jobs)
+        sys.exit(0 if ok else 1)
+
     if not args.json:
         print("Uso: python conversor_v2.py <arquivo_json>")
         print("Exemplo: python conversor_v2.py Umbriel.json")
         sys.exit(1)
 
-    sections = section_flags_from_config(config)
-    run_generate(Path(args.json), sections)
+    sections = section_flags_from_config()
+    run = run_native if args.backend == "native" else run_generate
+    if not (args.profile or args.profile_dump):
+        run(Path(args.json), sections)
+        return
+    ok = run_profiled(args, lambda timer: run(Path(args.json), sections, timer))
+    sys.exit(0 if ok else 1)
 
 
 if __name__ == "__main__":
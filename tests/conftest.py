@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os testes importam conversor_v2 direto da raiz do repositorio.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,86 @@
+"""Paridade de clean_text/clean_description com as passadas de regex originais.
+
+tests/data/umbriel_clean_golden.json guarda, para cada texto do Umbriel.json
+com marcacao (@, colchetes, chaves, tags, entidades ou quebras), a saida da
+implementacao com re.sub que existia antes dos scanners lineares.
+"""
+
+import html
+import json
+import random
+import re
+from pathlib import Path
+
+import pytest
+
+import conversor_v2 as v2
+
+ROOT = Path(__file__).resolve().parent.parent
+
+GOLDEN = json.loads((ROOT / "tests" / "data" / "umbriel_clean_golden.json").read_text(encoding="utf-8"))
+
+
+def baseline_unwrap(text):
+    text = re.sub(r"@Compendium\[[^\]]+\]\{([^}]+)\}", r"\1", text)
+    text = re.sub(r"@Compendium\[[^\]]+\]", "", text)
+    text = re.sub(r"@UUID\[[^\]]+\]\{([^}]+)\}", r"\1", text)
+    return re.sub(r"@UUID\[[^\]]+\]", "", text)
+
+
+def baseline_clean_text(text):
+    text = baseline_unwrap(str(text))
+    text = re.sub(r"\[\[.*?\]\]", "", text)
+    text = re.sub(r"\[.*?\]", "", text)
+    return text.strip()
+
+
+def baseline_clean_description(text):
+    text = baseline_unwrap(str(text))
+    text = re.sub(r"<hr\s*/?>", "\n", text, flags=re.IGNORECASE)
+    text = re.sub(r"</p\s*>", "\n", text, flags=re.IGNORECASE)
+    text = re.sub(r"<br\s*/?>", "\n", text, flags=re.IGNORECASE)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = html.unescape(text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    v2.clear_text_caches()
+    yield
+    v2.clear_text_caches()
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=range(len(GOLDEN)))
+def test_golden_umbriel(case):
+    assert v2.clean_text(case["text"]) == case["clean_text"]
+    assert v2.clean_description(case["text"]) == case["clean_description"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "@UUID[x]{@Compendium[y]{z}}",
+        "@Compendium[x]{@UUID[y]{z}}",
+        "@UUID[a]{@UUID[b]{c}} fim",
+        "@Compendium[a]{b}} @UUID[c]{{d}}",
+        "@UU@Compendium[x]ID[y]{z}",
+        "[[/r 1d20]] @UUID[x]{[[/r 2d6]]} [nota] <p>a</p><br>b",
+    ],
+)
+def test_nested_links_match_baseline(text):
+    assert v2.clean_text(text) == baseline_clean_text(text)
+    assert v2.clean_description(text) == baseline_clean_description(text)
+
+
+def test_random_markup_matches_baseline():
+    atoms = [
+        "@UUID[", "@Compendium[", "@UU", "ID[", "[", "]", "[[", "]]", "{", "}", "<", ">",
+        "<br>", "<BR />", "</p>", "</P >", "<hr/>", "<p>", "&amp;", "\n", "\n\n\n", " ", "a", "@",
+    ]
+    rng = random.Random(5)
+    for _ in range(20000):
+        text = "".join(rng.choice(atoms) for _ in range(rng.randint(0, 12)))
+        assert v2.clean_text(text) == baseline_clean_text(text), text
+        assert v2.clean_description(text) == baseline_clean_description(text), text
@@ -0,0 +1,30 @@
+"""ConfigStore: gravacao atomica e agrupada do config.json."""
+
+import json
+
+import conversor_v2 as v2
+
+
+def test_flush_writes_valid_json_without_temp_files(tmp_path):
+    path = tmp_path / "config.json"
+    store = v2.ConfigStore(path, debounce=60)
+    store.update({"sections": {"spells": False}})
+    store.update({"last_json": "Umbriel.json"})
+    assert not path.exists()
+
+    store.flush()
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {
+        "sections": {"spells": False},
+        "last_json": "Umbriel.json",
+    }
+    assert [entry.name for entry in tmp_path.iterdir()] == ["config.json"]
+
+
+def test_get_returns_a_copy(tmp_path):
+    store = v2.ConfigStore(tmp_path / "config.json", debounce=60)
+    store.replace({"sections": {"spells": True}})
+    store.get()["sections"]["spells"] = False
+
+    assert store.get() == {"sections": {"spells": True}}
+    store.flush()
@@ -0,0 +1,114 @@
+"""save_multipart_uploads: parser de multipart/form-data em blocos."""
+
+import io
+
+import pytest
+
+import conversor_v2 as v2
+
+BOUNDARY = b"----pf2eBoundary7MA4YWxk"
+
+
+def part(filename, content, name="file"):
+    disposition = f'form-data; name="{name}"'
+    if filename is not None:
+        disposition += f'; filename="{filename}"'
+    return (
+        b"--" + BOUNDARY + b"\r\n"
+        + f"Content-Disposition: {disposition}\r\n".encode("utf-8")
+        + b"Content-Type: application/json\r\n\r\n"
+        + content + b"\r\n"
+    )
+
+
+def body(*parts):
+    return b"".join(parts) + b"--" + BOUNDARY + b"--\r\n"
+
+
+def save(data, dest, chunk_size=None, monkeypatch=None):
+    if chunk_size is not None:
+        monkeypatch.setattr(v2, "UPLOAD_CHUNK_SIZE", chunk_size)
+    return v2.save_multipart_uploads(io.BytesIO(data), BOUNDARY, len(data), dest)
+
+
+def leftovers(dest):
+    return sorted(entry.name for entry in dest.iterdir() if entry.name.startswith("."))
+
+
+def test_multipart_boundary_header():
+    assert v2.multipart_boundary(f'multipart/form-data; boundary="{BOUNDARY.decode()}"') == BOUNDARY
+    assert v2.multipart_boundary("multipart/form-data") == b""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 31, 64 * 1024])
+def test_boundary_split_across_chunks(tmp_path, monkeypatch, chunk_size):
+    content = b'{"name": "Umbriel", "items": []}' * 5
+    saved = save(body(part("Umbriel.json", content)), tmp_path, chunk_size, monkeypatch)
+
+    assert saved == [tmp_path / "Umbriel.json"]
+    assert saved[0].read_bytes() == content
+    assert leftovers(tmp_path) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64 * 1024])
+def test_crlf_and_partial_delimiters_inside_content(tmp_path, monkeypatch, chunk_size):
+    content = b"linha 1\r\nlinha 2\r\n\r\n--" + BOUNDARY[:-1] + b"\r\n-\r\n--\r\n"
+    saved = save(body(part("a.json", content)), tmp_path, chunk_size, monkeypatch)
+
+    assert saved[0].read_bytes() == content
+
+
+def test_multiple_files_and_plain_fields(tmp_path):
+    data = body(
+        part("Umbriel.json", b'{"a": 1}'),
+        part(None, b"ignorado", name="note"),
+        part("Sefiro.json", b'{"b": 2}'),
+    )
+    saved = save(data, tmp_path)
+
+    assert saved == [tmp_path / "Umbriel.json", tmp_path / "Sefiro.json"]
+    assert (tmp_path / "Sefiro.json").read_bytes() == b'{"b": 2}'
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["Sefiro.json", "Umbriel.json"]
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("../x.json", "x.json"),
+        ("../../etc/x.json", "x.json"),
+        ("C:\\Users\\mesa\\x.json", "x.json"),
+        ("/abs/path/x.json", "x.json"),
+        ("..", "upload.json"),
+        (".", "upload.json"),
+        (".upload_abc", "upload_abc"),
+        ("", "upload.json"),
+    ],
+)
+def test_filename_is_sanitised(tmp_path, filename, expected):
+    dest = tmp_path / "uploads"
+    saved = save(body(part(filename, b"{}")), dest)
+
+    assert saved == [dest / expected]
+    assert sorted(entry.name for entry in tmp_path.rglob("*") if entry.is_file()) == [expected]
+
+
+@pytest.mark.parametrize("cut", [10, 60, 120, -len(b"--" + BOUNDARY + b"--\r\n") - 2])
+def test_truncated_body_is_rejected_without_leftovers(tmp_path, cut):
+    data = body(part("a.json", b'{"name": "Umbriel"}' * 3))[:cut]
+
+    with pytest.raises(ValueError):
+        save(data, tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_closing_boundary_is_rejected(tmp_path):
+    data = part("a.json", b'{"name": "Umbriel"}')
+
+    with pytest.raises(ValueError):
+        save(data, tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_body_without_boundary_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        save(b"nada de multipart aqui", tmp_path)
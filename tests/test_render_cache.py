@@ -0,0 +1,71 @@
+"""RenderCache: chave por conteudo e remocao das entradas menos usadas."""
+
+import os
+from dataclasses import replace
+
+import conversor_v2 as v2
+
+
+def make_files(tmp_path, name, size=100):
+    html_path = tmp_path / f"{name}.html"
+    pdf_path = tmp_path / f"{name}.pdf"
+    html_path.write_bytes(b"h" * size)
+    pdf_path.write_bytes(b"p" * size)
+    return html_path, pdf_path
+
+
+def test_key_changes_with_json_and_sections(tmp_path):
+    cache = v2.RenderCache(tmp_path / "cache")
+    sections = v2.SectionFlags()
+    key = cache.key(b'{"name": "Umbriel"}', sections)
+
+    assert cache.key(b'{"name": "Umbriel"}', sections) == key
+    assert cache.key(b'{"name": "Sefiro"}', sections) != key
+    assert cache.key(b'{"name": "Umbriel"}', replace(sections, spells=False)) != key
+
+
+def test_store_and_restore(tmp_path):
+    cache = v2.RenderCache(tmp_path / "cache")
+    html_path, pdf_path = make_files(tmp_path, "ficha")
+    cache.store("abc", html_path, pdf_path)
+
+    out_html, out_pdf = tmp_path / "out.html", tmp_path / "out.pdf"
+    assert cache.restore("abc", out_html, out_pdf)
+    assert out_pdf.read_bytes() == pdf_path.read_bytes()
+    assert not cache.restore("missing", out_html, out_pdf)
+
+
+def test_evict_removes_oldest_entries_over_limit(tmp_path):
+    root = tmp_path / "cache"
+    cache = v2.RenderCache(root, max_bytes=10 * 1024 * 1024)
+    for index, key in enumerate(["old", "middle", "new"]):
+        cache.store(key, *make_files(tmp_path, key))
+        os.utime(root / key, (1000 + index, 1000 + index))
+
+    # Cada entrada tem 200 bytes (HTML + PDF): cabem duas.
+    cache.max_bytes = 450
+    cache.evict()
+
+    assert sorted(entry.name for entry in root.iterdir()) == ["middle", "new"]
+
+
+def test_evict_skips_entries_removed_concurrently(tmp_path, monkeypatch):
+    root = tmp_path / "cache"
+    cache = v2.RenderCache(root, max_bytes=0)
+    for key in ("a", "b"):
+        (root / key).mkdir(parents=True)
+        (root / key / "ficha.pdf").write_bytes(b"x")
+    original_iterdir = type(root).iterdir
+
+    def racy_iterdir(self):
+        # "a" some entre o is_dir() e a listagem, como se outro processo
+        # tivesse removido a entrada.
+        if self.name == "a":
+            raise FileNotFoundError(self)
+        return original_iterdir(self)
+
+    monkeypatch.setattr(type(root), "iterdir", racy_iterdir)
+    cache.evict()
+    monkeypatch.undo()
+
+    assert not (root / "b").exists()
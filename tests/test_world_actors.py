@@ -0,0 +1,50 @@
+"""iter_world_actors: leitura em duas passadas de um actors.db (NeDB)."""
+
+import json
+from pathlib import Path
+
+import conversor_v2 as v2
+
+WORLD_DB = Path(__file__).resolve().parent / "data" / "world_actors.db"
+
+
+def actors(**kwargs):
+    return [(doc["_id"], doc["system"].get("rev")) for _, doc in v2.iter_world_actors(WORLD_DB, **kwargs)]
+
+
+def test_latest_line_wins_and_order_follows_file():
+    assert actors() == [("a2", 1), ("a1", 2)]
+
+
+def test_deleted_blank_corrupt_and_index_lines_are_skipped():
+    ids = [doc_id for doc_id, _ in actors(actor_type="")]
+    assert "a3" not in ids
+    assert "broken" not in ids
+    assert len(ids) == len(set(ids))
+
+
+def test_actor_type_filter_uses_the_latest_version():
+    assert actors(actor_type="") == [("n1", None), ("a2", 1), ("a1", 2), ("a4", None)]
+    assert actors(actor_type="npc") == [("n1", None), ("a4", None)]
+
+
+def test_name_filter_is_case_insensitive():
+    assert actors(names=["umbriel"]) == [("a1", 2)]
+    assert actors(names=["Goblin"]) == []
+
+
+def test_raw_line_matches_the_document():
+    for raw, doc in v2.iter_world_actors(WORLD_DB, actor_type=""):
+        assert json.loads(raw) == doc
+        assert raw in WORLD_DB.read_bytes()
+
+
+def test_deleted_then_recreated_actor_is_kept(tmp_path):
+    db = tmp_path / "actors.db"
+    db.write_text(
+        '{"_id":"x","name":"A","type":"character","system":{"rev":1}}\n'
+        '{"$$deleted":true,"_id":"x"}\n'
+        '{"_id":"x","name":"A","type":"character","system":{"rev":3}}',
+        encoding="utf-8",
+    )
+    assert [doc["system"]["rev"] for _, doc in v2.iter_world_actors(db)] == [3]
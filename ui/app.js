@@ -48,6 +48,12 @@ let jsonListCache = [];
 
 const jsonList = document.getElementById("jsonList");
 const selectedJsonEl = document.getElementById("selectedJson");
+const jsonSearch = document.getElementById("jsonSearch");
+const jsonPrev = document.getElementById("jsonPrev");
+const jsonNext = document.getElementById("jsonNext");
+const jsonPageInfo = document.getElementById("jsonPageInfo");
+const JSON_PAGE_SIZE = 24;
+let jsonOffset = 0;
 const enableAllBtn = document.getElementById("enableAll");
 const previewBtn = document.getElementById("preview");
 const generateBtn = document.getElementById("generate");
@@ -268,33 +274,78 @@ function enableDragAndDrop() {
   });
 }
 
+function describeActor(actor) {
+  const parts = [];
+  if (actor.level !== null && actor.level !== undefined) parts.push(`Nv ${actor.level}`);
+  if (actor.ancestry) parts.push(actor.ancestry);
+  if (actor.class) parts.push(actor.class);
+  return parts.join(" · ");
+}
+
 function renderJsonList(list) {
   jsonListCache = list || [];
   jsonList.innerHTML = "";
-  list.forEach((path) => {
+  jsonListCache.forEach((actor) => {
     const item = document.createElement("div");
     item.className = "json-item";
-    if (path === selectedJson) item.classList.add("active");
-    item.textContent = path;
+    if (actor.path === selectedJson) item.classList.add("active");
+    const name = document.createElement("strong");
+    name.textContent = actor.name || actor.path;
+    item.appendChild(name);
+    const meta = document.createElement("small");
+    meta.textContent = actor.error ? "JSON invalido" : describeActor(actor);
+    item.appendChild(meta);
+    const path = document.createElement("small");
+    path.textContent = actor.path;
+    item.appendChild(path);
+    item.title = actor.path;
     item.addEventListener("click", () => {
-      selectedJson = path;
-      selectedJsonEl.textContent = path;
-      renderJsonList(list);
+      selectedJson = actor.path;
+      selectedJsonEl.textContent = actor.path;
+      renderJsonList(jsonListCache);
     });
     jsonList.appendChild(item);
   });
 }
 
+function renderJsonPager(data) {
+  const end = Math.min(data.offset + data.limit, data.total);
+  jsonPageInfo.textContent = data.total ? `${data.offset + 1}-${end} de ${data.total}` : "Nenhum JSON";
+  jsonPrev.disabled = data.offset <= 0;
+  jsonNext.disabled = end >= data.total;
+}
+
 async function loadJsonList() {
-  const res = await fetch("/api/jsons");
+  const params = new URLSearchParams({ offset: jsonOffset, limit: JSON_PAGE_SIZE });
+  const search = jsonSearch.value.trim();
+  if (search) params.set("q", search);
+  const res = await fetch(`/api/jsons?${params}`);
   const data = await res.json();
-  renderJsonList(data.jsons || []);
+  renderJsonList(data.actors || []);
+  renderJsonPager(data);
 }
 
-function handleFile(file) {
-  if (!file) return;
+let jsonSearchTimer = null;
+jsonSearch.addEventListener("input", () => {
+  clearTimeout(jsonSearchTimer);
+  jsonSearchTimer = setTimeout(() => {
+    jsonOffset = 0;
+    loadJsonList();
+  }, 250);
+});
+jsonPrev.addEventListener("click", () => {
+  jsonOffset = Math.max(0, jsonOffset - JSON_PAGE_SIZE);
+  loadJsonList();
+});
+jsonNext.addEventListener("click", () => {
+  jsonOffset += JSON_PAGE_SIZE;
+  loadJsonList();
+});
+
+function handleFiles(files) {
+  if (!files || !files.length) return;
   const formData = new FormData();
-  formData.append("file", file);
+  Array.from(files).forEach((file) => formData.append("file", file));
   fetch("/api/upload", { method: "POST", body: formData })
     .then((res) => res.json())
     .then((data) => {
@@ -302,7 +353,10 @@ function handleFile(file) {
         selectedJson = data.path;
         selectedJsonEl.textContent = selectedJson;
         loadJsonList();
-        showToast("JSON carregado.");
+        const count = (data.paths || [data.path]).length;
+        showToast(count > 1 ? `${count} JSONs carregados.` : "JSON carregado.");
+      } else {
+        showToast("Falha ao carregar JSON.", false);
       }
     })
     .catch(() => showToast("Falha ao carregar JSON.", false));
@@ -316,10 +370,66 @@ dropzone.addEventListener("dragleave", () => dropzone.classList.remove("active")
 dropzone.addEventListener("drop", (e) => {
   e.preventDefault();
   dropzone.classList.remove("active");
-  const file = e.dataTransfer.files[0];
-  handleFile(file);
+  handleFiles(e.dataTransfer.files);
 });
-fileInput.addEventListener("change", (e) => handleFile(e.target.files[0]));
+fileInput.addEventListener("change", (e) => handleFiles(e.target.files));
+
+function formatStage(job) {
+  const labels = {
+    parse: "lendo JSON",
+    cache: "verificando cache",
+    analyze: "analisando",
+    render: "montando HTML",
+    pdf_wait: "aguardando o Chrome",
+    print: "imprimindo PDF",
+  };
+  if (job.status === "queued") return "na fila";
+  return labels[job.stage] || job.stage || job.status;
+}
+
+async function pollJob(jobId, onUpdate) {
+  while (true) {
+    const res = await fetch(`/api/jobs/${jobId}`);
+    const job = await res.json();
+    if (onUpdate) onUpdate(job);
+    if (!res.ok || job.status === "done" || job.status === "error") return job;
+    await new Promise((resolve) => setTimeout(resolve, 500));
+  }
+}
+
+function waitForJob(jobId, onUpdate) {
+  if (!window.EventSource) return pollJob(jobId, onUpdate);
+  return new Promise((resolve) => {
+    const source = new EventSource(`/api/jobs/${jobId}/events`);
+    source.onmessage = (event) => {
+      const job = JSON.parse(event.data);
+      if (onUpdate) onUpdate(job);
+      if (job.status === "done" || job.status === "error") {
+        source.close();
+        resolve(job);
+      }
+    };
+    source.onerror = () => {
+      source.close();
+      pollJob(jobId, onUpdate).then(resolve);
+    };
+  });
+}
+
+async function submitJob(url, payload, label) {
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok) return null;
+  const data = await res.json();
+  return waitForJob(data.job_id, (job) => {
+    if (job.status === "queued" || job.status === "running") {
+      showToast(`${label}: ${formatStage(job)}...`);
+    }
+  });
+}
 
 generateBtn.addEventListener("click", async () => {
   if (!selectedJson) {
@@ -330,12 +440,9 @@ generateBtn.addEventListener("click", async () => {
     json_path: selectedJson,
     sections: config.sections,
   };
-  const res = await fetch("/api/generate", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload),
-  });
-  if (res.ok) {
+  const job = await submitJob("/api/generate", payload, "Gerando ficha");
+  if (job && job.status === "done" && job.result && job.result.ok) {
+    window.open(`/api/jobs/${job.id}/pdf`, "_blank");
     showToast("Ficha gerada com sucesso.");
   } else {
     showToast("Falha ao gerar ficha.", false);
@@ -351,12 +458,8 @@ previewBtn.addEventListener("click", async () => {
     json_path: selectedJson,
     sections: config.sections,
   };
-  const res = await fetch("/api/preview", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload),
-  });
-  if (res.ok) {
+  const job = await submitJob("/api/preview", payload, "Gerando previa");
+  if (job && job.status === "done") {
     window.open("/preview", "_blank");
     showToast("Previa gerada.");
   } else {